@@ -0,0 +1,163 @@
+import json
+import random
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from config_loader import ConfigLoader
+from k8s import KubernetesResourceManager, load_manifest
+from logger import LoggerManager
+
+config_data = ConfigLoader.load_config()
+
+# Setup logger
+logger = LoggerManager.get_logger(config_data, 'k8s')
+
+# resource: manifest dict or YAML path identifying the object
+# patch: JSON patch operations, a merge patch dict, or a callable building either from the live object
+PatchTarget = namedtuple('PatchTarget', ['resource', 'patch'])
+
+PatchResult = namedtuple('PatchResult', ['kind', 'name', 'namespace', 'status_code', 'attempts', 'latency', 'error'])
+
+BatchPatchSummary = namedtuple('BatchPatchSummary', [
+    'results', 'total', 'succeeded', 'failed', 'conflicts_retried',
+    'elapsed', 'throughput', 'latency_p50', 'latency_p95',
+])
+
+PATCH_CONTENT_TYPES = {
+    'json': 'application/json-patch+json',
+    'merge': 'application/merge-patch+json',
+}
+
+
+class BatchPatchError(Exception):
+    """Raised when some items of a batch patch failed and the caller asked for errors to be raised."""
+
+    def __init__(self, summary):
+        super().__init__(f"{summary.failed} of {summary.total} patches failed")
+        self.summary = summary
+
+
+def percentile(values, rank):
+    """Nearest-rank percentile (0-100) of a list of values, 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(rank / 100 * (len(ordered) - 1))))]
+
+
+def is_conflict(status_code, message):
+    """
+    Whether a patch lost a race: a stale resourceVersion in a merge patch is a 409, a failed JSON patch 'test'
+    operation a 422 whose message reads e.g. 'testing value /metadata/resourceVersion failed: test failed'.
+    """
+    if status_code == 409:
+        return True
+    return status_code == 422 and ('test failed' in message or ('testing value' in message and 'failed' in message))
+
+
+class BatchPatchEngine:
+    """
+    Class for patching many Kubernetes resources concurrently over one shared connection pool.
+    """
+
+    @staticmethod
+    def _patch_one(target, patch_type, optimistic, max_conflict_retries, headers):
+        resource_data = load_manifest(target.resource)
+        kind = resource_data.get("kind")
+        name = resource_data.get("metadata", {}).get("name")
+        namespace = resource_data.get("metadata", {}).get("namespace")
+        url = KubernetesResourceManager.get_resource_url(resource_data)
+        session = KubernetesResourceManager.get_http_session()
+
+        started = time.perf_counter()
+        attempts = 0
+        status_code = None
+        error = None
+
+        while attempts <= max_conflict_retries:
+            attempts += 1
+            try:
+                patch = target.patch
+                if optimistic or callable(patch):
+                    live_response = session.get(url, headers=headers)
+                    if live_response.status_code != 200:
+                        status_code, error = live_response.status_code, live_response.text
+                        break
+                    live_data = live_response.json()
+                    if callable(patch):
+                        patch = patch(live_data)
+
+                if optimistic:
+                    resource_version = live_data["metadata"]["resourceVersion"]
+                    if patch_type == 'merge':
+                        patch = dict(patch, metadata=dict(patch.get('metadata', {}), resourceVersion=resource_version))
+                    else:
+                        patch = [{"op": "test", "path": "/metadata/resourceVersion", "value": resource_version}] + \
+                                list(patch)
+
+                response = session.patch(url, data=json.dumps(patch),
+                                         headers=dict(headers, **{'Content-Type': PATCH_CONTENT_TYPES[patch_type]}))
+                status_code = response.status_code
+
+                if response.status_code == 200:
+                    error = None
+                    break
+                error = response.text
+                if not (optimistic and is_conflict(response.status_code, response.text)):
+                    break
+                # Another writer changed the object; back off briefly and retry on the fresh version
+                time.sleep(random.uniform(0, 0.05 * attempts))
+            except Exception as e:
+                error = str(e)
+                break
+
+        return PatchResult(kind, name, namespace, status_code, attempts, time.perf_counter() - started, error)
+
+    @staticmethod
+    def patch_many(targets, patch_type="json", max_workers=None, optimistic=True, max_conflict_retries=5,
+                   raise_on_error=False):
+        """
+        Patches every (resource, patch) target over a bounded worker pool and returns a BatchPatchSummary.
+        With optimistic=True every patch is guarded by the resourceVersion read just before it and retried
+        on conflict, re-evaluating callable patches against the fresh object.
+        """
+        if patch_type not in PATCH_CONTENT_TYPES:
+            raise ValueError(f"Unsupported patch type '{patch_type}', expected one of {list(PATCH_CONTENT_TYPES)}")
+
+        max_workers = max_workers or config_data.get('k8s', {}).get('connection_pool_size', 32)
+        headers = {'Authorization': f"Bearer {KubernetesResourceManager.get_admin_token()}"}
+        targets = [target if isinstance(target, PatchTarget) else PatchTarget(*target) for target in targets]
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(LoggerManager.with_test_id(
+                lambda target: BatchPatchEngine._patch_one(target, patch_type, optimistic,
+                                                           max_conflict_retries, headers)),
+                targets))
+        elapsed = time.perf_counter() - started
+
+        failed = [result for result in results if result.error is not None]
+        latencies = [result.latency for result in results]
+        summary = BatchPatchSummary(
+            results=results,
+            total=len(results),
+            succeeded=len(results) - len(failed),
+            failed=len(failed),
+            conflicts_retried=sum(result.attempts - 1 for result in results),
+            elapsed=elapsed,
+            throughput=len(results) / elapsed if elapsed else 0.0,
+            latency_p50=percentile(latencies, 50),
+            latency_p95=percentile(latencies, 95),
+        )
+
+        logger.info("Patched %s/%s resources in %.2fs (%.1f/s, p50 %.0fms, p95 %.0fms, %s conflict retries)",
+                    summary.succeeded, summary.total, elapsed, summary.throughput, summary.latency_p50 * 1000,
+                    summary.latency_p95 * 1000, summary.conflicts_retried)
+        for result in failed:
+            logger.error("Failed to patch '%s' named '%s'. Status code: %s, error: %s",
+                         result.kind, result.name, result.status_code, result.error)
+
+        if failed and raise_on_error:
+            raise BatchPatchError(summary)
+        return summary
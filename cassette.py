@@ -0,0 +1,343 @@
+import gzip
+import json
+import os
+import re
+import threading
+from datetime import timedelta
+from types import SimpleNamespace
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from kubernetes import client
+from kubernetes.client.exceptions import ApiException
+
+from config_loader import ConfigLoader
+from credentials import CredentialProvider
+from k8s import KubernetesResourceManager
+from logger import LoggerManager
+
+config_data = ConfigLoader.load_config()
+
+# Setup logger
+logger = LoggerManager.get_logger(config_data, 'k8s')
+
+CASSETTE_MODES = ('record', 'replay')
+
+# Query parameters that differ between a recording and its replay and are left out of request matching
+VOLATILE_PARAMS = ('resourceVersion', 'timeoutSeconds')
+
+# Cassette of the calls made outside any test, e.g. while the runner fingerprints the suite
+SESSION_CASSETTE = '_session'
+
+# base64 of 'REDACTED', so redacted Secret data still decodes
+REDACTED_DATA = 'UkVEQUNURUQ='
+
+REPLAY_TOKEN = 'cassette-replay'
+
+
+class CassetteMissError(Exception):
+    """Raised in replay mode for a request that no cassette recorded."""
+
+    def __init__(self, method, path, test_id):
+        super().__init__(f"No recorded response for {method} {path} (test {test_id or 'none'})")
+        self.method = method
+        self.path = path
+
+
+def request_key(method, url, query_params=None):
+    """Matching key of a request: the method and the path with sorted, non-volatile query parameters."""
+    parts = urlsplit(url)
+    params = sorted((key, str(value)) for key, value in parse_qsl(parts.query) + list(query_params or [])
+                    if key not in VOLATILE_PARAMS)
+    return f"{method.upper()} {parts.path}{'?' + urlencode(params) if params else ''}"
+
+
+def _redact_object(resource, kind=None):
+    if not isinstance(resource, dict):
+        return resource
+    kind = resource.get('kind') or kind
+    if isinstance(resource.get('items'), list):
+        # Items of a list response carry no kind of their own, e.g. a SecretList
+        item_kind = (kind or '').rsplit('List', 1)[0]
+        resource['items'] = [_redact_object(item, item_kind) for item in resource['items']]
+    if isinstance(resource.get('object'), dict):
+        # Watch events wrap the object
+        resource['object'] = _redact_object(resource['object'])
+    metadata = resource.get('metadata')
+    if isinstance(metadata, dict):
+        # Field ownership is never asserted on and makes up most of an object's size
+        metadata.pop('managedFields', None)
+    if kind == 'Secret':
+        resource['data'] = {key: REDACTED_DATA for key in resource.get('data') or {}}
+        if 'stringData' in resource:
+            resource['stringData'] = {key: 'REDACTED' for key in resource['stringData'] or {}}
+        if isinstance(metadata, dict):
+            (metadata.get('annotations') or {}).pop('kubectl.kubernetes.io/last-applied-configuration', None)
+    return resource
+
+
+def redact(text):
+    """Redacts Secret data and strips managedFields from a JSON response body; other bodies are kept."""
+    if not text:
+        return text
+    try:
+        document = json.loads(text)
+    except ValueError:
+        return re.sub(r'(?i)(bearer\s+)[\w.-]+', r'\1REDACTED', text)
+    return json.dumps(_redact_object(document), separators=(',', ':'))
+
+
+def cassette_path(cassette_dir, test_id):
+    return os.path.join(cassette_dir, f"{test_id or SESSION_CASSETTE}.json.gz")
+
+
+class _RecordingStream:
+    """Wraps a streamed response, recording every watch line the caller reads."""
+
+    def __init__(self, response, interaction):
+        self._response = response
+        self._interaction = interaction
+        self._buffer = ''
+
+    def iter_lines(self, *args, **kwargs):
+        for line in self._response.iter_lines(*args, **kwargs):
+            if line:
+                self._interaction['stream'].append(redact(line.decode('utf-8') if isinstance(line, bytes) else line))
+            yield line
+
+    def stream(self, *args, **kwargs):
+        # urllib3 responses of the dynamic client's watches are read in chunks that may split lines
+        for chunk in self._response.stream(*args, **kwargs):
+            self._buffer += chunk.decode('utf-8') if isinstance(chunk, bytes) else chunk
+            *lines, self._buffer = self._buffer.split('\n')
+            self._interaction['stream'].extend(redact(line) for line in lines if line)
+            yield chunk
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+
+class _ReplayResponse:
+    """A recorded response of the raw session, with the parts of the requests/httpx API the managers use."""
+
+    def __init__(self, method, url, interaction):
+        self.status_code = interaction['status']
+        self.reason = interaction.get('reason')
+        self.text = interaction.get('body') or ''
+        self.content = self.text.encode('utf-8')
+        self.headers = {'Content-Type': 'application/json'}
+        self.url = url
+        self.request = SimpleNamespace(method=method, url=url)
+        self.elapsed = timedelta(0)
+        self.ok = self.status_code < 400
+        self._stream = interaction.get('stream') or []
+
+    def json(self):
+        return json.loads(self.text)
+
+    def iter_lines(self, *args, **kwargs):
+        yield from self._stream
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.HTTPError(f"{self.status_code} {self.reason} for url: {self.url}", response=self)
+
+    def close(self):
+        pass
+
+
+class _ReplayRESTResponse:
+    """A recorded response of the ApiClient's REST client; streamed ones replay their watch lines."""
+
+    def __init__(self, interaction):
+        self.status = interaction['status']
+        self.reason = interaction.get('reason')
+        self.data = interaction.get('body') or ''
+        self._stream = interaction.get('stream') or []
+
+    def getheaders(self):
+        return {'Content-Type': 'application/json'}
+
+    def getheader(self, name, default=None):
+        return self.getheaders().get(name, default)
+
+    def stream(self, *args, **kwargs):
+        for line in self._stream:
+            yield f"{line}\n".encode('utf-8')
+
+    def close(self):
+        pass
+
+    def release_conn(self):
+        pass
+
+
+class _ReplayCredentials(CredentialProvider):
+    """Credentials of a replayed run: no kubeconfig, no credential plugin, no certificates."""
+
+    def _load_configuration(self):
+        self._configuration = client.Configuration(host=KubernetesResourceManager.get_cluster_uri() or None)
+        self._token_source = lambda: (REPLAY_TOKEN, None)
+
+
+class CassetteSession:
+    """
+    Session standing in for the shared raw session: in record mode it forwards to the real session and
+    records every exchange, in replay mode it answers from the cassettes without any network access.
+    """
+
+    def __init__(self, cassette, session=None):
+        self._cassette = cassette
+        self._session = session
+        self.hooks = session.hooks if session is not None else {'response': []}
+
+    def request(self, method, url, params=None, stream=False, **kwargs):
+        if self._session is None:
+            return _ReplayResponse(method, url, self._cassette.replay(method, url, params))
+        response = self._session.request(method, url, params=params, stream=stream, **kwargs)
+        # requests names the status text 'reason', httpx 'reason_phrase'
+        reason = getattr(response, 'reason', None) or getattr(response, 'reason_phrase', None)
+        interaction = self._cassette.record(method, url, params, response.status_code, reason,
+                                            None if stream else response.text, stream)
+        return _RecordingStream(response, interaction) if stream else response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request('PATCH', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+
+
+class Cassette:
+    """
+    Class for recording every Kubernetes API exchange of a run, raw session calls, dynamic client calls and
+    watch streams, into one compact cassette per test, and for replaying them without a cluster.
+    Requests match on method, path and query; repeated identical requests are answered in recorded order,
+    the last answer being repeated for extra polls. A test's own cassette is searched first, then every other
+    cassette, since discovery and plural lookups are cached per process and recorded by whichever test ran first.
+    Secret data, bearer tokens and managedFields are never written. It is a test result listener, so each
+    test's cassette is written as soon as the test finishes.
+    """
+
+    def __init__(self, mode, cassette_dir):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Unsupported cassette mode '{mode}', expected one of {list(CASSETTE_MODES)}")
+        self.mode = mode
+        self.cassette_dir = cassette_dir
+        self._recorded = {}
+        self._replay = {}
+        self._lock = threading.Lock()
+
+    def install(self):
+        """Routes the shared session and ApiClient through the cassette; call before any API access."""
+        discovery_cache_file = os.path.join(self.cassette_dir, 'discovery.json')
+        if self.mode == 'record':
+            os.makedirs(self.cassette_dir, exist_ok=True)
+            # Rebuilt from this cluster, so it matches the recorded discovery
+            if os.path.exists(discovery_cache_file):
+                os.remove(discovery_cache_file)
+            session = CassetteSession(self, KubernetesResourceManager.get_http_session())
+        else:
+            self._load()
+            CredentialProvider.install(_ReplayCredentials())
+            session = CassetteSession(self)
+        self._wrap_rest_client(CredentialProvider.get().get_api_client().rest_client)
+        KubernetesResourceManager.reset_clients(session, discovery_cache_file)
+        logger.info("Cassette %s mode, cassettes in %s", self.mode, self.cassette_dir)
+        return self
+
+    def _wrap_rest_client(self, rest_client):
+        request = rest_client.request
+
+        def cassette_request(method, url, query_params=None, *args, **kwargs):
+            if self.mode == 'replay':
+                response = _ReplayRESTResponse(self.replay(method, url, query_params))
+                if kwargs.get('_preload_content', True) and not 200 <= response.status <= 299:
+                    raise ApiException(http_resp=response)
+                return response
+            try:
+                response = request(method, url, query_params, *args, **kwargs)
+            except ApiException as e:
+                self.record(method, url, query_params, e.status, e.reason, e.body, False)
+                raise
+            streamed = not kwargs.get('_preload_content', True)
+            interaction = self.record(method, url, query_params, response.status, response.reason,
+                                      None if streamed else response.data, streamed)
+            return _RecordingStream(response, interaction) if streamed else response
+
+        rest_client.request = cassette_request
+
+    def record(self, method, url, params, status, reason, body, streamed):
+        interaction = {'request': request_key(method, url, params.items() if isinstance(params, dict) else params),
+                       'status': status, 'reason': reason,
+                       'body': redact(body.decode('utf-8') if isinstance(body, bytes) else body),
+                       'stream': [] if streamed else None}
+        with self._lock:
+            self._recorded.setdefault(LoggerManager.get_test_id(), []).append(interaction)
+        return interaction
+
+    def replay(self, method, url, params):
+        key = request_key(method, url, params.items() if isinstance(params, dict) else params)
+        test_id = LoggerManager.get_test_id()
+        with self._lock:
+            for cassette in (test_id, None):
+                recorded = self._replay.get(cassette, {}).get(key)
+                if recorded:
+                    interactions, served = recorded
+                    recorded[1] = served + 1
+                    return interactions[min(served, len(interactions) - 1)]
+        raise CassetteMissError(method, key, test_id)
+
+    def _load(self):
+        """Indexes every cassette by request; None holds the pool of all cassettes."""
+        if not os.path.isdir(self.cassette_dir):
+            raise FileNotFoundError(f"No cassettes in {self.cassette_dir}, record them first with --record")
+        for file_name in sorted(os.listdir(self.cassette_dir)):
+            if not file_name.endswith('.json.gz'):
+                continue
+            with gzip.open(os.path.join(self.cassette_dir, file_name), 'rt') as f:
+                cassette = json.load(f)
+            # The session cassette has no test, so it is the pool's own and indexed once
+            owners = (cassette['test'], None) if cassette['test'] is not None else (None,)
+            for interaction in cassette['interactions']:
+                for owner in owners:
+                    self._replay.setdefault(owner, {}).setdefault(interaction['request'], [[], 0])[0].append(
+                        interaction)
+
+    def save(self, test_id=None):
+        """Writes the cassette of a test, or of the calls made outside any test, with everything recorded so far."""
+        with self._lock:
+            interactions = list(self._recorded.get(test_id, []))
+        if not interactions:
+            return
+        with gzip.open(cassette_path(self.cassette_dir, test_id), 'wt') as f:
+            json.dump({'test': test_id, 'interactions': interactions}, f, separators=(',', ':'))
+
+    def start_test(self, test):
+        pass
+
+    def stop_test(self, test):
+        if self.mode == 'record':
+            # Watches of the test's worker threads can still be streaming; stop() rewrites the cassette with them
+            self.save(test.id())
+
+    def stop(self):
+        """Writes the remaining cassettes, including the calls made outside any test."""
+        if self.mode == 'record':
+            with self._lock:
+                owners = list(self._recorded)
+            for test_id in owners:
+                self.save(test_id)
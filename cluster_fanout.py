@@ -0,0 +1,108 @@
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import path_searcher as path_builder
+from config_loader import CLUSTER_ENV_VAR, ConfigLoader
+from logger import LoggerManager
+from result_recorder import read_report, write_report
+
+config_data = ConfigLoader.load_config()
+
+# Setup logger
+logger = LoggerManager.get_logger(config_data, 'runner')
+
+
+class ClusterFanOut:
+    """
+    Class for running the suite against several cluster targets concurrently and merging the results.
+    Every target runs in its own process, so clients, connection pools and credentials never mix.
+    """
+
+    @staticmethod
+    def run_cluster(cluster_name, runner_args, output_dir, env_overrides=None):
+        """
+        Runs the suite against one cluster target and returns its report. runner_args are the flags of the run,
+        or a function returning them for the target's name. env_overrides replaces the cluster selection,
+        e.g. with a version matrix entry.
+        """
+        if callable(runner_args):
+            runner_args = runner_args(cluster_name)
+        report_path = os.path.join(output_dir, f"{cluster_name}.json")
+        log_path = os.path.join(output_dir, f"{cluster_name}.log")
+        command = [sys.executable, os.path.join(path_builder.get_project_root_path(), 'run_tests.py'),
+                   '--report', report_path, *runner_args]
+        env = dict(os.environ, **(env_overrides or {CLUSTER_ENV_VAR: cluster_name}))
+
+        started = time.monotonic()
+        with open(log_path, 'w') as log_file:
+            exit_code = subprocess.call(command, env=env, stdout=log_file, stderr=subprocess.STDOUT,
+                                        cwd=path_builder.get_project_root_path())
+        duration = time.monotonic() - started
+
+        tests = read_report(report_path)['tests'] if os.path.exists(report_path) else []
+        logger.info("Cluster '%s' finished in %.1fs with exit code %s, log: %s",
+                    cluster_name, duration, exit_code, log_path)
+        return {'cluster': cluster_name, 'exit_code': exit_code, 'duration': duration, 'log': log_path,
+                'tests': tests}
+
+    @staticmethod
+    def run(cluster_names=None, runner_args=(), output_dir=None):
+        """
+        Runs the suite against every cluster target concurrently and writes one merged report.
+        runner_args are passed to run_cluster.
+        """
+        targets = ConfigLoader.get_cluster_targets(config_data)
+        cluster_names = cluster_names or list(targets)
+        if not cluster_names:
+            raise ValueError("No cluster targets to run against, add them under 'clusters' in config.yaml")
+        unknown = [name for name in cluster_names if name not in targets]
+        if unknown:
+            raise ValueError(f"Unknown cluster targets {unknown}, expected some of {sorted(targets)}")
+
+        output_dir = output_dir or os.path.join(path_builder.get_project_root_path(), 'reports', 'clusters')
+        os.makedirs(output_dir, exist_ok=True)
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=len(cluster_names)) as executor:
+            cluster_reports = list(executor.map(
+                lambda name: ClusterFanOut.run_cluster(name, runner_args, output_dir), cluster_names))
+
+        merged = ClusterFanOut.merge_reports(cluster_reports)
+        merged['duration'] = time.monotonic() - started
+        write_report(merged['tests'], os.path.join(output_dir, 'merged.json'),
+                     clusters=merged['clusters'], duration=merged['duration'])
+        return merged
+
+    @staticmethod
+    def merge_reports(cluster_reports):
+        """Merges per-cluster reports into one test x cluster outcome table."""
+        tests = {}
+        for cluster_report in cluster_reports:
+            for record in cluster_report['tests']:
+                entry = tests.setdefault(record['test'], {'test': record['test'], 'clusters': {}})
+                entry['clusters'][cluster_report['cluster']] = {
+                    key: record[key] for key in ('outcome', 'duration', 'detail')}
+
+        return {
+            'clusters': {report['cluster']: {key: report[key] for key in ('exit_code', 'duration', 'log')}
+                         for report in cluster_reports},
+            'tests': sorted(tests.values(), key=lambda entry: entry['test']),
+        }
+
+    @staticmethod
+    def format_report(merged):
+        """Formats a merged report as a plain-text table."""
+        cluster_names = list(merged['clusters'])
+        width = max([len(entry['test']) for entry in merged['tests']] + [4])
+        lines = ["test".ljust(width) + "".join(f"  {name:>16}" for name in cluster_names)]
+        for entry in merged['tests']:
+            cells = []
+            for name in cluster_names:
+                result = entry['clusters'].get(name)
+                cells.append(f"  {result['outcome']:>8} {result['duration']:6.1f}s" if result else f"  {'-':>16}")
+            lines.append(entry['test'].ljust(width) + "".join(cells))
+        lines.append(f"Total wall time: {merged['duration']:.1f}s")
+        return "\n".join(lines)
@@ -1,7 +1,18 @@
+import os
+import uuid
 import yaml
 import path_searcher as path_builder
 from logger import LoggerManager
 
+# Name of the entry under 'clusters' that overrides the 'k8s' section, set per process by the fan-out runner
+CLUSTER_ENV_VAR = 'CROSSPLANE_TESTS_CLUSTER'
+
+# Name of the entry under 'matrix' (a cluster target plus a Crossplane chart version), set by the matrix runner
+MATRIX_ENV_VAR = 'CROSSPLANE_TESTS_MATRIX_ENTRY'
+
+# Identifier of the current run, inherited by child processes so a fanned-out run shares one id
+RUN_ID_ENV_VAR = 'CROSSPLANE_TESTS_RUN_ID'
+
 
 class ConfigLoader:
 
@@ -14,13 +25,63 @@ class ConfigLoader:
             with open(config_file, 'r') as f:
                 config_data = yaml.safe_load(f)
 
+            cluster_name = os.environ.get(CLUSTER_ENV_VAR)
+            if cluster_name:
+                ConfigLoader.apply_cluster_target(config_data, cluster_name)
+            matrix_entry = os.environ.get(MATRIX_ENV_VAR)
+            if matrix_entry:
+                ConfigLoader.apply_matrix_entry(config_data, matrix_entry)
+
             # Initialize logger with the config data
-            logger = LoggerManager.get_logger(config_data)
+            logger = LoggerManager.get_logger(config_data, 'config')
 
             return config_data
         except Exception as e:
             if 'logger' in locals():
-                logger.error(f"Failed to load config from {config_file}: {e}")
+                logger.error("Failed to load config from %s: %s", config_file, e)
             else:
                 print(f"Failed to load config from {config_file}: {e}")
             raise
+
+    @staticmethod
+    def get_run_id():
+        """Returns the id of the current run, generating one on first use."""
+        if not os.environ.get(RUN_ID_ENV_VAR):
+            os.environ[RUN_ID_ENV_VAR] = uuid.uuid4().hex[:12]
+        return os.environ[RUN_ID_ENV_VAR]
+
+    @staticmethod
+    def get_cluster_targets(config_data):
+        """Returns the cluster targets declared under 'clusters', keyed by name."""
+        return {cluster['name']: cluster for cluster in config_data.get('clusters') or []}
+
+    @staticmethod
+    def apply_cluster_target(config_data, cluster_name):
+        """Overlays the connection settings of a cluster target onto the 'k8s' section."""
+        targets = ConfigLoader.get_cluster_targets(config_data)
+        if cluster_name not in targets:
+            raise ValueError(f"Unknown cluster target '{cluster_name}', expected one of {sorted(targets)}")
+
+        overrides = {key: value for key, value in targets[cluster_name].items() if key != 'name'}
+        config_data['k8s'] = dict(config_data.get('k8s') or {}, **overrides)
+        config_data['k8s']['cluster_name'] = cluster_name
+        return config_data
+
+    @staticmethod
+    def get_matrix_entries(config_data):
+        """Returns the version matrix entries declared under 'matrix', keyed by name."""
+        return {entry['name']: entry for entry in config_data.get('matrix') or []}
+
+    @staticmethod
+    def apply_matrix_entry(config_data, entry_name):
+        """Applies a matrix entry: its cluster target, and its chart version and values onto the 'helm' section."""
+        entries = ConfigLoader.get_matrix_entries(config_data)
+        if entry_name not in entries:
+            raise ValueError(f"Unknown matrix entry '{entry_name}', expected one of {sorted(entries)}")
+
+        entry = entries[entry_name]
+        ConfigLoader.apply_cluster_target(config_data, entry['cluster'])
+        config_data['helm'] = dict(config_data.get('helm') or {}, version=entry['version'],
+                                   values=entry.get('values') or {})
+        config_data['k8s']['cluster_name'] = entry_name
+        return config_data
@@ -0,0 +1,220 @@
+import base64
+import copy
+import json
+import os
+import subprocess
+import threading
+import time
+from datetime import datetime
+
+import yaml
+from kubernetes import client, config
+
+from config_loader import ConfigLoader
+from logger import LoggerManager
+
+config_data = ConfigLoader.load_config()
+
+# Setup logger
+logger = LoggerManager.get_logger(config_data, 'k8s')
+
+# Tokens without a known expiry (token files without an 'exp' claim) are re-read this often, in seconds
+DEFAULT_TOKEN_RELOAD_INTERVAL = 300
+
+
+def _parse_timestamp(timestamp):
+    if not timestamp:
+        return None
+    return datetime.fromisoformat(timestamp.replace('Z', '+00:00')).timestamp()
+
+
+def _jwt_expiry(token):
+    """Returns the 'exp' claim of a JWT bearer token, or None if the token is not a JWT."""
+    try:
+        payload = token.split('.')[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+        return float(claims['exp'])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+def _kubeconfig_user(kubeconfig, kubecontext=None):
+    """Returns the 'user' section of the kubeconfig entry used by the given (or current) context."""
+    context_name = kubecontext or kubeconfig.get('current-context')
+    context = next((entry['context'] for entry in kubeconfig.get('contexts') or []
+                    if entry['name'] == context_name), {})
+    return next((entry.get('user') or {} for entry in kubeconfig.get('users') or []
+                 if entry['name'] == context.get('user')), {})
+
+
+def _run_exec_plugin(exec_config):
+    """Runs a client-go credential plugin and returns the (token, expiry) of its ExecCredential."""
+    env = dict(os.environ, **{item['name']: item['value'] for item in exec_config.get('env') or []})
+    env['KUBERNETES_EXEC_INFO'] = json.dumps({
+        'apiVersion': exec_config.get('apiVersion', 'client.authentication.k8s.io/v1'),
+        'kind': 'ExecCredential',
+        'spec': {'interactive': False},
+    })
+    command = [exec_config['command']] + list(exec_config.get('args') or [])
+    output = subprocess.run(command, env=env, capture_output=True, check=True, timeout=60).stdout
+    status = json.loads(output).get('status') or {}
+    return status.get('token'), _parse_timestamp(status.get('expirationTimestamp'))
+
+
+class CredentialProvider:
+    """
+    Class that owns the cluster credentials shared by the Kubernetes clients and the raw REST session.
+    The kubeconfig is parsed once, and bearer tokens are cached and refreshed in the background shortly
+    before they expire, so API calls never wait for a credential plugin or a file read.
+    Token sources, in order: k8s.token_file, the kubeconfig user's exec plugin, OIDC auth-provider or tokenFile,
+    k8s.admin-token, then whatever the kubeconfig loader resolved (static token, client certificates).
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, k8s_config=None):
+        k8s_config = k8s_config if k8s_config is not None else config_data.get('k8s', {})
+        self.kubeconfig_path = os.path.expanduser(k8s_config.get('kubeconfig_path')
+                                                  or config.KUBE_CONFIG_DEFAULT_LOCATION)
+        self.kubecontext = k8s_config.get('kubecontext') or None
+        self.token_file = k8s_config.get('token_file')
+        self.static_token = k8s_config.get('admin-token')
+        self.refresh_margin = k8s_config.get('token_refresh_margin', 60)
+        self._loaded = False
+        self._configuration = None
+        self._kubeconfig_loader = None
+        self._api_client = None
+        self._token = None
+        self._expiry = None
+        self._token_source = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._refresher = None
+
+    @staticmethod
+    def get():
+        """Returns the process-wide credential provider, creating it on first use."""
+        if CredentialProvider._instance is None:
+            with CredentialProvider._instance_lock:
+                if CredentialProvider._instance is None:
+                    CredentialProvider._instance = CredentialProvider()
+        return CredentialProvider._instance
+
+    @staticmethod
+    def install(provider):
+        """Replaces the process-wide credential provider, e.g. with offline credentials for a replayed run."""
+        with CredentialProvider._instance_lock:
+            if CredentialProvider._instance is not None:
+                CredentialProvider._instance.stop()
+            CredentialProvider._instance = provider
+
+    def _load_configuration(self):
+        configuration = client.Configuration()
+        user = {}
+        if os.path.exists(self.kubeconfig_path):
+            with open(self.kubeconfig_path, 'r') as f:
+                kubeconfig = yaml.safe_load(f) or {}
+            user = _kubeconfig_user(kubeconfig, self.kubecontext)
+            if user.get('exec'):
+                # The plugin runs in the first refresh; left in, the loader would run it once more at startup
+                kubeconfig = copy.deepcopy(kubeconfig)
+                _kubeconfig_user(kubeconfig, self.kubecontext).pop('exec')
+            # Kept, so the OIDC tokens it renews (and the identity provider may rotate) are reused by later refreshes
+            self._kubeconfig_loader = config.kube_config.KubeConfigLoader(
+                config_dict=kubeconfig, active_context=self.kubecontext,
+                config_base_path=os.path.dirname(self.kubeconfig_path))
+            self._kubeconfig_loader.load_and_set(configuration)
+        self._configuration = configuration
+
+        if self.token_file:
+            self._token_source = self._read_token_file
+        elif user.get('exec'):
+            self._token_source = lambda: _run_exec_plugin(user['exec'])
+        elif (user.get('auth-provider') or {}).get('name') == 'oidc':
+            self._token_source = self._load_oidc_token
+        elif user.get('tokenFile'):
+            self.token_file = user['tokenFile']
+            self._token_source = self._read_token_file
+        elif self.static_token:
+            self._token_source = lambda: (self.static_token, None)
+        else:
+            # Static kubeconfig token, or client certificates and no token at all
+            token = configuration.api_key.get('authorization', '')
+            token = token[len('Bearer '):] if token.startswith('Bearer ') else token
+            self._token_source = lambda: (token, None)
+
+    def _read_token_file(self):
+        with open(self.token_file, 'r') as f:
+            token = f.read().strip()
+        return token, _jwt_expiry(token) or time.time() + DEFAULT_TOKEN_RELOAD_INTERVAL
+
+    def _load_oidc_token(self):
+        # The loader renews the id token with the refresh token once it expires within 5 minutes
+        configuration = client.Configuration()
+        self._kubeconfig_loader.load_and_set(configuration)
+        token = configuration.api_key.get('authorization', '')[len('Bearer '):]
+        return token, _jwt_expiry(token)
+
+    def _refresh(self):
+        token, expiry = self._token_source()
+        self._token, self._expiry = token, expiry
+        if token:
+            self._configuration.api_key['authorization'] = f"Bearer {token}"
+        logger.debug("Refreshed cluster credentials, expiring in %ss.",
+                     round(expiry - time.time()) if expiry else 'never')
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._load_configuration()
+            self._refresh()
+            self._loaded = True
+            if self._expiry is not None:
+                self._refresher = threading.Thread(target=self._refresh_loop, name='credential-refresh',
+                                                   daemon=True)
+                self._refresher.start()
+
+    def _refresh_loop(self):
+        while not self._stopped.is_set():
+            delay = max(1.0, self._expiry - self.refresh_margin - time.time()) if self._expiry else None
+            if delay is None or self._stopped.wait(delay):
+                return
+            try:
+                with self._lock:
+                    self._refresh()
+            except Exception as e:
+                logger.warning("Failed to refresh cluster credentials, retrying: %s", e)
+                self._stopped.wait(5)
+
+    def get_token(self):
+        """Returns the cached bearer token; only an already expired token is refreshed in the caller's thread."""
+        self._ensure_loaded()
+        if self._expiry is not None and time.time() >= self._expiry:
+            with self._lock:
+                if time.time() >= self._expiry:
+                    self._refresh()
+        return self._token
+
+    def get_api_client(self):
+        """Returns the ApiClient shared by every Kubernetes client, authenticated with the cached token."""
+        self._ensure_loaded()
+        if self._api_client is None:
+            with self._lock:
+                if self._api_client is None:
+                    # Replaces the kubeconfig loader's hook, which re-runs the credential plugin on the calling thread
+                    self._configuration.refresh_api_key_hook = lambda configuration: self.get_token()
+                    self._api_client = client.ApiClient(self._configuration)
+        return self._api_client
+
+    def get_client_certificate(self):
+        """Returns the (cert file, key file) pair of certificate-based kubeconfig users, or None."""
+        self._ensure_loaded()
+        if self._configuration.cert_file and self._configuration.key_file:
+            return self._configuration.cert_file, self._configuration.key_file
+        return None
+
+    def stop(self):
+        self._stopped.set()
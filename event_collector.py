@@ -0,0 +1,219 @@
+import os
+import threading
+import time
+import yaml
+from collections import deque
+
+import path_searcher as path_builder
+from config_loader import ConfigLoader
+from fingerprint import TestFingerprint
+from k8s import KubernetesResourceManager
+from logger import LoggerManager
+from manifest_templates import ManifestTemplates
+from tracer import LifecycleTracer
+
+config_data = ConfigLoader.load_config()
+manifests_path = path_builder.get_manifest_path()
+
+# Setup logger
+logger = LoggerManager.get_logger(config_data, 'events')
+
+# events.k8s.io serves every Event, including the core/v1 ones Crossplane and the providers record
+EVENTS_API_PATH = "apis/events.k8s.io/v1/events"
+
+
+def _event_key(event):
+    regarding = event.get('regarding') or {}
+    return regarding.get('kind'), regarding.get('namespace') or None, regarding.get('name')
+
+
+def _event_version(event):
+    metadata = event.get('metadata', {})
+    return metadata.get('uid'), metadata.get('resourceVersion')
+
+
+def related_kinds(documents):
+    """
+    Returns the kinds of the objects Crossplane creates for a claim or composite kind, e.g. {'DropletClaim':
+    {'XDroplet', 'Droplet'}, 'XDroplet': {'Droplet'}}, read from the XRDs and Compositions among the documents.
+    """
+    composed = {}
+    claim_kinds = {}
+    for document in documents:
+        spec = document.get('spec') or {}
+        if document.get('kind') == 'CompositeResourceDefinition' and spec.get('claimNames'):
+            claim_kinds[spec['claimNames']['kind']] = spec['names']['kind']
+        elif document.get('kind') == 'Composition':
+            composed.setdefault(spec['compositeTypeRef']['kind'], set()).update(
+                resource['base']['kind'] for resource in spec.get('resources') or [] if resource.get('base'))
+    kinds = {kind: set(composed_kinds) for kind, composed_kinds in composed.items()}
+    for claim_kind, composite_kind in claim_kinds.items():
+        kinds[claim_kind] = {composite_kind} | composed.get(composite_kind, set())
+    return kinds
+
+
+def _deduplicate(events):
+    # A MODIFIED event (e.g. a bumped count) is buffered again; keep its latest version only
+    return list({event.get('metadata', {}).get('uid', id(event)): event for event in events}.values())
+
+
+def _event_time(event):
+    return (event.get('eventTime') or event.get('deprecatedLastTimestamp')
+            or event.get('metadata', {}).get('creationTimestamp') or '')
+
+
+class ClusterEventCollector:
+    """
+    Class that watches cluster Events for a whole run, keeping the most recent ones in a bounded ring
+    indexed by involved object, so failing tests can report what happened to their resources.
+    """
+    _instance = None
+
+    def __init__(self, capacity=None, per_object_limit=None):
+        events_config = config_data.get('events') or {}
+        self.capacity = capacity or events_config.get('capacity', 5000)
+        self.per_object_limit = per_object_limit or events_config.get('per_object_limit', 50)
+        self._ring = deque()
+        self._index = {}
+        # (uid, resourceVersion) of the buffered events, so a relist does not buffer the same versions again
+        self._versions = set()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._response = None
+        self._thread = None
+        self._resource_version = None
+
+    @staticmethod
+    def start_session():
+        """Starts the run-wide collector, or returns the one already running."""
+        if ClusterEventCollector._instance is None:
+            collector = ClusterEventCollector()
+            collector.start()
+            ClusterEventCollector._instance = collector
+        return ClusterEventCollector._instance
+
+    @staticmethod
+    def current():
+        """Returns the run-wide collector, or None if events are not being collected."""
+        return ClusterEventCollector._instance
+
+    def start(self):
+        """Lists the existing events once, then keeps watching from that resourceVersion in the background."""
+        self._relist()
+        self._thread = threading.Thread(target=self._watch_loop, name='event-collector', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._response is not None:
+            self._response.close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        if ClusterEventCollector._instance is self:
+            ClusterEventCollector._instance = None
+
+    def _relist(self):
+        response_json = KubernetesResourceManager.send_request_and_get_json_response("GET", EVENTS_API_PATH)
+        for event in sorted(response_json.get('items', []), key=_event_time)[-self.capacity:]:
+            self._add(event)
+        self._resource_version = response_json.get('metadata', {}).get('resourceVersion')
+
+    def _watch_loop(self):
+        while not self._stopped.is_set():
+            try:
+                self._response = KubernetesResourceManager.open_watch(EVENTS_API_PATH, self._resource_version)
+                for watch_event in KubernetesResourceManager.iter_watch_events(self._response):
+                    event = watch_event.get('object', {})
+                    if watch_event.get('type') == 'ERROR':
+                        # 410 Gone: the resourceVersion is too old, start over from a fresh list
+                        if event.get('code') == 410:
+                            self._relist()
+                        break
+                    self._resource_version = event.get('metadata', {}).get('resourceVersion',
+                                                                           self._resource_version)
+                    if watch_event.get('type') in ('ADDED', 'MODIFIED'):
+                        self._add(event)
+                        regarding = event.get('regarding') or {}
+                        LifecycleTracer.instant(f"{regarding.get('kind')}/{regarding.get('name')} "
+                                                f"{event.get('reason')}", 'event', note=event.get('note'))
+            except Exception as e:
+                if self._stopped.is_set():
+                    break
+                logger.warning("Event watch interrupted, reconnecting: %s", e)
+                time.sleep(1)
+            finally:
+                if self._response is not None:
+                    self._response.close()
+
+    def _add(self, event):
+        key = _event_key(event)
+        version = _event_version(event)
+        with self._lock:
+            if version[0] is not None and version in self._versions:
+                return
+            if len(self._ring) >= self.capacity:
+                evicted = self._ring.popleft()
+                self._versions.discard(_event_version(evicted))
+                evicted_key = _event_key(evicted)
+                evicted_events = self._index.get(evicted_key)
+                if evicted_events and evicted_events[0] is evicted:
+                    evicted_events.popleft()
+                if evicted_events is not None and not evicted_events:
+                    del self._index[evicted_key]
+            self._ring.append(event)
+            self._versions.add(version)
+            self._index.setdefault(key, deque(maxlen=self.per_object_limit)).append(event)
+
+    def events_for(self, kind, name, namespace=None, related_kinds=()):
+        """
+        Returns the buffered events of one object, and of the objects of related_kinds whose name starts with
+        the given name, e.g. the composite and managed resources of a claim (see related_kinds()).
+        """
+        with self._lock:
+            matches = []
+            for (event_kind, event_namespace, event_name), events in self._index.items():
+                if namespace is not None and event_namespace not in (None, namespace):
+                    continue
+                if (event_kind == kind and event_name == name) or (event_kind in related_kinds and event_name
+                                                                   and event_name.startswith(f"{name}-")):
+                    matches.extend(events)
+        return sorted(_deduplicate(matches), key=_event_time)
+
+    def events_for_manifest(self, yaml_file_path):
+        """Returns the buffered events of every object described by a manifest file."""
+        with open(yaml_file_path, 'r') as f:
+            documents = [document for document in yaml.safe_load_all(f) if document]
+        return self._events_for_documents(documents)
+
+    def events_for_test(self, test):
+        """
+        Returns the buffered events of the resources in the manifests a test references, under the names
+        ManifestTemplates.generate_for_test gives them for that test.
+        """
+        manifests = [manifest for manifest in TestFingerprint.manifests_for_test(test)
+                     if os.path.exists(os.path.join(manifests_path, manifest))]
+        return self._events_for_documents(ManifestTemplates.generate_for_test(test, *manifests))
+
+    def _events_for_documents(self, documents):
+        kinds = related_kinds(documents)
+        events = []
+        for document in documents:
+            metadata = document.get('metadata', {})
+            events.extend(self.events_for(document.get('kind'), metadata.get('name'), metadata.get('namespace'),
+                                          kinds.get(document.get('kind'), ())))
+        return sorted(_deduplicate(events), key=_event_time)
+
+    def annotate_failure(self, test):
+        """Report annotation for a failed test: the events of its resources."""
+        events = self.events_for_test(test)
+        return {'events': ClusterEventCollector.format_events(events).splitlines()} if events else {}
+
+    @staticmethod
+    def format_events(events):
+        """Formats events like 'kubectl get events' does."""
+        lines = []
+        for event in events:
+            regarding = event.get('regarding') or {}
+            lines.append(f"{_event_time(event)}  {event.get('type', ''):<8} {event.get('reason', ''):<24} "
+                         f"{regarding.get('kind')}/{regarding.get('name')}  {event.get('note', '')}")
+        return "\n".join(lines)
@@ -0,0 +1,219 @@
+import hashlib
+import inspect
+import json
+import os
+import re
+import tempfile
+import unittest
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+import path_searcher as path_builder
+from config_loader import ConfigLoader
+from k8s import KubernetesResourceManager
+from logger import LoggerManager
+from namespace_pool import NamespacePool
+
+config_data = ConfigLoader.load_config()
+manifests_path = path_builder.get_manifest_path()
+
+# Setup logger
+logger = LoggerManager.get_logger(config_data, 'runner')
+
+CACHE_PATH = os.path.join(path_builder.get_project_root_path(), '.test_cache', 'results.json')
+
+CONFIG_PATH = path_builder.get_config_path()
+
+# Manifest references in test sources, e.g. f"{manifests_path}/digital_ocean/digital_ocean_xrd.yaml"
+MANIFEST_REFERENCE = re.compile(r"(?:manifests_path|get_manifest_path\(\))}/([\w./-]+\.ya?ml)")
+
+# Fixtures that create objects from manifests the test source does not name, by the call a test makes to them
+FIXTURE_MANIFESTS = {
+    'NamespacePool.namespace_for': NamespacePool.manifests,
+}
+
+
+def read_json_cache(cache_path):
+    """Reads a JSON cache file, or returns {} if it does not exist or cannot be parsed."""
+    if not os.path.exists(cache_path):
+        return {}
+    with open(cache_path, 'r') as f:
+        try:
+            return json.load(f)
+        except ValueError:
+            logger.warning("Ignoring unreadable cache %s", cache_path)
+            return {}
+
+
+def write_json_cache(cache, cache_path):
+    """Writes a JSON cache file through a temporary file and an atomic rename, so readers never see half of it."""
+    cache_dir = os.path.dirname(cache_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    descriptor, temp_path = tempfile.mkstemp(dir=cache_dir, prefix=f"{os.path.basename(cache_path)}.",
+                                             suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'w') as f:
+            json.dump(cache, f, indent=2, sort_keys=True)
+        os.replace(temp_path, cache_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+@contextmanager
+def update_json_cache(cache_path):
+    """
+    Yields the contents of a JSON cache file for changes and writes them back, holding an exclusive lock on
+    it meanwhile, so fan-out runs updating the same cache at once merge their changes instead of losing them.
+    """
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    with open(f"{cache_path}.lock", 'w') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        cache = read_json_cache(cache_path)
+        yield cache
+        write_json_cache(cache, cache_path)
+
+
+def iterate_tests(suite):
+    """Yields every test case of a possibly nested test suite."""
+    for item in suite:
+        if isinstance(item, unittest.TestSuite):
+            yield from iterate_tests(item)
+        else:
+            yield item
+
+
+def _file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _framework_hash():
+    """Hashes the project's own modules, since a change to a manager can change any test's behaviour."""
+    digest = hashlib.sha256()
+    project_root = path_builder.get_project_root_path()
+    for file_name in sorted(os.listdir(project_root)):
+        if file_name.endswith('.py'):
+            digest.update(_file_hash(os.path.join(project_root, file_name)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _cache_key():
+    # Fan-out runs share one cache file, one section per cluster target
+    return config_data.get('k8s', {}).get('cluster_name', 'default')
+
+
+def _test_source(test):
+    try:
+        return inspect.getsource(getattr(test, test._testMethodName))
+    except (AttributeError, OSError, TypeError):
+        return ''
+
+
+class TestFingerprint:
+    """
+    Class for fingerprinting tests from their source, the manifests they touch, config.yaml and the cluster's
+    Crossplane/provider versions, so unchanged tests can be skipped on re-runs.
+    """
+
+    @staticmethod
+    def manifests_for_test(test):
+        """
+        Returns the manifest paths referenced by a test method, or used by the fixtures it calls,
+        relative to the manifests directory.
+        """
+        source = _test_source(test)
+        manifests = set(MANIFEST_REFERENCE.findall(source))
+        for call, fixture_manifests in FIXTURE_MANIFESTS.items():
+            if call in source:
+                manifests.update(fixture_manifests())
+        return sorted(manifests)
+
+    @staticmethod
+    def get_cluster_versions():
+        """
+        Returns the chart version, the current provider revisions and the framework hash,
+        or None if the cluster cannot be read.
+        """
+        try:
+            response = KubernetesResourceManager.send_request_and_get_response(
+                "GET", "apis/pkg.crossplane.io/v1/providers")
+            if response.status_code != 200:
+                return None
+            revisions = sorted(item.get('status', {}).get('currentRevision', '') for item in response.json()['items'])
+        except Exception as e:
+            logger.warning("Could not read provider revisions, incremental selection is disabled: %s", e)
+            return None
+        return {'chart_version': str(config_data.get('helm', {}).get('version', '')), 'provider_revisions': revisions,
+                'framework': _framework_hash()}
+
+    @staticmethod
+    def compute(test, cluster_versions):
+        """Returns the fingerprint of one test."""
+        digest = hashlib.sha256()
+        digest.update(test.id().encode('utf-8'))
+        digest.update(_test_source(test).encode('utf-8'))
+        for manifest in TestFingerprint.manifests_for_test(test):
+            manifest_path = os.path.join(manifests_path, manifest)
+            content_hash = _file_hash(manifest_path) if os.path.exists(manifest_path) else 'missing'
+            digest.update(f"{manifest}:{content_hash}".encode('utf-8'))
+        # The settings every manager reads, e.g. the pool's manifests or timeouts
+        digest.update(_file_hash(CONFIG_PATH).encode('utf-8'))
+        digest.update(json.dumps(cluster_versions, sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()
+
+    @staticmethod
+    def load_cache(cache_path=CACHE_PATH):
+        return read_json_cache(cache_path)
+
+    @staticmethod
+    def save_cache(cache, cache_path=CACHE_PATH):
+        write_json_cache(cache, cache_path)
+
+    @staticmethod
+    def fingerprint_suite(suite, skip_unchanged=False, cache_path=CACHE_PATH):
+        """
+        Fingerprints every test and, with skip_unchanged, marks tests whose fingerprint matches
+        their last passing run as skipped.
+        Returns {test id: fingerprint}, to be stored with record_results once the run has finished.
+        """
+        cluster_versions = TestFingerprint.get_cluster_versions()
+        if cluster_versions is None:
+            return {}
+
+        cache = TestFingerprint.load_cache(cache_path).get(_cache_key(), {})
+        fingerprints = {}
+        skipped = 0
+        for test in iterate_tests(suite):
+            fingerprint = TestFingerprint.compute(test, cluster_versions)
+            fingerprints[test.id()] = fingerprint
+            previous = cache.get(test.id(), {})
+            if skip_unchanged and previous.get('fingerprint') == fingerprint and previous.get('outcome') == 'passed':
+                setattr(test, test._testMethodName, _skip_unchanged)
+                skipped += 1
+
+        if skip_unchanged:
+            logger.info("Incremental run: skipping %s of %s unchanged tests.", skipped, len(fingerprints))
+        return fingerprints
+
+    @staticmethod
+    def record_results(fingerprints, records, cache_path=CACHE_PATH):
+        """Stores the fingerprint and outcome of every test that actually ran."""
+        if not fingerprints:
+            return
+        with update_json_cache(cache_path) as cache:
+            cluster_cache = cache.setdefault(_cache_key(), {})
+            for record in records:
+                if record['outcome'] == 'skipped' or record['test'] not in fingerprints:
+                    continue
+                cluster_cache[record['test']] = {'fingerprint': fingerprints[record['test']],
+                                                 'outcome': record['outcome']}
+
+
+def _skip_unchanged():
+    raise unittest.SkipTest("unchanged since the last passing run")
@@ -1,6 +1,10 @@
+import asyncio
+import os
+import shutil
 import path_searcher as path_builder
 
 from pyhelm3 import Client
+from pyhelm3.command import Command
 from path_searcher import get_config_path
 from config_loader import ConfigLoader
 from logger import LoggerManager
@@ -10,11 +14,58 @@ config_data = ConfigLoader.load_config()
 manifests_path = path_builder.get_manifest_path()
 
 # Setup logger
-logger = LoggerManager.get_logger(config_data)
+logger = LoggerManager.get_logger(config_data, 'helm')
+
+# Pulled charts, one unpacked directory per chart version, shared by every process of a run
+CHART_CACHE_PATH = os.path.join(path_builder.get_project_root_path(), '.helm_cache')
 
 
 class CrossplaneHelmManager:
 
+    @staticmethod
+    def get_helm_client():
+        """Returns a Helm client for the configured cluster, falling back to the 'k8s' kubeconfig and context."""
+        helm_config_data = config_data.get('helm', {})
+        k8s_config_data = config_data.get('k8s', {})
+        return Client(kubeconfig=helm_config_data.get('kubeconfig_path') or k8s_config_data.get('kubeconfig_path'),
+                      kubecontext=helm_config_data.get('kubecontext') or k8s_config_data.get('kubecontext') or None)
+
+    @staticmethod
+    async def get_cached_chart(chart_name, repo, version):
+        """
+        Returns the chart from the local cache, pulling and unpacking it first if this version was never pulled.
+        Concurrent pulls of the same version are harmless: the first one to finish is kept.
+        """
+        chart_path = os.path.join(CHART_CACHE_PATH, f"{chart_name}-{version}")
+        if not os.path.isdir(chart_path):
+            os.makedirs(CHART_CACHE_PATH, exist_ok=True)
+            pulled_path = await Command(unpack_directory=CHART_CACHE_PATH).pull(chart_name, repo=repo, version=version)
+            try:
+                os.rename(os.path.join(pulled_path, chart_name), chart_path)
+            except OSError:
+                if not os.path.isdir(chart_path):
+                    raise
+            shutil.rmtree(pulled_path, ignore_errors=True)
+            logger.info("Cached chart %s %s in %s", chart_name, version, chart_path)
+        return await CrossplaneHelmManager.get_helm_client().get_chart(chart_path)
+
+    @staticmethod
+    def prefetch_charts(chart_name, repo, versions):
+        """Pulls every given chart version into the cache concurrently."""
+        async def prefetch():
+            await asyncio.gather(*(CrossplaneHelmManager.get_cached_chart(chart_name, repo, version)
+                                   for version in set(versions)))
+        CrossplaneHelmManager.run_sync(prefetch())
+
+    @staticmethod
+    def run_sync(coroutine):
+        """Runs a coroutine on a private event loop, leaving the thread's current loop untouched."""
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coroutine)
+        finally:
+            loop.close()
+
     @staticmethod
     async def install_crossplane_helm_chart():
         """
@@ -22,32 +73,32 @@ class CrossplaneHelmManager:
         """
         helm_config_data = config_data.get('helm', {})
 
-        kubeconfig_path = helm_config_data.get('kubeconfig_path')
         chart_name = helm_config_data.get('chart_name', 'crossplane')
         repo = helm_config_data.get('repo', 'https://charts.crossplane.io/stable')
         version = helm_config_data.get('version', '1.17.2')
         namespace = helm_config_data.get('namespace', 'crossplane-system')
         install_crds = helm_config_data.get('install_crds', True)
+        values = dict({"installCRDs": install_crds}, **(helm_config_data.get('values') or {}))
 
-        helm_client = Client(kubeconfig=kubeconfig_path)
+        helm_client = CrossplaneHelmManager.get_helm_client()
 
         try:
-            chart = await helm_client.get_chart(chart_name, repo=repo, version=version)
+            chart = await CrossplaneHelmManager.get_cached_chart(chart_name, repo, version)
 
             revision = await helm_client.install_or_upgrade_release(
                 chart_name,
                 chart,
-                {"installCRDs": install_crds},
+                values,
                 atomic=True,
                 wait=True,
                 create_namespace=True,
                 namespace=namespace
             )
 
-            logger.info(f"Release {revision.release.name} in namespace {revision.release.namespace} "
-                        f"with revision {revision.revision} is {revision.status}")
+            logger.info("Release %s in namespace %s with revision %s is %s",
+                        revision.release.name, revision.release.namespace, revision.revision, revision.status)
         except Exception as e:
-            logger.error(f"Failed to install or upgrade Helm release: {e}")
+            logger.error("Failed to install or upgrade Helm release: %s", e)
             raise
 
     @staticmethod
@@ -55,16 +106,14 @@ class CrossplaneHelmManager:
         """
         Uninstalls the Crossplane Helm chart from the Kubernetes cluster.
         """
-        k8s_config_data = config_data.get('k8s', {})
-        kubeconfig_path = k8s_config_data.get('kubeconfig_path')
         namespace = config_data.get('helm', {}).get('namespace', 'crossplane-system')
 
-        helm_client = Client(kubeconfig=kubeconfig_path)
+        helm_client = CrossplaneHelmManager.get_helm_client()
 
         try:
-            logger.info(f"Uninstalling release from namespace {namespace}...")
+            logger.info("Uninstalling release from namespace %s...", namespace)
             await helm_client.uninstall_release("crossplane", namespace=namespace)
             logger.info("Release uninstalled successfully.")
         except Exception as e:
-            logger.error(f"Failed to uninstall Helm release: {e}")
+            logger.error("Failed to uninstall Helm release: %s", e)
             raise
@@ -0,0 +1,150 @@
+import copy
+
+
+def _escape(key):
+    return str(key).replace('~', '~0').replace('/', '~1')
+
+
+def _unescape(token):
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def _equal(source, target):
+    """JSON equality: unlike Python, 1 and True or 1 and 1.0 are different values."""
+    if type(source) is not type(target):
+        return False
+    if isinstance(source, dict):
+        return source.keys() == target.keys() and all(_equal(source[key], target[key]) for key in source)
+    if isinstance(source, list):
+        return len(source) == len(target) and all(_equal(a, b) for a, b in zip(source, target))
+    return source == target
+
+
+def _diff(source, target, path, operations, prune):
+    if isinstance(source, dict) and isinstance(target, dict):
+        if prune:
+            for key in source:
+                if key not in target:
+                    operations.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in target.items():
+            key_path = f"{path}/{_escape(key)}"
+            if key not in source:
+                operations.append({"op": "add", "path": key_path, "value": copy.deepcopy(value)})
+            else:
+                _diff(source[key], value, key_path, operations, prune)
+    elif isinstance(source, list) and isinstance(target, list):
+        _diff_list(source, target, path, operations, prune)
+    elif not _equal(source, target):
+        operations.append({"op": "replace", "path": path, "value": copy.deepcopy(target)})
+
+
+def _diff_list(source, target, path, operations, prune):
+    # Trim the common prefix and suffix so a single insertion or removal does not shift every index
+    prefix = 0
+    while prefix < min(len(source), len(target)) and _equal(source[prefix], target[prefix]):
+        prefix += 1
+    suffix = 0
+    while (suffix < min(len(source), len(target)) - prefix
+           and _equal(source[-1 - suffix], target[-1 - suffix])):
+        suffix += 1
+
+    source_middle = source[prefix:len(source) - suffix]
+    target_middle = target[prefix:len(target) - suffix]
+    common = min(len(source_middle), len(target_middle))
+
+    for index in range(common):
+        _diff(source_middle[index], target_middle[index], f"{path}/{prefix + index}", operations, prune)
+    for index in range(common, len(target_middle)):
+        operations.append({"op": "add", "path": f"{path}/{prefix + index}",
+                           "value": copy.deepcopy(target_middle[index])})
+    # Removing at the same index repeatedly drops the trailing items, since every removal shifts the list
+    for _ in range(common, len(source_middle)):
+        operations.append({"op": "remove", "path": f"{path}/{prefix + common}"})
+
+
+def create_json_patch(source, target, prune=True):
+    """
+    Returns the minimal list of JSON patch (RFC 6902) operations turning source into target.
+    With prune=False, keys missing from target are kept, which is what a diff against a live object needs:
+    the API server adds metadata, status and defaulted fields that the manifest never declares.
+    """
+    operations = []
+    _diff(source, target, '', operations, prune)
+    return operations
+
+
+def create_merge_patch(source, target, prune=True):
+    """Returns the JSON merge patch (RFC 7386) turning source into target, or None if they are equal."""
+    if not (isinstance(source, dict) and isinstance(target, dict)):
+        return None if _equal(source, target) else copy.deepcopy(target)
+
+    patch = {}
+    if prune:
+        for key in source:
+            if key not in target:
+                patch[key] = None
+    for key, value in target.items():
+        if key not in source:
+            patch[key] = copy.deepcopy(value)
+        elif isinstance(source[key], dict) and isinstance(value, dict):
+            nested_patch = create_merge_patch(source[key], value, prune)
+            if nested_patch:
+                patch[key] = nested_patch
+        elif not _equal(source[key], value):
+            # Merge patches cannot address list items, so a changed list is sent whole
+            patch[key] = copy.deepcopy(value)
+    return patch
+
+
+def _resolve_parent(document, pointer):
+    tokens = [_unescape(token) for token in pointer.lstrip('/').split('/')]
+    parent = document
+    for token in tokens[:-1]:
+        parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+    return parent, tokens[-1]
+
+
+def apply_json_patch(document, operations):
+    """Applies 'add', 'replace', 'remove' and 'test' operations to a copy of the document."""
+    patched = copy.deepcopy(document)
+    for operation in operations:
+        if operation['path'] == '':
+            if operation['op'] in ('add', 'replace'):
+                patched = copy.deepcopy(operation['value'])
+            continue
+
+        parent, key = _resolve_parent(patched, operation['path'])
+        if isinstance(parent, list):
+            index = len(parent) if key == '-' else int(key)
+            if operation['op'] == 'add':
+                parent.insert(index, copy.deepcopy(operation['value']))
+            elif operation['op'] == 'remove':
+                del parent[index]
+            elif operation['op'] == 'replace':
+                parent[index] = copy.deepcopy(operation['value'])
+            elif operation['op'] == 'test' and not _equal(parent[index], operation['value']):
+                raise ValueError(f"test operation failed at {operation['path']}")
+        elif operation['op'] == 'remove':
+            del parent[key]
+        elif operation['op'] == 'test':
+            if not _equal(parent[key], operation['value']):
+                raise ValueError(f"test operation failed at {operation['path']}")
+        else:
+            if operation['op'] == 'replace' and key not in parent:
+                raise KeyError(operation['path'])
+            parent[key] = copy.deepcopy(operation['value'])
+    return patched
+
+
+def apply_merge_patch(document, patch):
+    """Applies a JSON merge patch to a copy of the document."""
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+
+    patched = copy.deepcopy(document) if isinstance(document, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            patched.pop(key, None)
+        else:
+            patched[key] = apply_merge_patch(patched.get(key), value)
+    return patched
@@ -1,40 +1,149 @@
+import threading
+import time
 import requests
 import yaml
 import json
-from kubernetes import client, config
+from requests.adapters import HTTPAdapter
+from kubernetes import client
 from kubernetes.dynamic import DynamicClient
 from logger import LoggerManager
 from config_loader import ConfigLoader
+from credentials import CredentialProvider
+from json_patch import apply_merge_patch, create_json_patch, create_merge_patch
+from schema_validator import ManifestSchemaValidator
+from tracer import LifecycleTracer
+from transport import Http2Session
 
 config_data = ConfigLoader.load_config()
 
 # Setup logger
-logger = LoggerManager.get_logger(config_data)
+logger = LoggerManager.get_logger(config_data, 'k8s')
+
+# One pooled session shared by every raw REST call, so concurrent callers reuse connections
+_http_session = None
+_http_session_lock = threading.Lock()
+
+# Discovery runs when a DynamicClient is built, so one instance is shared by every caller
+_dynamic_client = None
+_dynamic_client_lock = threading.Lock()
+
+# Guards wrapping the shared ApiClient's REST client for the response observers
+_api_client_lock = threading.Lock()
+
+# Discovery cache of the DynamicClient; None keeps the client's default file in the temp directory
+_discovery_cache_file = None
+
+# (apiVersion, kind) -> plural resource name, filled from discovery one group version at a time
+_plurals = {}
+
+# Label put on every object the managers create, so leftovers of a run can be found afterwards
+RUN_ID_LABEL = 'crossplane-tests/run-id'
+
+
+def log_fields(resource_data, response=None):
+    """Structured logging fields identifying a resource and, if given, the API response about it."""
+    metadata = resource_data.get("metadata") or {}
+    fields = {
+        'gvk': f"{resource_data.get('apiVersion')}/{resource_data.get('kind')}",
+        'resource_name': metadata.get("name"),
+        'namespace': metadata.get("namespace"),
+    }
+    if response is not None:
+        fields['status'] = response.status_code
+        try:
+            fields['latency'] = response.elapsed.total_seconds()
+        except RuntimeError:
+            # httpx only knows the elapsed time of a streamed response once it has been read
+            pass
+    return fields
+
+
+def _notify_response_observers(response, *args, **kwargs):
+    """Session response hook passing the method, URL and latency of every non-streamed call to the observers."""
+    if kwargs.get('stream'):
+        return
+    for observer in KubernetesResourceManager.response_observers:
+        observer(response.request.method, str(response.url), response.elapsed.total_seconds())
+
+
+def _observed_api_client():
+    """Returns the shared ApiClient, with its REST client reporting call latencies to the response observers."""
+    api_client = CredentialProvider.get().get_api_client()
+    rest_client = api_client.rest_client
+    with _api_client_lock:
+        if not getattr(rest_client, 'observed', False):
+            request = rest_client.request
+
+            def observed_request(method, url, *args, **kwargs):
+                started = time.perf_counter()
+                response = request(method, url, *args, **kwargs)
+                # Watches stream without preloading, their duration is not a latency
+                if kwargs.get('_preload_content', True):
+                    for observer in KubernetesResourceManager.response_observers:
+                        observer(method, url, time.perf_counter() - started)
+                return response
+
+            rest_client.request = observed_request
+            rest_client.observed = True
+    return api_client
+
+
+def load_manifest(resource):
+    """Returns the manifest of a resource given either as a YAML file path or as a generated document."""
+    if isinstance(resource, dict):
+        return resource
+    with open(resource, 'r') as f:
+        return yaml.safe_load(f)
+
+
+def describe_manifest(resource):
+    """Names a resource given as a file path or a document, for log messages."""
+    if isinstance(resource, dict):
+        return f"{resource.get('kind')}/{resource.get('metadata', {}).get('name')}"
+    return resource
 
 
 class KubernetesResourceManager:
     """
     Class for managing Kubernetes resources and interacting with the Kubernetes API.
+    Response observers are called with (method, url, seconds) after every API call that is not a watch.
+    Before-create hooks are called with the manifest of every object create_resource_from_yaml creates.
     """
+    response_observers = []
+    before_create_hooks = []
 
     @staticmethod
     def get_dynamic_kubernetes_client():
         """Returns a Dynamic Kubernetes client."""
-        kubeconfig = config_data.get('k8s', {}).get('kubeconfig_path', '')
-        config.load_kube_config(config_file=kubeconfig)
-        return DynamicClient(client.ApiClient())
+        global _dynamic_client
+        if _dynamic_client is None:
+            with _dynamic_client_lock:
+                if _dynamic_client is None:
+                    _dynamic_client = DynamicClient(_observed_api_client(), cache_file=_discovery_cache_file)
+        return _dynamic_client
+
+    @staticmethod
+    def reset_clients(http_session=None, discovery_cache_file=None):
+        """
+        Drops the shared session, dynamic client and plural cache so they are rebuilt on next use, optionally
+        around the given session and with discovery cached in the given file, e.g. to record or replay traffic.
+        """
+        global _http_session, _dynamic_client, _discovery_cache_file
+        with _http_session_lock, _dynamic_client_lock:
+            _http_session = http_session
+            _dynamic_client = None
+            _discovery_cache_file = discovery_cache_file
+            _plurals.clear()
 
     @staticmethod
     def get_default_kubernetes_client():
         """Returns the default Kubernetes client (CoreV1Api)."""
-        kubeconfig = config_data.get('k8s', {}).get('kubeconfig_path', '')
-        config.load_kube_config(config_file=kubeconfig)
-        return client.CoreV1Api()
+        return client.CoreV1Api(_observed_api_client())
 
     @staticmethod
     def get_admin_token():
-        """Fetches the admin token from the config file."""
-        return config_data.get('k8s', {}).get('admin-token', '')
+        """Returns the cached bearer token of the shared credential provider."""
+        return CredentialProvider.get().get_token()
 
     @staticmethod
     def get_cluster_uri():
@@ -42,60 +151,130 @@ class KubernetesResourceManager:
         return config_data.get('k8s', {}).get('cluster-uri', '')
 
     @staticmethod
+    def get_http_session():
+        """
+        Returns the shared HTTP session used for raw requests to the Kubernetes API;
+        with k8s.http2 enabled, requests and watches are multiplexed over HTTP/2.
+        """
+        global _http_session
+        if _http_session is None:
+            with _http_session_lock:
+                if _http_session is None:
+                    pool_size = config_data.get('k8s', {}).get('connection_pool_size', 32)
+                    if config_data.get('k8s', {}).get('http2', False):
+                        _http_session = Http2Session(pool_size, verify=False,
+                                                     cert=CredentialProvider.get().get_client_certificate())
+                        _http_session.hooks['response'].append(_notify_response_observers)
+                        return _http_session
+                    session = requests.Session()
+                    session.verify = False
+                    session.cert = CredentialProvider.get().get_client_certificate()
+                    session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+                    session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+                    session.hooks['response'].append(_notify_response_observers)
+                    _http_session = session
+        return _http_session
+
+    @staticmethod
+    def open_watch(api_path, resource_version=None, timeout_seconds=300, params=None):
+        """
+        Opens a watch on an API collection path and returns the streaming response;
+        read it with iter_watch_events and close it to stop watching.
+        """
+        url = f"{KubernetesResourceManager.get_cluster_uri()}/{api_path.lstrip('/')}"
+        headers = {
+            'Authorization': f"Bearer {KubernetesResourceManager.get_admin_token()}"
+        }
+        watch_params = dict(params or {}, watch='true', allowWatchBookmarks='true', timeoutSeconds=timeout_seconds)
+        if resource_version:
+            watch_params['resourceVersion'] = resource_version
+        response = KubernetesResourceManager.get_http_session().get(url, headers=headers, params=watch_params,
+                                                                    stream=True, timeout=(10, timeout_seconds + 30))
+        if response.status_code >= 400:
+            # A streamed response has no text until its body is read, and the error should carry the Status;
+            # httpx reads it with read(), requests on first access to content
+            if hasattr(response, 'read'):
+                response.read()
+            else:
+                _ = response.content  # requests loads the body into the response on this first access
+            response.close()
+            response.raise_for_status()
+        return response
+
+    @staticmethod
+    def iter_watch_events(response):
+        """Yields the decoded events of a watch response until the server closes it."""
+        for line in response.iter_lines():
+            if line:
+                yield json.loads(line)
+
+    @staticmethod
+    @LifecycleTracer.traced('read')
     def send_request_and_get_response(http_method, api_path):
         """Sends an HTTP request to the Kubernetes API and returns the response."""
         url = f"{KubernetesResourceManager.get_cluster_uri()}/{api_path}"
         headers = {
             'Authorization': f"Bearer {KubernetesResourceManager.get_admin_token()}"
         }
-        response = requests.request(http_method, url, headers=headers, verify=False)
+        response = KubernetesResourceManager.get_http_session().request(http_method, url, headers=headers)
         return response
 
     @staticmethod
+    @LifecycleTracer.traced('read')
     def send_request_and_get_json_response(http_method, api_path):
         """Sends an HTTP request to the Kubernetes API and returns the response as JSON."""
         url = f"{KubernetesResourceManager.get_cluster_uri()}/{api_path}"
         headers = {
             'Authorization': f"Bearer {KubernetesResourceManager.get_admin_token()}"
         }
-        response = requests.request(http_method, url, headers=headers, verify=False)
-        return response.json()
+        response = KubernetesResourceManager.get_http_session().request(http_method, url, headers=headers)
+        response_json = response.json()
+        LifecycleTracer.observe(response_json)
+        return response_json
 
     @staticmethod
+    @LifecycleTracer.traced('create')
     def create_resource_from_yaml(yaml_file_path):
-        """Creates a resource in Kubernetes from a given YAML file."""
+        """Creates a resource in Kubernetes from a given YAML file or generated manifest."""
         dynamic_client = KubernetesResourceManager.get_dynamic_kubernetes_client()
         try:
-            with open(yaml_file_path, 'r') as f:
-                yaml_content = yaml.safe_load(f)
+            yaml_content = load_manifest(yaml_file_path)
+            for hook in KubernetesResourceManager.before_create_hooks:
+                hook(yaml_content)
 
             api_version = yaml_content.get("apiVersion")
             kind = yaml_content.get("kind")
+            metadata = yaml_content.get("metadata") or {}
+            # Copied rather than updated in place, so a caller's generated document is left as it was
+            yaml_content = dict(yaml_content, metadata=dict(
+                metadata, labels=dict(metadata.get("labels") or {}, **{RUN_ID_LABEL: ConfigLoader.get_run_id()})))
 
             resource_api = dynamic_client.resources.get(api_version=api_version, kind=kind)
             resource_api.create(body=yaml_content)
-            logger.info(f"Resource '{kind}' created successfully from {yaml_file_path}.")
+            logger.info("Resource '%s' created successfully from %s.", kind, describe_manifest(yaml_file_path),
+                        extra=log_fields(yaml_content))
         except Exception as e:
-            logger.error(f"Failed to create resource from {yaml_file_path}: {e}")
+            logger.error("Failed to create resource from %s: %s", describe_manifest(yaml_file_path), e)
 
     @staticmethod
+    @LifecycleTracer.traced('delete')
     def delete_resource_by(resource_type, resource_name, namespace="default"):
         """Deletes a Kubernetes resource by its type, name, and optional namespace."""
         dynamic_client = KubernetesResourceManager.get_dynamic_kubernetes_client()
         try:
             resource_api = dynamic_client.resources.get(api_version='v1', kind=resource_type)
             resource_api.delete(name=resource_name, namespace=namespace)
-            logger.info(f"Resource '{resource_type}' named '{resource_name}' deleted successfully.")
+            logger.info("Resource '%s' named '%s' deleted successfully.", resource_type, resource_name)
         except Exception as e:
-            logger.error(f"Failed to delete resource '{resource_type}' named '{resource_name}': {e}")
+            logger.error("Failed to delete resource '%s' named '%s': %s", resource_type, resource_name, e)
 
     @staticmethod
+    @LifecycleTracer.traced('delete')
     def delete_resource_by_file(yaml_file):
-        """Deletes a Kubernetes resource using a YAML file."""
+        """Deletes a Kubernetes resource using a YAML file or generated manifest."""
         dynamic_client = KubernetesResourceManager.get_dynamic_kubernetes_client()
         try:
-            with open(yaml_file, 'r') as f:
-                resource_data = yaml.safe_load(f)
+            resource_data = load_manifest(yaml_file)
 
             resource_type = resource_data.get("kind")
             resource_name = resource_data.get("metadata", {}).get("name")
@@ -103,62 +282,83 @@ class KubernetesResourceManager:
             api_version = resource_data.get("api_version")
 
             if not resource_type or not resource_name:
-                raise ValueError(f"Missing 'kind' or 'metadata.name' in the YAML file: {yaml_file}")
+                raise ValueError(f"Missing 'kind' or 'metadata.name' in the manifest: {describe_manifest(yaml_file)}")
 
             resource_api = dynamic_client.resources.get(api_version=api_version, kind=resource_type)
             resource_api.delete(name=resource_name, namespace=resource_namespace)
-            logger.info(
-                f"Resource '{resource_type}' named '{resource_name}' deleted successfully from namespace '{resource_namespace}'.")
+            logger.info("Resource '%s' named '%s' deleted successfully from namespace '%s'.",
+                        resource_type, resource_name, resource_namespace, extra=log_fields(resource_data))
         except Exception as e:
-            logger.error(f"Failed to delete resource from file '{yaml_file}': {e}")
+            logger.error("Failed to delete resource from file '%s': %s", describe_manifest(yaml_file), e)
 
     @staticmethod
+    @LifecycleTracer.traced('delete')
     def delete_cluster_resource_by_file(yaml_file):
-        """Deletes a Kubernetes resource using a YAML file."""
+        """Deletes a Kubernetes resource using a YAML file or generated manifest."""
         try:
             # Load resource data from the YAML file
-            with open(yaml_file, 'r') as f:
-                resource_data = yaml.safe_load(f)
+            resource_data = load_manifest(yaml_file)
 
             # Get basic resource information
             resource_type = resource_data.get("kind")
             resource_name = resource_data.get("metadata", {}).get("name")
             api_version = resource_data.get("apiVersion")
-            admin_token = config_data.get('k8s', {}).get('admin-token', '')
+            admin_token = KubernetesResourceManager.get_admin_token()
             api_url = config_data.get('k8s', {}).get('cluster-uri', '')
 
             if not resource_type or not resource_name:
-                raise ValueError(f"Missing 'kind' or 'metadata.name' in the YAML file: {yaml_file}")
+                raise ValueError(f"Missing 'kind' or 'metadata.name' in the manifest: {describe_manifest(yaml_file)}")
 
             headers = {
                 'Authorization': f'Bearer {admin_token}',
                 "Content-Type": "application/json"
             }
 
-            url = f"{api_url}/apis/{api_version}/{resource_type.lower()}s/{resource_name}"
+            plural = KubernetesResourceManager.resolve_plural(api_version, resource_type)
+            url = f"{api_url}/apis/{api_version}/{plural}/{resource_name}"
 
             # Send the DELETE request
-            response = requests.delete(url, headers=headers, verify=False)
+            response = KubernetesResourceManager.get_http_session().delete(url, headers=headers)
 
             # Check the response status
             if response.status_code == 200 or response.status_code == 202:
-                logger.info(
-                    f"Resource '{resource_type}' named '{resource_name}' deleted successfully")
+                logger.info("Resource '%s' named '%s' deleted successfully", resource_type, resource_name,
+                            extra=log_fields(resource_data, response))
             else:
-                logger.error(f"Failed to delete resource '{resource_name}': {response.text}")
+                logger.error("Failed to delete resource '%s': %s", resource_name, response.text,
+                             extra=log_fields(resource_data, response))
 
         except Exception as e:
-            logger.error(f"Failed to delete resource from file '{yaml_file}': {e}")
+            logger.error("Failed to delete resource from file '%s': %s", describe_manifest(yaml_file), e)
+
+    @staticmethod
+    def _validate_patch_against_live(url, resource_type, resource_name, patch_operations):
+        """
+        Validates JSON patch operations against the live object, which has the server-populated fields a
+        manifest does not declare. Logs why and returns False if it cannot be read or the patch violates its schema.
+        """
+        headers = {'Authorization': f"Bearer {KubernetesResourceManager.get_admin_token()}"}
+        response = KubernetesResourceManager.get_http_session().get(url, headers=headers)
+        if response.status_code != 200:
+            logger.error("Failed to read live resource '%s' named '%s'. Status code: %s",
+                         resource_type, resource_name, response.status_code)
+            return False
+        violations = ManifestSchemaValidator.validate_patch(response.json(), patch_operations)
+        if violations:
+            logger.error("Update of '%s' named '%s' rejected by schema validation: %s",
+                         resource_type, resource_name, ManifestSchemaValidator.format_violations(violations))
+            return False
+        return True
 
     @staticmethod
+    @LifecycleTracer.traced('update')
     def update_resource_parameters_with_namespace_from_yaml(yaml_file_path, updates):
         """Updates a Kubernetes resource from a YAML file using PATCH request."""
         api_url = config_data.get('k8s', {}).get('cluster-uri', '')
-        admin_token = config_data.get('k8s', {}).get('admin-token', '')
+        admin_token = KubernetesResourceManager.get_admin_token()
 
         try:
-            with open(yaml_file_path, 'r') as f:
-                resource_data = yaml.safe_load(f)
+            resource_data = load_manifest(yaml_file_path)
 
             resource_type = resource_data.get("kind")
             resource_name = resource_data.get("metadata", {}).get("name")
@@ -166,58 +366,181 @@ class KubernetesResourceManager:
             api_version = resource_data.get("apiVersion")
 
             if not resource_type or not resource_name:
-                raise ValueError(f"Missing 'kind' or 'metadata.name' in the YAML file: {yaml_file_path}")
+                raise ValueError(
+                    f"Missing 'kind' or 'metadata.name' in the manifest: {describe_manifest(yaml_file_path)}")
 
-            url = f"{api_url}/apis/{api_version}/namespaces/{resource_namespace}/{resource_type.lower()}s/{resource_name}"
+            plural = KubernetesResourceManager.resolve_plural(api_version, resource_type)
+            url = f"{api_url}/apis/{api_version}/namespaces/{resource_namespace}/{plural}/{resource_name}"
             patch_operations = [{"op": "replace", "path": path, "value": value} for path, value in updates.items()]
 
+            if not KubernetesResourceManager._validate_patch_against_live(url, resource_type, resource_name,
+                                                                          patch_operations):
+                return
+
             headers = {
                 'Content-Type': 'application/json-patch+json',
                 'Authorization': f'Bearer {admin_token}'
             }
 
-            response = requests.patch(url, headers=headers, data=json.dumps(patch_operations), verify=False)
+            response = KubernetesResourceManager.get_http_session().patch(url, headers=headers,
+                                                                          data=json.dumps(patch_operations))
 
             if response.status_code == 200:
-                logger.info(
-                    f"Successfully updated resource '{resource_type}' named '{resource_name}' in namespace '{resource_namespace}'.")
+                logger.info("Successfully updated resource '%s' named '%s' in namespace '%s'.",
+                            resource_type, resource_name, resource_namespace,
+                            extra=log_fields(resource_data, response))
             else:
-                logger.error(f"Failed to update resource. Status code: {response.status_code}")
-                logger.error(f"Response: {response.text}")
+                logger.error("Failed to update resource. Status code: %s", response.status_code,
+                             extra=log_fields(resource_data, response))
+                logger.error("Response: %s", response.text, extra=log_fields(resource_data, response))
         except Exception as e:
-            logger.error(f"Failed to update resource from file '{yaml_file_path}': {e}")
+            logger.error("Failed to update resource from file '%s': %s", describe_manifest(yaml_file_path), e)
 
     @staticmethod
+    @LifecycleTracer.traced('update')
     def update_cluster_resource_parameters(yaml_file_path, updates):
         """Updates a Kubernetes cluster resource from a YAML file using PATCH request."""
         api_url = config_data.get('k8s', {}).get('cluster-uri', '')
-        admin_token = config_data.get('k8s', {}).get('admin-token', '')
+        admin_token = KubernetesResourceManager.get_admin_token()
 
         try:
-            with open(yaml_file_path, 'r') as f:
-                resource_data = yaml.safe_load(f)
+            resource_data = load_manifest(yaml_file_path)
 
             resource_type = resource_data.get("kind")
             resource_name = resource_data.get("metadata", {}).get("name")
             api_version = resource_data.get("apiVersion")
 
             if not resource_type or not resource_name:
-                raise ValueError(f"Missing 'kind' or 'metadata.name' in the YAML file: {yaml_file_path}")
+                raise ValueError(
+                    f"Missing 'kind' or 'metadata.name' in the manifest: {describe_manifest(yaml_file_path)}")
 
-            url = f"{api_url}/apis/{api_version}/{resource_type.lower()}s/{resource_name}"
+            plural = KubernetesResourceManager.resolve_plural(api_version, resource_type)
+            url = f"{api_url}/apis/{api_version}/{plural}/{resource_name}"
             patch_operations = [{"op": "replace", "path": path, "value": value} for path, value in updates.items()]
 
+            if not KubernetesResourceManager._validate_patch_against_live(url, resource_type, resource_name,
+                                                                          patch_operations):
+                return
+
             headers = {
                 'Content-Type': 'application/json-patch+json',
                 'Authorization': f'Bearer {admin_token}'
             }
 
-            response = requests.patch(url, headers=headers, data=json.dumps(patch_operations), verify=False)
+            response = KubernetesResourceManager.get_http_session().patch(url, headers=headers,
+                                                                          data=json.dumps(patch_operations))
+
+            if response.status_code == 200:
+                logger.info("Successfully updated resource '%s' named '%s'", resource_type, resource_name,
+                            extra=log_fields(resource_data, response))
+            else:
+                logger.error("Failed to update resource. Status code: %s", response.status_code,
+                             extra=log_fields(resource_data, response))
+                logger.error("Response: %s", response.text, extra=log_fields(resource_data, response))
+        except Exception as e:
+            logger.error("Failed to update resource from file '%s': %s", describe_manifest(yaml_file_path), e)
+
+    @staticmethod
+    def resolve_plural(api_version, kind):
+        """
+        Returns the plural resource name of a kind from API discovery, cached per group version;
+        falls back to the lower-cased kind plus 's' if discovery is unavailable.
+        """
+        if (api_version, kind) not in _plurals:
+            api_prefix = "apis" if "/" in api_version else "api"
+            try:
+                response = KubernetesResourceManager.send_request_and_get_response("GET", f"{api_prefix}/{api_version}")
+                if response.status_code == 200:
+                    for resource in response.json().get('resources', []):
+                        if '/' not in resource['name']:
+                            _plurals.setdefault((api_version, resource['kind']), resource['name'])
+            except Exception as e:
+                logger.warning("Discovery of %s failed, guessing the plural of '%s': %s", api_version, kind, e)
+            _plurals.setdefault((api_version, kind), f"{kind.lower()}s")
+        return _plurals[(api_version, kind)]
+
+    @staticmethod
+    def get_resource_url(resource_data):
+        """Builds the API URL of the resource described by a manifest, namespaced or cluster scoped."""
+        api_url = config_data.get('k8s', {}).get('cluster-uri', '')
+        api_version = resource_data.get("apiVersion")
+        resource_type = resource_data.get("kind")
+        resource_name = resource_data.get("metadata", {}).get("name")
+        resource_namespace = resource_data.get("metadata", {}).get("namespace")
+
+        api_prefix = "apis" if "/" in api_version else "api"
+        namespace_path = f"namespaces/{resource_namespace}/" if resource_namespace else ""
+        plural = KubernetesResourceManager.resolve_plural(api_version, resource_type)
+        return f"{api_url}/{api_prefix}/{api_version}/{namespace_path}{plural}/{resource_name}"
+
+    @staticmethod
+    @LifecycleTracer.traced('update')
+    def update_resource_from_manifest_diff(desired_yaml_path, original_yaml_path=None, patch_type="json"):
+        """
+        Updates a Kubernetes resource with the minimal patch between a desired manifest and
+        either the original manifest or, if none is given, the live object.
+        Returns the patch that was sent, which is empty if the resource is already up to date.
+        """
+        admin_token = KubernetesResourceManager.get_admin_token()
+
+        try:
+            desired_data = load_manifest(desired_yaml_path)
+
+            resource_type = desired_data.get("kind")
+            resource_name = desired_data.get("metadata", {}).get("name")
+
+            if not resource_type or not resource_name:
+                raise ValueError(
+                    f"Missing 'kind' or 'metadata.name' in the manifest: {describe_manifest(desired_yaml_path)}")
+
+            url = KubernetesResourceManager.get_resource_url(desired_data)
+            headers = {'Authorization': f'Bearer {admin_token}'}
+
+            if original_yaml_path:
+                current_data = load_manifest(original_yaml_path)
+                prune = True
+            else:
+                response = KubernetesResourceManager.get_http_session().get(url, headers=headers)
+                if response.status_code != 200:
+                    logger.error("Failed to read live resource '%s' named '%s'. Status code: %s",
+                                 resource_type, resource_name, response.status_code)
+                    return None
+                current_data = response.json()
+                # The live object carries server-populated fields the manifest never declares
+                prune = False
+
+            if patch_type == "merge":
+                patch = create_merge_patch(current_data, desired_data, prune=prune)
+                patched_data = apply_merge_patch(current_data, patch)
+                headers['Content-Type'] = 'application/merge-patch+json'
+            else:
+                patch = create_json_patch(current_data, desired_data, prune=prune)
+                patched_data = None
+                headers['Content-Type'] = 'application/json-patch+json'
+
+            if not patch:
+                logger.info("Resource '%s' named '%s' is already up to date.", resource_type, resource_name)
+                return patch
+
+            if patched_data is None:
+                violations = ManifestSchemaValidator.validate_patch(current_data, patch)
+            else:
+                violations = ManifestSchemaValidator.validate_resource(patched_data)
+            if violations:
+                logger.error("Update of '%s' named '%s' rejected by schema validation: %s",
+                             resource_type, resource_name, ManifestSchemaValidator.format_violations(violations))
+                return None
+
+            response = KubernetesResourceManager.get_http_session().patch(url, headers=headers, data=json.dumps(patch))
 
             if response.status_code == 200:
-                logger.info(f"Successfully updated resource '{resource_type}' named '{resource_name}'")
+                logger.info("Successfully updated resource '%s' named '%s' with a %s-entry %s patch.",
+                            resource_type, resource_name, len(patch), patch_type,
+                            extra=log_fields(desired_data, response))
             else:
-                logger.error(f"Failed to update resource. Status code: {response.status_code}")
-                logger.error(f"Response: {response.text}")
+                logger.error("Failed to update resource. Status code: %s", response.status_code,
+                             extra=log_fields(desired_data, response))
+                logger.error("Response: %s", response.text, extra=log_fields(desired_data, response))
+            return patch
         except Exception as e:
-            logger.error(f"Failed to update resource from file '{yaml_file_path}': {e}")
+            logger.error("Failed to update resource from file '%s': %s", describe_manifest(desired_yaml_path), e)
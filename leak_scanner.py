@@ -0,0 +1,270 @@
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from config_loader import ConfigLoader
+from k8s import RUN_ID_LABEL, KubernetesResourceManager
+from logger import LoggerManager
+
+config_data = ConfigLoader.load_config()
+
+# Setup logger
+logger = LoggerManager.get_logger(config_data, 'k8s')
+
+# CRD categories Crossplane and the providers put on claims, composite resources and managed resources
+CROSSPLANE_CATEGORIES = ('claim', 'composite', 'managed')
+
+# Aggregated discovery returns every group, version and resource in one response (Kubernetes 1.26+)
+AGGREGATED_DISCOVERY_ACCEPT = ('application/json;g=apidiscovery.k8s.io;v=v2;as=APIGroupDiscoveryList,'
+                               'application/json;g=apidiscovery.k8s.io;v=v2beta1;as=APIGroupDiscoveryList,'
+                               'application/json')
+
+# Lists return only object metadata, which keeps the scan cheap regardless of spec and status sizes
+METADATA_LIST_ACCEPT = 'application/json;as=PartialObjectMetadataList;g=meta.k8s.io;v=v1,application/json'
+
+# Labels Crossplane puts on composites and composed resources, pointing back to their claim and composite
+CLAIM_NAME_LABEL = 'crossplane.io/claim-name'
+CLAIM_NAMESPACE_LABEL = 'crossplane.io/claim-namespace'
+COMPOSITE_LABEL = 'crossplane.io/composite'
+
+# Reaping deletes claims first so Crossplane cascades, then whatever is left, bottom tier last
+REAP_ORDER = ('claim', 'composite', 'managed', 'usage')
+
+CrossplaneResource = namedtuple('CrossplaneResource', ['group_version', 'resource', 'kind', 'namespaced', 'tier'])
+
+# Reasons that prove an object belongs to this run; 'created-during-run' objects may belong to concurrent runs
+# (other shards, fan-out targets, soaks or other users) on a shared cluster, so they are only reported
+REAPED_REASONS = ('run-label', 'composed')
+
+# reason: 'run-label', 'composed' (owned by a leaked claim or composite of this run, or for a ProviderConfigUsage,
+# tracking a leaked managed resource of this run) or 'created-during-run'
+LeakedObject = namedtuple('LeakedObject', ['tier', 'kind', 'group_version', 'resource', 'namespace', 'name',
+                                           'reason', 'deleting', 'created'])
+
+LeakScanResult = namedtuple('LeakScanResult', ['leaks', 'resources_scanned', 'objects_scanned', 'elapsed'])
+
+
+def _tier(kind, categories):
+    if kind.endswith('ProviderConfigUsage'):
+        return 'usage'
+    return next((category for category in CROSSPLANE_CATEGORIES if category in categories), None)
+
+
+def _auth_headers(accept):
+    return {'Authorization': f"Bearer {KubernetesResourceManager.get_admin_token()}", 'Accept': accept}
+
+
+def _parse_time(timestamp):
+    return datetime.fromisoformat(timestamp.replace('Z', '+00:00')) if timestamp else None
+
+
+class LeakScanner:
+    """
+    Class for finding Crossplane objects a test run left behind: claims, composite resources, managed
+    resources and ProviderConfigUsages, enumerated through discovery and listed concurrently as metadata only.
+    """
+
+    @staticmethod
+    def _discover_aggregated(session, api_url):
+        response = session.get(f"{api_url}/apis", headers=_auth_headers(AGGREGATED_DISCOVERY_ACCEPT))
+        response.raise_for_status()
+        body = response.json()
+        if body.get('kind') != 'APIGroupDiscoveryList':
+            return None
+
+        resources = []
+        for group in body.get('items', []):
+            versions = group.get('versions') or []
+            if not versions:
+                continue
+            # Versions are listed in preference order
+            version = versions[0]
+            for resource in version.get('resources') or []:
+                kind = (resource.get('responseKind') or {}).get('kind', '')
+                tier = _tier(kind, resource.get('categories') or [])
+                if tier and 'list' in (resource.get('verbs') or []):
+                    resources.append(CrossplaneResource(f"{group['metadata']['name']}/{version['version']}",
+                                                        resource['resource'], kind,
+                                                        resource.get('scope') == 'Namespaced', tier))
+        return resources
+
+    @staticmethod
+    def _discover_per_group(session, api_url, max_workers):
+        response = session.get(f"{api_url}/apis", headers=_auth_headers('application/json'))
+        response.raise_for_status()
+        group_versions = [group['preferredVersion']['groupVersion'] for group in response.json().get('groups', [])]
+
+        def list_resources(group_version):
+            group_response = session.get(f"{api_url}/apis/{group_version}", headers=_auth_headers('application/json'))
+            if group_response.status_code != 200:
+                return []
+            return [CrossplaneResource(group_version, resource['name'], resource['kind'], resource['namespaced'],
+                                       _tier(resource['kind'], resource.get('categories') or []))
+                    for resource in group_response.json().get('resources', [])
+                    if '/' not in resource['name'] and 'list' in resource.get('verbs', [])]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return [resource for resources in executor.map(list_resources, group_versions)
+                    for resource in resources if resource.tier]
+
+    @staticmethod
+    def discover_crossplane_resources(max_workers=None):
+        """
+        Returns every claim, composite, managed and ProviderConfigUsage resource type served by the cluster.
+        Uses one aggregated discovery request where supported, otherwise one request per API group.
+        """
+        max_workers = max_workers or config_data.get('k8s', {}).get('connection_pool_size', 32)
+        session = KubernetesResourceManager.get_http_session()
+        api_url = KubernetesResourceManager.get_cluster_uri()
+        resources = LeakScanner._discover_aggregated(session, api_url)
+        if resources is None:
+            resources = LeakScanner._discover_per_group(session, api_url, max_workers)
+        return resources
+
+    @staticmethod
+    def _list(resource, accept, page_size):
+        session = KubernetesResourceManager.get_http_session()
+        url = f"{KubernetesResourceManager.get_cluster_uri()}/apis/{resource.group_version}/{resource.resource}"
+        items = []
+        params = {'limit': page_size}
+        while True:
+            response = session.get(url, headers=_auth_headers(accept), params=params)
+            response.raise_for_status()
+            body = response.json()
+            items.extend(body.get('items', []))
+            continue_token = body.get('metadata', {}).get('continue')
+            if not continue_token:
+                return items
+            params = {'limit': page_size, 'continue': continue_token}
+
+    @staticmethod
+    def list_metadata(resource, page_size=500):
+        """Lists the metadata of every object of a resource type across namespaces, page by page."""
+        return [item.get('metadata', {}) for item in LeakScanner._list(resource, METADATA_LIST_ACCEPT, page_size)]
+
+    @staticmethod
+    def list_usages(resource, page_size=500):
+        """
+        Lists the metadata of every ProviderConfigUsage with the 'resourceRef' of the managed resource it tracks.
+        Usages carry no run label or claim labels, and resourceRef is outside their metadata, so they are listed
+        as whole objects.
+        """
+        return [dict(item.get('metadata', {}), resourceRef=item.get('resourceRef') or {})
+                for item in LeakScanner._list(resource, 'application/json', page_size)]
+
+    @staticmethod
+    def scan(run_id=None, since=None, max_workers=None):
+        """
+        Lists every Crossplane object and returns a LeakScanResult with those left over from a run:
+        objects labelled with the run id, objects composed from a leaked claim or composite, and, if since
+        (a datetime) is given, objects created after it.
+        """
+        max_workers = max_workers or config_data.get('k8s', {}).get('connection_pool_size', 32)
+        run_id = run_id or ConfigLoader.get_run_id()
+        started = time.perf_counter()
+
+        resources = LeakScanner.discover_crossplane_resources(max_workers)
+
+        def list_resource(resource):
+            try:
+                if resource.tier == 'usage':
+                    return resource, LeakScanner.list_usages(resource)
+                return resource, LeakScanner.list_metadata(resource)
+            except Exception as e:
+                logger.warning("Failed to list %s: %s", resource.resource, e)
+                return resource, []
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            listed = list(executor.map(list_resource, resources))
+
+        def reason_for(metadata, leaked_claims, leaked_composites, leaked_managed):
+            labels = metadata.get('labels') or {}
+            if labels.get(RUN_ID_LABEL) == run_id:
+                return 'run-label'
+            if (labels.get(CLAIM_NAMESPACE_LABEL), labels.get(CLAIM_NAME_LABEL)) in leaked_claims \
+                    or labels.get(COMPOSITE_LABEL) in leaked_composites:
+                return 'composed'
+            resource_ref = metadata.get('resourceRef') or {}
+            if (resource_ref.get('kind'), metadata.get('namespace'), resource_ref.get('name')) in leaked_managed:
+                return 'composed'
+            created = _parse_time(metadata.get('creationTimestamp'))
+            if since is not None and created is not None and created >= since:
+                return 'created-during-run'
+            return None
+
+        # Claims, composites and managed resources are resolved first, so the objects composed from them can be
+        # matched by label, and the usages tracking them by resourceRef
+        leaks = []
+        leaked_claims = set()
+        leaked_composites = set()
+        leaked_managed = set()
+        for tier in REAP_ORDER:
+            for resource, items in listed:
+                if resource.tier != tier:
+                    continue
+                for metadata in items:
+                    reason = reason_for(metadata, leaked_claims, leaked_composites, leaked_managed)
+                    if reason is None:
+                        continue
+                    # What another run's claim or composite composed is not this run's to reap either
+                    if reason in REAPED_REASONS and tier == 'claim':
+                        leaked_claims.add((metadata.get('namespace'), metadata['name']))
+                    elif reason in REAPED_REASONS and tier == 'composite':
+                        leaked_composites.add(metadata['name'])
+                    elif reason in REAPED_REASONS and tier == 'managed':
+                        leaked_managed.add((resource.kind, metadata.get('namespace'), metadata['name']))
+                    leaks.append(LeakedObject(tier, resource.kind, resource.group_version, resource.resource,
+                                              metadata.get('namespace'), metadata['name'], reason,
+                                              bool(metadata.get('deletionTimestamp')),
+                                              metadata.get('creationTimestamp')))
+
+        result = LeakScanResult(leaks, len(resources), sum(len(items) for _, items in listed),
+                                time.perf_counter() - started)
+        logger.info("Scanned %s objects of %s Crossplane resource types in %.2fs, %s leaked.",
+                    result.objects_scanned, result.resources_scanned, result.elapsed, len(leaks))
+        return result
+
+    @staticmethod
+    def reap(leaks, max_workers=None):
+        """
+        Deletes leaked objects tier by tier, claims first so Crossplane can cascade to what they composed.
+        Only objects proven to belong to this run are deleted (see REAPED_REASONS); objects already being
+        deleted are skipped. Returns {(kind, namespace, name): status code or error}.
+        """
+        leaks = [leak for leak in leaks if leak.reason in REAPED_REASONS]
+        max_workers = max_workers or config_data.get('k8s', {}).get('connection_pool_size', 32)
+        session = KubernetesResourceManager.get_http_session()
+        api_url = KubernetesResourceManager.get_cluster_uri()
+
+        def delete(leak):
+            namespace_path = f"namespaces/{leak.namespace}/" if leak.namespace else ""
+            url = f"{api_url}/apis/{leak.group_version}/{namespace_path}{leak.resource}/{leak.name}"
+            try:
+                response = session.delete(url, headers=_auth_headers('application/json'),
+                                          params={'propagationPolicy': 'Background'})
+                return (leak.kind, leak.namespace, leak.name), response.status_code
+            except Exception as e:
+                return (leak.kind, leak.namespace, leak.name), str(e)
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for tier in REAP_ORDER:
+                pending = [leak for leak in leaks if leak.tier == tier and not leak.deleting]
+                results.update(executor.map(delete, pending))
+
+        failed = {key: outcome for key, outcome in results.items() if outcome not in (200, 202, 404)}
+        for (kind, namespace, name), outcome in failed.items():
+            logger.error("Failed to reap '%s' named '%s' in '%s': %s", kind, name, namespace, outcome)
+        logger.info("Reaped %s of %s leaked objects.", len(results) - len(failed), len(results))
+        return results
+
+    @staticmethod
+    def format_leaks(leaks):
+        """Formats leaked objects as a table, one per line."""
+        lines = []
+        for leak in leaks:
+            state = 'deleting' if leak.deleting else ''
+            lines.append(f"{leak.tier:<10} {leak.kind:<32} {leak.namespace or '-':<20} {leak.name:<48} "
+                         f"{leak.reason:<20} {state}")
+        return "\n".join(lines)
@@ -1,25 +1,200 @@
+import atexit
+import contextvars
+import json
 import logging
+import logging.handlers
+import queue
+import threading
+from contextlib import contextmanager
+
+ROOT_LOGGER_NAME = 'crossplane_tests'
+
+# Subsystems whose level is taken from the 'logging' flag of the config section with the same name
+CONFIGURED_SUBSYSTEMS = ('k8s', 'helm', 'provider')
+
+# Structured fields copied from 'extra' into JSON records, as record attribute -> JSON key
+# ('name' is taken by the logger name on LogRecord, so resources use 'resource_name')
+STRUCTURED_FIELDS = {
+    'test_id': 'test_id',
+    'gvk': 'gvk',
+    'resource_name': 'name',
+    'namespace': 'namespace',
+    'latency': 'latency',
+    'status': 'status',
+}
+
+# Id of the test the current thread works for: set by the test runner for the main thread, carried to worker
+# threads by LoggerManager.with_test_id, and None in background threads such as watches and samplers
+_current_test_id = contextvars.ContextVar('current_test_id', default=None)
+
+
+def _level(flag):
+    if isinstance(flag, str) and flag.upper() in logging.getLevelNamesMapping():
+        return logging.getLevelNamesMapping()[flag.upper()]
+    # A disabled subsystem still reports errors, as they were the only trace of failed calls
+    return logging.INFO if flag else logging.ERROR
+
+
+def _subsystem_levels(config_data):
+    """Returns the level of every configured subsystem's logger, keyed by subsystem."""
+    return {subsystem: _level((config_data.get(subsystem) or {}).get('logging', True))
+            for subsystem in CONFIGURED_SUBSYSTEMS}
+
+
+def truncate(text, limit=None):
+    """Truncates a response body or other large value before it is logged."""
+    limit = limit if limit is not None else LoggerManager.max_body_length
+    text = str(text)
+    if limit and len(text) > limit:
+        return f"{text[:limit]}... [{len(text) - limit} more chars]"
+    return text
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line; the message is only rendered here, in the writer thread.
+    """
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f".{int(record.msecs):03d}",
+            'level': record.levelname,
+            'subsystem': record.name.split('.', 1)[-1],
+            'message': truncate(record.getMessage()),
+        }
+        for attribute, key in STRUCTURED_FIELDS.items():
+            value = getattr(record, attribute, None)
+            if value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = truncate(self.formatException(record.exc_info))
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Plain-text formatter with the same truncation as the JSON one."""
+
+    def format(self, record):
+        record.message_text = truncate(record.getMessage())
+        test_id = getattr(record, 'test_id', None)
+        record.test_suffix = f" [{test_id}]" if test_id else ""
+        return super().format(record)
+
+
+class TestContextFilter(logging.Filter):
+    """Stamps every record with the id of the test the logging thread works for."""
+
+    def filter(self, record):
+        if getattr(record, 'test_id', None) is None:
+            record.test_id = _current_test_id.get()
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that hands the raw record to the writer thread: formatting stays lazy, and a full
+    queue drops records instead of blocking the caller.
+    """
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LoggerManager.dropped_records += 1
+
 
 class LoggerManager:
     """
     Class to manage logging configuration.
     """
+    dropped_records = 0
+    max_body_length = 2048
+
+    _listener = None
+    _lock = threading.Lock()
+
     @staticmethod
-    def get_logger(config_data):
+    def get_logger(config_data, subsystem=None):
         """
         Set up and return a logger based on the configuration.
         """
-        # Check if logging is enabled
-        logging_enabled = (
-                config_data.get('k8s', {}).get('logging', True)
-                or config_data.get('helm', {}).get('logging', True)
-                or config_data.get('provider', {}).get('logging', True)
-        )
-
-        # Set logging level
-        if logging_enabled:
-            logging.basicConfig(level=logging.INFO)
-        else:
-            logging.disable(logging.CRITICAL)
-
-        return logging.getLogger(__name__)
+        LoggerManager._configure(config_data)
+        return logging.getLogger(f"{ROOT_LOGGER_NAME}.{subsystem}" if subsystem else ROOT_LOGGER_NAME)
+
+    @staticmethod
+    def _configure(config_data):
+        with LoggerManager._lock:
+            if LoggerManager._listener is not None:
+                return
+
+            logging_config = config_data.get('logging') or {}
+            LoggerManager.max_body_length = logging_config.get('max_body_length', 2048)
+
+            if logging_config.get('format', 'json') == 'json':
+                formatter = JsonFormatter()
+            else:
+                formatter = TextFormatter('%(asctime)s %(levelname)s %(name)s%(test_suffix)s: %(message_text)s')
+            writer = logging.StreamHandler()
+            writer.setFormatter(formatter)
+
+            record_queue = queue.Queue(maxsize=logging_config.get('queue_size', 10000))
+            handler = NonBlockingQueueHandler(record_queue)
+            handler.addFilter(TestContextFilter())
+
+            root_logger = logging.getLogger(ROOT_LOGGER_NAME)
+            root_logger.addHandler(handler)
+            root_logger.setLevel(_level(logging_config.get('level', 'INFO')))
+            root_logger.propagate = False
+            for subsystem, level in _subsystem_levels(config_data).items():
+                logging.getLogger(f"{ROOT_LOGGER_NAME}.{subsystem}").setLevel(level)
+
+            LoggerManager._listener = logging.handlers.QueueListener(record_queue, writer,
+                                                                     respect_handler_level=True)
+            LoggerManager._listener.start()
+            atexit.register(LoggerManager.shutdown)
+
+    @staticmethod
+    def get_test_id():
+        """Returns the id of the test the current thread works for, or None."""
+        return _current_test_id.get()
+
+    @staticmethod
+    def set_test_id(test_id):
+        """Sets the test id attached to subsequent records of the current thread."""
+        _current_test_id.set(test_id)
+
+    @staticmethod
+    @contextmanager
+    def bound_test_id(test_id):
+        """Attaches a test id to the records of the current thread for the enclosed block."""
+        token = _current_test_id.set(test_id)
+        try:
+            yield
+        finally:
+            _current_test_id.reset(token)
+
+    @staticmethod
+    def with_test_id(function):
+        """
+        Wraps a function handed to worker threads so that it runs with the caller's test id,
+        e.g. executor.map(LoggerManager.with_test_id(patch_one), targets).
+        """
+        test_id = _current_test_id.get()
+
+        def run(*args, **kwargs):
+            with LoggerManager.bound_test_id(test_id):
+                return function(*args, **kwargs)
+        return run
+
+    @staticmethod
+    def shutdown():
+        """Flushes queued records and stops the background writer."""
+        with LoggerManager._lock:
+            if LoggerManager._listener is not None:
+                LoggerManager._listener.stop()
+                LoggerManager._listener = None
+        if LoggerManager.dropped_records:
+            print(f"{LoggerManager.dropped_records} log records were dropped because the log queue was full")
@@ -0,0 +1,116 @@
+import os
+import threading
+import yaml
+
+import path_searcher as path_builder
+
+manifests_path = path_builder.get_manifest_path()
+
+# Kinds whose name is derived from their spec, e.g. '<plural>.<group>' for an XRD, and cannot be suffixed
+FIXED_NAME_KINDS = ('CompositeResourceDefinition', 'CustomResourceDefinition')
+
+
+def _compile_node(node):
+    """
+    Compiles a parsed YAML node into a builder returning a fresh copy of it. Containers are rebuilt on every
+    call, immutable scalars are shared, and string scalars go through the renames of the generated bundle.
+    """
+    if isinstance(node, dict):
+        builders = [(key, _compile_node(value)) for key, value in node.items()]
+        return lambda renames: {key: build(renames) for key, build in builders}
+    if isinstance(node, list):
+        builders = [_compile_node(value) for value in node]
+        return lambda renames: [build(renames) for build in builders]
+    if isinstance(node, str):
+        return lambda renames: renames.get(node, node) if renames else node
+    return lambda renames: node
+
+
+def suffix_for_test(test):
+    """Name suffix of the objects generated for a test case, e.g. 'test-claim-creation'."""
+    return test._testMethodName.lower().replace('_', '-')
+
+
+class ManifestTemplate:
+    """
+    A manifest compiled once into a document builder with name, namespace, label and parameter slots,
+    so thousands of unique documents can be generated without re-reading or re-parsing the YAML.
+    """
+
+    def __init__(self, document, source=None):
+        self.source = source
+        self.api_version = document.get('apiVersion')
+        self.kind = document.get('kind')
+        self.name = document.get('metadata', {}).get('name')
+        self.namespace = document.get('metadata', {}).get('namespace')
+        self._build = _compile_node(document)
+
+    def generate(self, name=None, namespace=None, labels=None, parameters=None, suffix=None, renames=None):
+        """
+        Returns a new document. suffix derives the name as '<name>-<suffix>'; renames maps names used
+        elsewhere in the document (e.g. compositionRef, providerConfigRef) to the names of generated peers.
+        parameters are merged over spec.parameters.
+        """
+        document = self._build(renames)
+        metadata = document.setdefault('metadata', {})
+        if name or suffix:
+            metadata['name'] = name or f"{self.name}-{suffix}"
+        if namespace:
+            metadata['namespace'] = namespace
+        if labels:
+            metadata['labels'] = dict(metadata.get('labels') or {}, **labels)
+        if parameters:
+            spec = document.setdefault('spec', {})
+            spec['parameters'] = dict(spec.get('parameters') or {}, **parameters)
+        return document
+
+    def generate_many(self, count, prefix=None, start=0, **slots):
+        """Yields count documents named '<prefix>-<index>', by default prefixed with the manifest's name."""
+        prefix = prefix or self.name
+        for index in range(start, start + count):
+            yield self.generate(name=f"{prefix}-{index}", **slots)
+
+
+class ManifestTemplates:
+    """
+    Index of compiled manifest templates, keyed by path relative to the manifests directory.
+    A template is recompiled only when its file changes.
+    """
+    _templates = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get(manifest):
+        """Returns the template of a manifest file, given relative to the manifests directory or absolute."""
+        manifest_path = manifest if os.path.isabs(manifest) else os.path.join(manifests_path, manifest)
+        modified = os.path.getmtime(manifest_path)
+        with ManifestTemplates._lock:
+            cached = ManifestTemplates._templates.get(manifest_path)
+            if cached is not None and cached[0] == modified:
+                return cached[1]
+        with open(manifest_path, 'r') as f:
+            template = ManifestTemplate(yaml.safe_load(f), source=manifest_path)
+        with ManifestTemplates._lock:
+            ManifestTemplates._templates[manifest_path] = (modified, template)
+        return template
+
+    @staticmethod
+    def generate_bundle(manifests, suffix, namespace=None, labels=None):
+        """
+        Generates one document per manifest, all renamed with the same suffix and with their references
+        to each other rewritten, e.g. an XRD, a Composition and a claim that can coexist with other copies.
+        """
+        templates = [ManifestTemplates.get(manifest) for manifest in manifests]
+        renames = {template.name: f"{template.name}-{suffix}" for template in templates
+                   if template.name and template.kind not in FIXED_NAME_KINDS}
+        return [template.generate(suffix=suffix if template.kind not in FIXED_NAME_KINDS else None,
+                                  namespace=namespace if template.namespace else None, labels=labels,
+                                  renames=renames) for template in templates]
+
+    @staticmethod
+    def generate_for_test(test, *manifests, namespace=None, labels=None):
+        """
+        Generates the bundle of manifests with names unique to a test case, so its creates never wait for the
+        teardown of another test's objects, only for a previous run of the same test.
+        """
+        return ManifestTemplates.generate_bundle(manifests, suffix_for_test(test), namespace=namespace, labels=labels)
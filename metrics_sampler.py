@@ -0,0 +1,380 @@
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import deque, namedtuple
+
+from config_loader import ConfigLoader
+from k8s import KubernetesResourceManager
+from logger import LoggerManager
+from tracer import LifecycleTracer
+
+config_data = ConfigLoader.load_config()
+
+# Setup logger
+logger = LoggerManager.get_logger(config_data, 'k8s')
+
+DEFAULT_METRICS_CONFIG = {
+    'interval': 5,
+    'capacity': 50000,
+    'port': 8080,
+    'discovery_interval': 60,
+    'top': 5,
+    # component: label selector of its pods
+    'targets': {
+        'crossplane': 'app=crossplane',
+        'rbac-manager': 'app=crossplane-rbac-manager',
+        'provider': 'pkg.crossplane.io/provider',
+    },
+}
+
+RECONCILE_HISTOGRAM = 'controller_runtime_reconcile_time_seconds'
+WORKQUEUE_DEPTH = 'workqueue_depth'
+API_REQUESTS = 'rest_client_requests_total'
+
+# Lines of any other family are skipped before they are parsed
+SCRAPED_FAMILIES = (RECONCILE_HISTOGRAM, WORKQUEUE_DEPTH, API_REQUESTS)
+
+SAMPLE_PATTERN = re.compile(r'([a-zA-Z_:][\w:]*)(?:\{(.*)\})?\s+(\S+)')
+LABEL_PATTERN = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+# metric: 'reconciles' and 'reconcile_seconds' (totals over the interval), 'reconcile_p95' (seconds),
+# 'workqueue_depth' (gauge) or 'api_requests' (total over the interval, by status code)
+MetricPoint = namedtuple('MetricPoint', ['timestamp', 'component', 'pod', 'metric', 'name', 'value'])
+
+ControllerActivity = namedtuple('ControllerActivity', ['component', 'pod', 'controller', 'reconciles',
+                                                       'mean_seconds', 'p95_seconds', 'max_queue_depth'])
+
+ApiActivity = namedtuple('ApiActivity', ['component', 'pod', 'requests', 'errors', 'per_second'])
+
+
+def _metrics_config():
+    return dict(DEFAULT_METRICS_CONFIG, **(config_data.get('metrics') or {}))
+
+
+def parse_exposition(lines, families=SCRAPED_FAMILIES):
+    """
+    Parses Prometheus text exposition lines one at a time, yielding (name, labels, value) for the samples of
+    the given metric families; comments and other families are skipped without being parsed.
+    """
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if not line.startswith(families):
+            continue
+        match = SAMPLE_PATTERN.match(line)
+        if not match:
+            continue
+        name, labels, value = match.groups()
+        try:
+            yield name, dict(LABEL_PATTERN.findall(labels or '')), float(value)
+        except ValueError:
+            continue
+
+
+def snapshot(samples):
+    """Folds parsed samples into the cumulative values one scrape of a pod reports."""
+    reconciles, depths, requests = {}, {}, {}
+    for name, labels, value in samples:
+        if name.startswith(RECONCILE_HISTOGRAM):
+            histogram = reconciles.setdefault(labels.get('controller', ''), {'count': 0.0, 'sum': 0.0, 'buckets': {}})
+            if name.endswith('_bucket'):
+                histogram['buckets'][float(labels.get('le', '+Inf'))] = value
+            elif name.endswith('_count'):
+                histogram['count'] = value
+            elif name.endswith('_sum'):
+                histogram['sum'] = value
+        elif name == WORKQUEUE_DEPTH:
+            depths[labels.get('name', '')] = value
+        elif name == API_REQUESTS:
+            code = labels.get('code', '')
+            requests[code] = requests.get(code, 0.0) + value
+    return {'reconciles': reconciles, 'workqueue_depth': depths, 'api_requests': requests}
+
+
+def histogram_quantile(quantile, buckets):
+    """Estimates a quantile from cumulative {upper bound: count} buckets, interpolating like Prometheus does."""
+    bounds = sorted(buckets)
+    if not bounds or buckets[bounds[-1]] <= 0:
+        return None
+    rank = quantile * buckets[bounds[-1]]
+    lower_bound, lower_count = 0.0, 0.0
+    for bound in bounds:
+        count = buckets[bound]
+        if count >= rank:
+            if math.isinf(bound):
+                return lower_bound
+            return lower_bound + (bound - lower_bound) * (rank - lower_count) / (count - lower_count)
+        lower_bound, lower_count = bound, count
+    return lower_bound
+
+
+def _increase(current, previous):
+    # A counter lower than before means the container restarted and counts from zero again
+    return current - previous if current >= previous else current
+
+
+def interval_points(previous, current):
+    """
+    Returns (metric, name, value) for what happened between two snapshots of a pod: the reconciles of every
+    controller that ran, non-zero workqueue depths (and those that just dropped to zero) and API requests.
+    """
+    points = []
+    for controller, histogram in current['reconciles'].items():
+        before = previous['reconciles'].get(controller, {'count': 0.0, 'sum': 0.0, 'buckets': {}})
+        reconciles = _increase(histogram['count'], before['count'])
+        if reconciles <= 0:
+            continue
+        restarted = histogram['count'] < before['count']
+        points.append(('reconciles', controller, reconciles))
+        points.append(('reconcile_seconds', controller,
+                       histogram['sum'] if restarted else max(0.0, histogram['sum'] - before['sum'])))
+        buckets = {bound: _increase(count, 0.0 if restarted else before['buckets'].get(bound, 0.0))
+                   for bound, count in histogram['buckets'].items()}
+        p95 = histogram_quantile(0.95, buckets)
+        if p95 is not None:
+            points.append(('reconcile_p95', controller, p95))
+    for queue, depth in current['workqueue_depth'].items():
+        if depth > 0 or previous['workqueue_depth'].get(queue, 0.0) > 0:
+            points.append(('workqueue_depth', queue, depth))
+    for code, count in current['api_requests'].items():
+        requests = _increase(count, previous['api_requests'].get(code, 0.0))
+        if requests > 0:
+            points.append(('api_requests', code, requests))
+    return points
+
+
+class MetricsSampler:
+    """
+    Class that scrapes the /metrics endpoints of the Crossplane, RBAC manager and provider pods through the API
+    server's pod proxy during a run: reconcile duration histograms, workqueue depths and API client requests.
+    Every scrape is turned into the activity since the previous one and kept in a bounded buffer of points
+    timestamped on the lifecycle tracer's clock; with tracing enabled they are also drawn as counters in the
+    trace. As a test result listener it scrapes when each test starts and stops, so the activity reported for a
+    test is the activity between those two scrapes.
+    """
+    _instance = None
+
+    def __init__(self, interval=None, capacity=None):
+        self.config = _metrics_config()
+        self.interval = interval or self.config['interval']
+        self.namespace = self.config.get('namespace') or config_data.get('helm', {}).get('namespace',
+                                                                                          'crossplane-system')
+        self._points = deque(maxlen=capacity or self.config['capacity'])
+        self._snapshots = {}
+        self._pods = []
+        self._discovered = 0.0
+        self._last_sample = time.time()
+        self._test_started = None
+        self._emitted = {}
+        self._lock = threading.Lock()
+        self._sample_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def start_session():
+        """Starts the run-wide sampler, or returns the one already running."""
+        if MetricsSampler._instance is None:
+            sampler = MetricsSampler()
+            sampler.start()
+            MetricsSampler._instance = sampler
+        return MetricsSampler._instance
+
+    def start(self):
+        """Takes the first snapshot of every pod, then keeps sampling in the background."""
+        self.sample()
+        self._thread = threading.Thread(target=self._sample_loop, name='metrics-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Takes a last sample and stops sampling."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 30)
+        self.sample()
+        if MetricsSampler._instance is self:
+            MetricsSampler._instance = None
+
+    def _sample_loop(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                logger.warning("Metrics sampling failed: %s", e)
+
+    def _discover_pods(self):
+        """Returns (component, pod name) of every running pod of the configured targets."""
+        pods = []
+        for component, selector in self.config['targets'].items():
+            response = KubernetesResourceManager.get_http_session().get(
+                f"{KubernetesResourceManager.get_cluster_uri()}/api/v1/namespaces/{self.namespace}/pods",
+                params={'labelSelector': selector},
+                headers={'Authorization': f"Bearer {KubernetesResourceManager.get_admin_token()}"})
+            if response.status_code != 200:
+                logger.warning("Failed to list the %s pods in '%s': %s", component, self.namespace,
+                               response.status_code)
+                continue
+            pods += [(component, pod['metadata']['name']) for pod in response.json().get('items', [])
+                     if (pod.get('status') or {}).get('phase') == 'Running']
+        return pods
+
+    def _scrape(self, pod):
+        """Reads the metrics of a pod as a stream, parsing the wanted families line by line."""
+        response = KubernetesResourceManager.get_http_session().get(
+            f"{KubernetesResourceManager.get_cluster_uri()}/api/v1/namespaces/{self.namespace}/pods/"
+            f"{pod}:{self.config['port']}/proxy/metrics",
+            headers={'Authorization': f"Bearer {KubernetesResourceManager.get_admin_token()}"},
+            stream=True, timeout=(10, 30))
+        try:
+            if response.status_code != 200:
+                raise RuntimeError(f"scraping pod '{pod}' returned {response.status_code}")
+            return snapshot(parse_exposition(response.iter_lines()))
+        finally:
+            response.close()
+
+    def sample(self):
+        """Scrapes every pod once, records the activity since the previous scrape and returns its timestamp."""
+        with self._sample_lock:
+            if not self._pods or time.monotonic() - self._discovered > self.config['discovery_interval']:
+                self._pods = self._discover_pods()
+                self._discovered = time.monotonic()
+
+            points = []
+            timestamp = time.time()
+            for component, pod in list(self._pods):
+                try:
+                    current = self._scrape(pod)
+                except Exception as e:
+                    # Rediscovered on the next sample, e.g. after a provider upgrade replaced the pod
+                    logger.warning("Failed to scrape the metrics of %s pod '%s': %s", component, pod, e)
+                    self._discovered = 0.0
+                    continue
+                previous = self._snapshots.get(pod)
+                self._snapshots[pod] = current
+                if previous is not None:
+                    points += [MetricPoint(timestamp, component, pod, metric, name, value)
+                               for metric, name, value in interval_points(previous, current)]
+
+            with self._lock:
+                self._points.extend(points)
+                elapsed = timestamp - self._last_sample
+                self._last_sample = timestamp
+            if LifecycleTracer.enabled:
+                self._trace(points, timestamp, elapsed)
+            return timestamp
+
+    def _trace(self, points, timestamp, elapsed):
+        """Draws reconcile rates, workqueue depths and API request rates as trace counters, one graph per pod."""
+        values = {}
+        for point in points:
+            if point.metric in ('reconciles', 'api_requests'):
+                series = 'reconciles/s' if point.metric == 'reconciles' else 'API requests/s'
+                value = point.value / elapsed if elapsed > 0 else 0.0
+            elif point.metric == 'workqueue_depth':
+                series, value = 'workqueue depth', point.value
+            else:
+                continue
+            counter = values.setdefault(f"{point.pod} {series}", {})
+            counter[point.name] = counter.get(point.name, 0.0) + value
+        # Series that went quiet drop back to zero instead of keeping their last value in the graph
+        for counter_name, emitted in self._emitted.items():
+            for name in emitted:
+                values.setdefault(counter_name, {}).setdefault(name, 0.0)
+        for counter_name, counter in values.items():
+            LifecycleTracer.counter(counter_name, int(timestamp * 1_000_000), **counter)
+        self._emitted = {counter_name: {name for name, value in counter.items() if value}
+                         for counter_name, counter in values.items() if any(counter.values())}
+
+    def get_points(self, start=None, end=None):
+        """Returns the buffered points of the scrapes taken after start and up to end."""
+        with self._lock:
+            points = list(self._points)
+        return [point for point in points
+                if (start is None or point.timestamp > start) and (end is None or point.timestamp <= end)]
+
+    def summarize(self, start=None, end=None):
+        """Returns (ControllerActivity list, busiest first, ApiActivity list) of the scrapes in a time window."""
+        controllers = {}
+        requests = {}
+        first, last = None, None
+        for point in self.get_points(start, end):
+            first = point.timestamp if first is None else min(first, point.timestamp)
+            last = point.timestamp if last is None else max(last, point.timestamp)
+            if point.metric == 'api_requests':
+                totals = requests.setdefault((point.component, point.pod), [0.0, 0.0])
+                totals[0] += point.value
+                # Throttling and server errors, unlike the 404s and 409s controllers expect
+                if point.name == '429' or point.name.startswith('5'):
+                    totals[1] += point.value
+                continue
+            activity = controllers.setdefault((point.component, point.pod, point.name),
+                                              {'reconciles': 0.0, 'reconcile_seconds': 0.0, 'reconcile_p95': None,
+                                               'workqueue_depth': 0.0})
+            if point.metric in ('reconciles', 'reconcile_seconds'):
+                activity[point.metric] += point.value
+            else:
+                activity[point.metric] = max(activity[point.metric] or 0.0, point.value)
+
+        window = (end or last or 0.0) - (start or first or 0.0)
+        controller_activity = sorted(
+            (ControllerActivity(component, pod, controller, int(activity['reconciles']),
+                                activity['reconcile_seconds'] / activity['reconciles'] if activity['reconciles']
+                                else None, activity['reconcile_p95'], int(activity['workqueue_depth']))
+             for (component, pod, controller), activity in controllers.items()),
+            key=lambda activity: (-activity.reconciles, -activity.max_queue_depth, activity.controller))
+        api_activity = [ApiActivity(component, pod, int(total), int(errors), total / window if window > 0 else None)
+                        for (component, pod), (total, errors) in sorted(requests.items())]
+        return controller_activity, api_activity
+
+    def format_summary(self, summary, top=None):
+        controllers, api = summary
+        top = top or self.config['top']
+        lines = []
+        for activity in controllers[:top]:
+            line = f"  {activity.pod}  {activity.controller}: {activity.reconciles} reconciles"
+            if activity.mean_seconds is not None:
+                line += f", mean {activity.mean_seconds:.3f}s"
+            if activity.p95_seconds is not None:
+                line += f", p95 {activity.p95_seconds:.3f}s"
+            if activity.max_queue_depth:
+                line += f", max queue depth {activity.max_queue_depth}"
+            lines.append(line)
+        for activity in api:
+            rate = f" ({activity.per_second:.1f}/s)" if activity.per_second is not None else ""
+            lines.append(f"  {activity.pod}  API: {activity.requests} requests{rate}, {activity.errors} throttled "
+                         f"or failed")
+        return "\n".join(lines)
+
+    def write_series(self, series_path):
+        """Writes every buffered point as JSON, to be lined up with the run report and the trace."""
+        os.makedirs(os.path.dirname(os.path.abspath(series_path)), exist_ok=True)
+        with open(series_path, 'w') as f:
+            json.dump({'interval': self.interval, 'namespace': self.namespace,
+                       'points': [point._asdict() for point in self.get_points()]}, f)
+
+    def start_test(self, test):
+        # Scraped now, so activity since the last background sample is not charged to the test
+        try:
+            started = self.sample()
+        except Exception as e:
+            logger.warning("Metrics sampling failed: %s", e)
+            with self._lock:
+                started = self._last_sample
+        with self._lock:
+            self._test_started = started
+
+    def stop_test(self, test):
+        """Report fields of the test: the controller activity between its start and its end."""
+        try:
+            ended = self.sample()
+        except Exception as e:
+            logger.warning("Metrics sampling failed: %s", e)
+            return {}
+        summary = self.summarize(self._test_started, ended)
+        if not summary[0] and not summary[1]:
+            return {}
+        return {'controller_activity': self.format_summary(summary).splitlines()}
@@ -0,0 +1,295 @@
+import atexit
+import itertools
+import json
+import queue
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from config_loader import ConfigLoader
+from k8s import RUN_ID_LABEL, KubernetesResourceManager
+from logger import LoggerManager
+from manifest_templates import ManifestTemplates
+from teardown_queue import TeardownQueue
+
+config_data = ConfigLoader.load_config()
+
+# Setup logger
+logger = LoggerManager.get_logger(config_data, 'k8s')
+
+DEFAULT_NAMESPACE_POOL_CONFIG = {
+    'size': 4,
+    'prefix': 'pool',
+    'namespace': 'shared_resourses/namespace.yaml',
+    'bootstrap': ['shared_resourses/role.yaml', 'shared_resourses/role_binding.yaml'],
+    'recycle_timeout': 120,
+    'max_workers': 8,
+}
+
+# Label on the pool's namespaces, with the run id as value
+POOL_LABEL = 'crossplane-tests/namespace-pool'
+
+# Label on the shared RBAC objects, which recycling keeps
+BOOTSTRAP_LABEL = 'crossplane-tests/pool-bootstrap'
+
+# Objects the control plane puts in every namespace and recreates when they are deleted
+PRESERVED_OBJECTS = {'configmaps': 'kube-root-ca.crt', 'serviceaccounts': 'default'}
+
+# Resources that are never recycled: events expire by themselves
+SKIPPED_RESOURCES = ('events',)
+
+NamespacedResource = namedtuple('NamespacedResource', ['api_prefix', 'group_version', 'resource'])
+
+
+def _headers():
+    return {
+        'Authorization': f"Bearer {KubernetesResourceManager.get_admin_token()}",
+        'Content-Type': 'application/json',
+    }
+
+
+def _collection_url(document):
+    api_version = document['apiVersion']
+    namespace = document['metadata'].get('namespace')
+    api_prefix = "apis" if "/" in api_version else "api"
+    namespace_path = f"namespaces/{namespace}/" if namespace else ""
+    plural = KubernetesResourceManager.resolve_plural(api_version, document['kind'])
+    return f"{KubernetesResourceManager.get_cluster_uri()}/{api_prefix}/{api_version}/{namespace_path}{plural}"
+
+
+class NamespacePool:
+    """
+    Class that keeps namespaces ready for tests: each is created ahead of time with the shared RBAC of
+    manifests/shared_resourses applied, handed out on demand, and recycled after use by deleting its
+    contents collection by collection instead of deleting the namespace, whose finalization is slow.
+    Namespaces that do not empty within the recycle timeout are deleted in the background and replaced.
+    """
+    _shared = None
+    _shared_lock = threading.Lock()
+    # Numbers the namespaces created for single tests when no pool is running
+    _unpooled = itertools.count(1)
+
+    def __init__(self, size=None, **overrides):
+        self.config = dict(DEFAULT_NAMESPACE_POOL_CONFIG, **(config_data.get('namespace_pool') or {}))
+        self.config.update(overrides)
+        self.size = size or self.config['size']
+        self.run_id = ConfigLoader.get_run_id()
+        self._ready = queue.Queue()
+        self._owned = set()
+        self._sequence = itertools.count(1)
+        self._resources = None
+        self._discovery_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._closed = False
+        # Set when the pool is closing: recycling and replenishing stop early
+        self._stopping = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=self.config['max_workers'],
+                                            thread_name_prefix='namespace-pool')
+
+    @staticmethod
+    def shared():
+        """Returns the pool shared by every test of the run, started on first use. The runner closes it."""
+        if NamespacePool._shared is None:
+            with NamespacePool._shared_lock:
+                if NamespacePool._shared is None:
+                    NamespacePool._shared = NamespacePool().start()
+                    # For callers other than the runner; a no-op once the runner closed the pool
+                    atexit.register(NamespacePool.close_shared)
+        return NamespacePool._shared
+
+    @staticmethod
+    def close_shared():
+        """Closes the shared pool, if one was started."""
+        with NamespacePool._shared_lock:
+            pool, NamespacePool._shared = NamespacePool._shared, None
+        if pool is not None:
+            pool.close()
+
+    @staticmethod
+    def manifests():
+        """Returns the manifests of the namespaces namespace_for hands out, relative to the manifests directory."""
+        pool_config = dict(DEFAULT_NAMESPACE_POOL_CONFIG, **(config_data.get('namespace_pool') or {}))
+        return [pool_config['namespace']] + list(pool_config['bootstrap'])
+
+    @staticmethod
+    def namespace_for(test):
+        """
+        Returns a namespace with the shared RBAC of manifests/shared_resourses for a test case, for the test alone.
+        With a pool (--namespace-pool) it is leased and released when the test finishes; otherwise a namespace
+        with a unique name is created with its RBAC and queued for teardown when the test finishes.
+        """
+        pool = NamespacePool._shared
+        if pool is not None:
+            name = pool.acquire()
+            test.addCleanup(pool.release, name)
+            return name
+
+        pool_config = dict(DEFAULT_NAMESPACE_POOL_CONFIG, **(config_data.get('namespace_pool') or {}))
+        name = f"{pool_config['prefix']}-{ConfigLoader.get_run_id()}-t{next(NamespacePool._unpooled)}"
+        namespace = ManifestTemplates.get(pool_config['namespace']).generate(name=name)
+        KubernetesResourceManager.create_resource_from_yaml(namespace)
+        for manifest in pool_config['bootstrap']:
+            KubernetesResourceManager.create_resource_from_yaml(
+                ManifestTemplates.get(manifest).generate(namespace=name))
+        # Deleting the namespace deletes its RBAC
+        test.addCleanup(TeardownQueue.delete, namespace)
+        return name
+
+    def start(self):
+        """Starts creating the pool's namespaces in the background and returns the pool."""
+        for _ in range(self.size):
+            self._executor.submit(self._replenish)
+        return self
+
+    def acquire(self, timeout=300):
+        """Returns the name of a ready namespace, waiting for one to be created or recycled."""
+        try:
+            return self._ready.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No pooled namespace became ready within {timeout}s") from None
+
+    def release(self, name):
+        """Hands a namespace back; its contents are deleted in the background before it is reused."""
+        self._executor.submit(self._recycle, name)
+
+    @contextmanager
+    def lease(self, timeout=300):
+        """Holds a namespace for the enclosed block, e.g. 'with NamespacePool.shared().lease() as namespace:'."""
+        name = self.acquire(timeout)
+        try:
+            yield name
+        finally:
+            self.release(name)
+
+    def _post(self, document):
+        response = KubernetesResourceManager.get_http_session().post(_collection_url(document),
+                                                                     data=json.dumps(document), headers=_headers())
+        if response.status_code not in (200, 201, 409):
+            raise RuntimeError(f"Failed to create {document['kind']} '{document['metadata']['name']}': "
+                               f"{response.status_code} {response.text}")
+
+    def _replenish(self, attempts=3):
+        name = f"{self.config['prefix']}-{self.run_id}-{next(self._sequence)}"
+        labels = {RUN_ID_LABEL: self.run_id}
+        for attempt in range(1, attempts + 1):
+            if self._stopping.is_set():
+                return
+            try:
+                started = time.perf_counter()
+                self._post(ManifestTemplates.get(self.config['namespace']).generate(
+                    name=name, labels=dict(labels, **{POOL_LABEL: self.run_id})))
+                with self._lock:
+                    self._owned.add(name)
+                for manifest in self.config['bootstrap']:
+                    self._post(ManifestTemplates.get(manifest).generate(
+                        namespace=name, labels=dict(labels, **{BOOTSTRAP_LABEL: 'true'})))
+                self._ready.put(name)
+                logger.info("Pooled namespace '%s' ready in %.2fs", name, time.perf_counter() - started)
+                return
+            except Exception as e:
+                logger.warning("Failed to prepare pooled namespace '%s' (attempt %s/%s): %s", name, attempt,
+                               attempts, e)
+                time.sleep(attempt)
+        self._delete_namespace(name)
+
+    def _namespaced_resources(self):
+        """Discovers once every namespaced resource type whose collections can be deleted."""
+        with self._discovery_lock:
+            if self._resources is None:
+                self._resources = self._discover_namespaced_resources()
+        return self._resources
+
+    @staticmethod
+    def _discover_namespaced_resources():
+        session = KubernetesResourceManager.get_http_session()
+        api_url = KubernetesResourceManager.get_cluster_uri()
+        response = session.get(f"{api_url}/apis", headers=_headers())
+        response.raise_for_status()
+        group_versions = [('api', 'v1')] + [('apis', group['preferredVersion']['groupVersion'])
+                                            for group in response.json().get('groups', [])]
+
+        def list_resources(group_version):
+            api_prefix, version = group_version
+            group_response = session.get(f"{api_url}/{api_prefix}/{version}", headers=_headers())
+            if group_response.status_code != 200:
+                return []
+            return [NamespacedResource(api_prefix, version, resource['name'])
+                    for resource in group_response.json().get('resources', [])
+                    if resource.get('namespaced') and '/' not in resource['name']
+                    and resource['name'] not in SKIPPED_RESOURCES
+                    and {'list', 'deletecollection'} <= set(resource.get('verbs', []))]
+
+        # A separate executor, as recycling already runs on the pool's own workers
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            return [resource for resources in executor.map(list_resources, group_versions) for resource in resources]
+
+    def _delete_contents(self, name, resource):
+        """Deletes every non-bootstrap object of one resource type; returns whether any object was found."""
+        url = f"{KubernetesResourceManager.get_cluster_uri()}/{resource.api_prefix}/{resource.group_version}/" \
+              f"namespaces/{name}/{resource.resource}"
+        params = {'labelSelector': f"!{BOOTSTRAP_LABEL}"}
+        if resource.resource in PRESERVED_OBJECTS:
+            params['fieldSelector'] = f"metadata.name!={PRESERVED_OBJECTS[resource.resource]}"
+        response = KubernetesResourceManager.get_http_session().delete(url, params=params, headers=_headers())
+        if response.status_code not in (200, 202):
+            return response.status_code != 404
+        return bool(response.json().get('items'))
+
+    def _remaining(self, name, resource):
+        url = f"{KubernetesResourceManager.get_cluster_uri()}/{resource.api_prefix}/{resource.group_version}/" \
+              f"namespaces/{name}/{resource.resource}"
+        params = {'labelSelector': f"!{BOOTSTRAP_LABEL}", 'limit': 1}
+        if resource.resource in PRESERVED_OBJECTS:
+            params['fieldSelector'] = f"metadata.name!={PRESERVED_OBJECTS[resource.resource]}"
+        response = KubernetesResourceManager.get_http_session().get(url, params=params, headers=_headers())
+        return response.status_code == 200 and bool(response.json().get('items'))
+
+    def _recycle(self, name):
+        started = time.monotonic()
+        try:
+            resources = self._namespaced_resources()
+            # Only collections that had objects are polled until their finalizers ran
+            pending = [resource for resource in resources if self._delete_contents(name, resource)]
+            while pending and not self._stopping.is_set() \
+                    and time.monotonic() - started < self.config['recycle_timeout']:
+                time.sleep(1)
+                pending = [resource for resource in pending if self._remaining(name, resource)]
+        except Exception as e:
+            logger.warning("Failed to recycle pooled namespace '%s': %s", name, e)
+            pending = True
+
+        if not pending and not self._stopping.is_set():
+            self._ready.put(name)
+            logger.info("Recycled pooled namespace '%s' in %.2fs", name, time.monotonic() - started)
+            return
+        if pending:
+            logger.warning("Pooled namespace '%s' did not empty in %ss, replacing it", name,
+                           self.config['recycle_timeout'])
+        self._delete_namespace(name)
+        if not self._stopping.is_set():
+            self._replenish()
+
+    def _delete_namespace(self, name):
+        """Deletes a namespace without waiting for its finalization."""
+        with self._lock:
+            self._owned.discard(name)
+        try:
+            KubernetesResourceManager.get_http_session().delete(
+                f"{KubernetesResourceManager.get_cluster_uri()}/api/v1/namespaces/{name}", headers=_headers())
+        except Exception as e:
+            logger.warning("Failed to delete pooled namespace '%s': %s", name, e)
+
+    def close(self):
+        """Stops replenishing and deletes every namespace of the pool, without waiting for their finalization."""
+        if self._closed:
+            return
+        self._closed = True
+        self._stopping.set()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            names = sorted(self._owned)
+        for name in names:
+            self._delete_namespace(name)
+        logger.info("Deleted %s pooled namespaces", len(names))
@@ -0,0 +1,273 @@
+import json
+import math
+import os
+import sqlite3
+import statistics
+import threading
+import time
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+import path_searcher as path_builder
+from config_loader import ConfigLoader
+from fingerprint import TestFingerprint
+from k8s import KubernetesResourceManager
+from logger import LoggerManager
+from tracer import LifecycleTracer
+
+config_data = ConfigLoader.load_config()
+
+# Setup logger
+logger = LoggerManager.get_logger(config_data, 'runner')
+
+DEFAULT_PERF_HISTORY_CONFIG = {
+    'path': '.test_cache/perf_history.sqlite',
+    'baseline_runs': 20,
+    'min_baseline': 5,
+    'significance': 0.05,
+    'min_slowdown': 0.1,
+}
+
+# Conditions whose first transition to True is recorded as the object's time to Ready
+READY_CONDITIONS = ('Ready', 'Healthy', 'Established')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    started REAL NOT NULL,
+    cluster TEXT NOT NULL,
+    chart_version TEXT,
+    provider_revisions TEXT
+);
+CREATE TABLE IF NOT EXISTS samples (
+    run INTEGER NOT NULL REFERENCES runs (id),
+    metric TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS samples_by_run ON samples (run, metric, name);
+"""
+
+# metric: 'test' (duration), 'api' (request latency per endpoint) or 'ready' (time to Ready per kind)
+Regression = namedtuple('Regression', ['metric', 'name', 'baseline', 'latest', 'slowdown', 'p_value'])
+
+PerfComparison = namedtuple('PerfComparison', ['run', 'baseline_runs', 'compared', 'regressions', 'changes'])
+
+
+def endpoint_template(method, url):
+    """
+    Names the endpoint of an API call with the namespace and object name replaced by placeholders,
+    e.g. 'GET apis/compute.crossplane.io/v1alpha1/namespaces/{namespace}/dropletclaims/{name}'.
+    """
+    segments = [segment for segment in urlsplit(url).path.split('/') if segment]
+    if not segments or segments[0] not in ('api', 'apis'):
+        return f"{method.upper()} /{'/'.join(segments)}"
+    prefix_length = 2 if segments[0] == 'api' else 3
+    prefix, rest = segments[:prefix_length], segments[prefix_length:]
+    if len(rest) > 2 and rest[0] == 'namespaces':
+        prefix += ['namespaces', '{namespace}']
+        rest = rest[2:]
+    if len(rest) > 1:
+        rest = [rest[0], '{name}'] + rest[2:]
+    return f"{method.upper()} {'/'.join(prefix + rest)}"
+
+
+def mann_whitney_p(latest, baseline):
+    """
+    One-sided p-value of the latest samples being larger than the baseline ones. A single latest sample is
+    ranked exactly against the baseline; larger samples use the Mann-Whitney U test's normal approximation.
+    """
+    if len(latest) == 1:
+        return (1 + sum(1 for value in baseline if value >= latest[0])) / (len(baseline) + 1)
+
+    combined = sorted([(value, True) for value in latest] + [(value, False) for value in baseline])
+    count = len(combined)
+    latest_rank_sum = 0.0
+    ties = 0.0
+    start = 0
+    while start < count:
+        end = start
+        while end + 1 < count and combined[end + 1][0] == combined[start][0]:
+            end += 1
+        # Tied values share the average of their ranks
+        average_rank = (start + end) / 2 + 1
+        latest_rank_sum += average_rank * sum(1 for _, is_latest in combined[start:end + 1] if is_latest)
+        tied = end - start + 1
+        ties += tied ** 3 - tied
+        start = end + 1
+
+    latest_count, baseline_count = len(latest), len(baseline)
+    u = latest_rank_sum - latest_count * (latest_count + 1) / 2
+    variance = latest_count * baseline_count / 12 * ((count + 1) - ties / (count * (count - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - latest_count * baseline_count / 2 - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def find_regressions(latest, baseline, significance=0.05, min_slowdown=0.1, min_baseline=5):
+    """
+    Compares {(metric, name): [values]} of the latest run with the pooled values of the baseline runs.
+    A regression is a median slowdown of at least min_slowdown that is significant at the given level.
+    Returns (number of series compared, regressions sorted by slowdown).
+    """
+    compared = 0
+    regressions = []
+    for (metric, name), values in latest.items():
+        baseline_values = baseline.get((metric, name), [])
+        if not values or len(baseline_values) < min_baseline:
+            continue
+        compared += 1
+        baseline_median = statistics.median(baseline_values)
+        latest_median = statistics.median(values)
+        if baseline_median <= 0:
+            continue
+        slowdown = latest_median / baseline_median - 1
+        if slowdown < min_slowdown:
+            continue
+        p_value = mann_whitney_p(values, baseline_values)
+        if p_value <= significance:
+            regressions.append(Regression(metric, name, baseline_median, latest_median, slowdown, p_value))
+    return compared, sorted(regressions, key=lambda regression: -regression.slowdown)
+
+
+def _history_config():
+    return dict(DEFAULT_PERF_HISTORY_CONFIG, **(config_data.get('perf_history') or {}))
+
+
+def _cluster_name():
+    k8s_config = config_data.get('k8s', {})
+    return k8s_config.get('cluster_name') or k8s_config.get('cluster-uri', 'default')
+
+
+class PerfHistory:
+    """
+    Class for keeping test durations, per-endpoint API latencies and times to Ready of every run in a local
+    SQLite store, tagged with the chart version, provider revisions and cluster, and for comparing the latest
+    run against a rolling baseline of earlier runs on the same cluster.
+    """
+    _api_samples = []
+    _lock = threading.Lock()
+
+    @staticmethod
+    def start_run():
+        """Starts collecting API latencies and, through the lifecycle tracer, status transitions."""
+        with PerfHistory._lock:
+            PerfHistory._api_samples = []
+        if PerfHistory.observe_api_call not in KubernetesResourceManager.response_observers:
+            KubernetesResourceManager.response_observers.append(PerfHistory.observe_api_call)
+        LifecycleTracer.enable()
+
+    @staticmethod
+    def observe_api_call(method, url, seconds):
+        sample = (endpoint_template(method, url), seconds)
+        with PerfHistory._lock:
+            PerfHistory._api_samples.append(sample)
+
+    @staticmethod
+    def ready_samples():
+        """Returns ('<Kind> <Condition>', seconds) for the first time every traced object became ready."""
+        samples = {}
+        for span in LifecycleTracer.get_spans():
+            arguments = span.get('args') or {}
+            if span['category'] != 'transition' or arguments.get('condition') not in READY_CONDITIONS \
+                    or arguments.get('status') != 'True':
+                continue
+            key = (arguments['kind'], arguments['namespace'], arguments['name'], arguments['condition'])
+            samples.setdefault(key, (f"{arguments['kind']} {arguments['condition']}", span['duration'] / 1_000_000))
+        return list(samples.values())
+
+    @staticmethod
+    def connect(history_path=None):
+        history_path = history_path or os.path.join(path_builder.get_project_root_path(),
+                                                    _history_config()['path'])
+        os.makedirs(os.path.dirname(os.path.abspath(history_path)), exist_ok=True)
+        connection = sqlite3.connect(history_path)
+        connection.executescript(SCHEMA)
+        return connection
+
+    @staticmethod
+    def record_run(records, history_path=None):
+        """Appends the measurements of the finished run and returns its row id."""
+        cluster_versions = TestFingerprint.get_cluster_versions() or {
+            'chart_version': str(config_data.get('helm', {}).get('version', '')), 'provider_revisions': []}
+        with PerfHistory._lock:
+            api_samples = list(PerfHistory._api_samples)
+
+        samples = [('test', record['test'], record['duration']) for record in records if record['outcome'] == 'passed']
+        samples += [('api', name, seconds) for name, seconds in api_samples]
+        samples += [('ready', name, seconds) for name, seconds in PerfHistory.ready_samples()]
+
+        connection = PerfHistory.connect(history_path)
+        try:
+            with connection:
+                cursor = connection.execute(
+                    "INSERT INTO runs (run_id, started, cluster, chart_version, provider_revisions) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (ConfigLoader.get_run_id(), time.time(), _cluster_name(), cluster_versions['chart_version'],
+                     json.dumps(cluster_versions['provider_revisions'])))
+                run = cursor.lastrowid
+                connection.executemany("INSERT INTO samples (run, metric, name, value) VALUES (?, ?, ?, ?)",
+                                       [(run, metric, name, value) for metric, name, value in samples])
+        finally:
+            connection.close()
+        logger.info("Recorded %s performance samples of run %s", len(samples), run)
+        return run
+
+    @staticmethod
+    def _load_samples(connection, runs):
+        values = {}
+        placeholders = ','.join('?' * len(runs))
+        for metric, name, value in connection.execute(
+                f"SELECT metric, name, value FROM samples WHERE run IN ({placeholders})", runs):
+            values.setdefault((metric, name), []).append(value)
+        return values
+
+    @staticmethod
+    def compare(run=None, history_path=None):
+        """
+        Compares a run, by default the latest one, with the preceding runs on the same cluster.
+        Returns a PerfComparison, or None if no run was recorded.
+        """
+        history_config = _history_config()
+        connection = PerfHistory.connect(history_path)
+        try:
+            query = "SELECT id, cluster, chart_version, provider_revisions FROM runs"
+            row = connection.execute(f"{query} WHERE id = ?" if run else f"{query} ORDER BY id DESC LIMIT 1",
+                                     (run,) if run else ()).fetchone()
+            if row is None:
+                return None
+            run, cluster, chart_version, provider_revisions = row
+            baseline_rows = connection.execute(f"{query} WHERE cluster = ? AND id < ? ORDER BY id DESC LIMIT ?",
+                                               (cluster, run, history_config['baseline_runs'])).fetchall()
+            latest = PerfHistory._load_samples(connection, [run])
+            baseline = PerfHistory._load_samples(connection, [baseline_row[0] for baseline_row in baseline_rows])
+        finally:
+            connection.close()
+
+        # Version changes since the previous run are the usual suspects for a slowdown
+        changes = []
+        if baseline_rows:
+            _, _, previous_chart, previous_revisions = baseline_rows[0]
+            if previous_chart != chart_version:
+                changes.append(f"chart {previous_chart} -> {chart_version}")
+            if previous_revisions != provider_revisions:
+                changes.append(f"provider revisions {', '.join(json.loads(previous_revisions))} -> "
+                               f"{', '.join(json.loads(provider_revisions))}")
+
+        compared, regressions = find_regressions(latest, baseline, history_config['significance'],
+                                                 history_config['min_slowdown'], history_config['min_baseline'])
+        return PerfComparison(run, len(baseline_rows), compared, regressions, changes)
+
+    @staticmethod
+    def format_comparison(comparison):
+        if comparison is None:
+            return "No runs recorded in the performance history."
+        lines = [f"Run {comparison.run} against {comparison.baseline_runs} baseline runs: "
+                 f"{comparison.compared} series compared, {len(comparison.regressions)} significant slowdowns"]
+        lines += [f"  changed: {change}" for change in comparison.changes]
+        for regression in comparison.regressions:
+            lines.append(f"  {regression.metric:<5} {regression.name}: {regression.baseline:.3f}s -> "
+                         f"{regression.latest:.3f}s (+{regression.slowdown:.0%}, p={regression.p_value:.3f})")
+        return "\n".join(lines)
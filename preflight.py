@@ -0,0 +1,215 @@
+import json
+import os
+import time
+import yaml
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import path_searcher as path_builder
+from config_loader import ConfigLoader
+from k8s import KubernetesResourceManager
+from logger import LoggerManager
+
+config_data = ConfigLoader.load_config()
+manifests_path = path_builder.get_manifest_path()
+
+# Setup logger
+logger = LoggerManager.get_logger(config_data, 'k8s')
+
+FIELD_MANAGER = 'crossplane-tests-preflight'
+
+# Kinds that define types or namespaces other documents depend on; they are dry-run in the first tier
+DEFINITION_KINDS = ('CustomResourceDefinition', 'CompositeResourceDefinition', 'Namespace')
+
+# Package kinds install types of their own (e.g. a provider's ProviderConfig), so they go in the first tier too
+PACKAGE_KINDS = ('Provider', 'Configuration', 'Function')
+
+# Tiers run in this order; instances are documents of kinds defined by a CRD or XRD of the tree
+TIERS = ('definitions', 'configuration', 'instances')
+
+PreflightDocument = namedtuple('PreflightDocument', ['manifest', 'index', 'document', 'tier'])
+
+# status: 'accepted', 'rejected' or 'blocked' (depends on a type or namespace that only the tree itself creates)
+PreflightResult = namedtuple('PreflightResult', ['manifest', 'kind', 'name', 'namespace', 'tier', 'status',
+                                                 'message', 'latency'])
+
+PreflightReport = namedtuple('PreflightReport', ['results', 'elapsed'])
+
+
+def _group(api_version):
+    return api_version.split('/')[0] if '/' in api_version else ''
+
+
+def defined_types(documents):
+    """Returns {(group, kind): manifest} for every kind defined by a CRD or XRD (including claims) in the tree."""
+    types = {}
+    for entry in documents:
+        spec = entry.document.get('spec') or {}
+        if entry.document.get('kind') not in ('CustomResourceDefinition', 'CompositeResourceDefinition'):
+            continue
+        for names in (spec.get('names'), spec.get('claimNames')):
+            if names and names.get('kind'):
+                types.setdefault((spec.get('group'), names['kind']), entry.manifest)
+    return types
+
+
+def assign_tiers(documents):
+    """Puts every document in the tier it is dry-run in, from its kind and the types the tree defines."""
+    types = defined_types(documents)
+    tiered = []
+    for entry in documents:
+        kind = entry.document.get('kind')
+        if kind in DEFINITION_KINDS or kind in PACKAGE_KINDS:
+            tier = 'definitions'
+        elif (_group(entry.document.get('apiVersion', '')), kind) in types:
+            tier = 'instances'
+        else:
+            tier = 'configuration'
+        tiered.append(entry._replace(tier=tier))
+    return tiered
+
+
+def load_documents(root=None):
+    """Reads every document of every manifest under the manifests directory."""
+    root = root or manifests_path
+    documents = []
+    for directory, _, file_names in sorted(os.walk(root)):
+        for file_name in sorted(file_names):
+            if not file_name.endswith(('.yaml', '.yml')):
+                continue
+            manifest_path = os.path.join(directory, file_name)
+            with open(manifest_path, 'r') as f:
+                for index, document in enumerate(yaml.safe_load_all(f)):
+                    if document:
+                        documents.append(PreflightDocument(os.path.relpath(manifest_path, root), index, document,
+                                                           None))
+    return documents
+
+
+class Preflight:
+    """
+    Class for checking that every manifest would be accepted by the target cluster before a run: each document
+    is applied server side with dryRun=All, so admission webhooks, schema validation and RBAC all run and
+    nothing is persisted. Documents are dry-run concurrently, tier by tier: definitions, then configuration,
+    then instances of the types the definitions declare. Since a dry run creates nothing, a document whose
+    type or namespace only exists once another document of the tree is applied is reported as blocked rather
+    than rejected, and so is every instance of a definition the cluster rejected.
+    """
+
+    @staticmethod
+    def _discover(api_version):
+        """Returns {kind: (plural, namespaced)} of a group version, or {} if the cluster does not serve it."""
+        api_prefix = "apis" if "/" in api_version else "api"
+        response = KubernetesResourceManager.send_request_and_get_response("GET", f"{api_prefix}/{api_version}")
+        if response.status_code != 200:
+            return {}
+        return {resource['kind']: (resource['name'], resource.get('namespaced', False))
+                for resource in response.json().get('resources', []) if '/' not in resource['name']}
+
+    @staticmethod
+    def _dry_run(entry, served, types, namespaces, rejected_definitions, packages):
+        document = entry.document
+        api_version, kind = document.get('apiVersion', ''), document.get('kind')
+        metadata = document.get('metadata') or {}
+        name, namespace = metadata.get('name'), metadata.get('namespace')
+
+        def result(status, message, latency=0.0):
+            return PreflightResult(entry.manifest, kind, name, namespace, entry.tier, status, message, latency)
+
+        defined_by = types.get((_group(api_version), kind))
+        if defined_by in rejected_definitions:
+            return result('blocked', f"its definition in {defined_by} was rejected")
+        if kind not in served.get(api_version, {}):
+            if defined_by:
+                return result('blocked', f"{api_version} {kind} is not served yet, it is defined by {defined_by}")
+            if packages:
+                # Packages install their types on the cluster only, so this is as far as the tree can tell
+                return result('blocked', f"{api_version} {kind} is not served yet, it may be installed by "
+                                         f"{', '.join(packages)}")
+            return result('rejected', f"{api_version} {kind} is not served by the cluster")
+
+        plural, namespaced = served[api_version][kind]
+        if namespaced:
+            namespace = namespace or 'default'
+            if namespace in namespaces:
+                return result('blocked', f"namespace '{namespace}' does not exist yet, it is created by "
+                                         f"{namespaces[namespace]}")
+        api_prefix = "apis" if "/" in api_version else "api"
+        namespace_path = f"namespaces/{namespace}/" if namespaced else ""
+        api_url = KubernetesResourceManager.get_cluster_uri()
+        url = f"{api_url}/{api_prefix}/{api_version}/{namespace_path}{plural}/{name}"
+        headers = {
+            'Authorization': f"Bearer {KubernetesResourceManager.get_admin_token()}",
+            'Content-Type': 'application/apply-patch+yaml',
+        }
+        started = time.perf_counter()
+        response = KubernetesResourceManager.get_http_session().patch(
+            url, params={'dryRun': 'All', 'fieldManager': FIELD_MANAGER, 'force': 'true'},
+            data=json.dumps(document), headers=headers)
+        latency = time.perf_counter() - started
+        if response.status_code in (200, 201):
+            return result('accepted', None, latency)
+        try:
+            message = response.json().get('message') or response.text
+        except ValueError:
+            message = response.text
+        return result('rejected', f"{response.status_code}: {message}", latency)
+
+    @staticmethod
+    def run(root=None, max_workers=16):
+        """Dry-runs every document under the manifests directory and returns a PreflightReport."""
+        started = time.monotonic()
+        documents = assign_tiers(load_documents(root))
+        types = defined_types(documents)
+        packages = sorted({entry.manifest for entry in documents if entry.document.get('kind') in PACKAGE_KINDS})
+        served = {}
+        rejected_definitions = set()
+        results = []
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            namespaces = {}
+            for tier in TIERS:
+                entries = [entry for entry in documents if entry.tier == tier]
+                missing = sorted({entry.document.get('apiVersion', '') for entry in entries} - set(served))
+                for api_version, resources in zip(missing, executor.map(Preflight._discover, missing)):
+                    served[api_version] = resources
+
+                if tier == 'configuration':
+                    # Namespaces of the tree that the cluster does not have block the documents placed in them
+                    names = sorted(namespaces)
+                    responses = executor.map(lambda name: KubernetesResourceManager.send_request_and_get_response(
+                        "GET", f"api/v1/namespaces/{name}"), names)
+                    namespaces = {name: namespaces[name] for name, response in zip(names, responses)
+                                  if response.status_code != 200}
+
+                tier_results = list(executor.map(
+                    lambda entry: Preflight._dry_run(entry, served, types, namespaces, rejected_definitions,
+                                                     packages),
+                    entries))
+                for entry, tier_result in zip(entries, tier_results):
+                    if entry.document.get('kind') == 'Namespace':
+                        namespaces[tier_result.name] = entry.manifest
+                    if tier_result.status == 'rejected' and entry.document.get('kind') in (
+                            'CustomResourceDefinition', 'CompositeResourceDefinition'):
+                        rejected_definitions.add(entry.manifest)
+                results += tier_results
+
+        report = PreflightReport(results, time.monotonic() - started)
+        logger.info("Preflight dry-ran %s documents in %.2fs: %s rejected, %s blocked", len(results), report.elapsed,
+                    sum(1 for result in results if result.status == 'rejected'),
+                    sum(1 for result in results if result.status == 'blocked'))
+        return report
+
+    @staticmethod
+    def format_report(report):
+        lines = []
+        for status in ('rejected', 'blocked', 'accepted'):
+            matching = [result for result in report.results if result.status == status]
+            if not matching:
+                continue
+            lines.append(f"{status.capitalize()} ({len(matching)}):")
+            for result in matching:
+                target = f"{result.kind}/{result.name}" + (f" in {result.namespace}" if result.namespace else "")
+                lines.append(f"  {result.manifest}: {target}" + (f" - {result.message}" if result.message else ""))
+        lines.append(f"{len(report.results)} documents dry-run in {report.elapsed:.2f}s")
+        return "\n".join(lines)
@@ -0,0 +1,163 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_MODES = ('cprofile', 'sampling')
+
+# Frames whose presence at the top of a sampled stack means the thread is waiting, not computing
+BLOCKING_FUNCTIONS = {'recv_into', 'recv', 'read', 'readinto', 'select', 'poll', 'sleep', 'wait', 'acquire',
+                      'connect', 'do_handshake', 'getaddrinfo'}
+
+
+def _file_name(test_id):
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', test_id)
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_firstlineno}({code.co_name})"
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler that periodically snapshots the stack of one thread. Unlike cProfile it adds no
+    per-call overhead, so slow paths made of many small calls (YAML parsing, discovery) keep their proportions.
+    """
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.blocked_samples = 0
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._sample_loop, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _sample_loop(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            if frame.f_code.co_name in BLOCKING_FUNCTIONS:
+                self.blocked_samples += 1
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            self.stacks[tuple(reversed(stack))] += 1
+
+    def write_folded(self, path):
+        """Writes the samples in collapsed-stack format, which flamegraph.pl and speedscope read."""
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+
+
+class TestProfiler:
+    """
+    Test result listener that profiles every test, deterministically with cProfile or by stack sampling,
+    writes one profile file per test and a combined report of the top hotspots across the run.
+    Wall time is split into the CPU time of the test's thread and time blocked on I/O or sleeps (wall minus
+    that CPU time); the sampling mode also counts the samples caught in a blocking call.
+    """
+
+    def __init__(self, mode, output_dir, top=25):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unsupported profile mode '{mode}', expected one of {list(PROFILE_MODES)}")
+        self.mode = mode
+        self.output_dir = output_dir
+        self.top = top
+        self.timings = {}
+        self.profile_files = []
+        self.self_samples = Counter()
+        self.inclusive_samples = Counter()
+        self._profiler = None
+        self._started = None
+        os.makedirs(output_dir, exist_ok=True)
+
+    def start_test(self, test):
+        if self.mode == 'cprofile':
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._profiler = SamplingProfiler(threading.get_ident())
+            self._profiler.start()
+        # thread_time: process_time would add the CPU time of the log writer, watches and other workers
+        self._started = (time.perf_counter(), time.thread_time())
+
+    def stop_test(self, test):
+        """Stops profiling the test and returns its timing fields for the run report."""
+        wall = time.perf_counter() - self._started[0]
+        cpu = time.thread_time() - self._started[1]
+        profile_path = os.path.join(self.output_dir, _file_name(test.id()))
+
+        if self.mode == 'cprofile':
+            self._profiler.disable()
+            profile_path += '.prof'
+            self._profiler.dump_stats(profile_path)
+        else:
+            self._profiler.stop()
+            profile_path += '.folded'
+            self._profiler.write_folded(profile_path)
+            for stack, count in self._profiler.stacks.items():
+                self.self_samples[stack[-1]] += count
+                for label in set(stack):
+                    self.inclusive_samples[label] += count
+        self.profile_files.append(profile_path)
+
+        timing = {'wall_time': wall, 'cpu_time': cpu, 'blocked_time': max(0.0, wall - cpu)}
+        if self.mode == 'sampling':
+            timing['samples'] = sum(self._profiler.stacks.values())
+            timing['blocked_samples'] = self._profiler.blocked_samples
+        self.timings[test.id()] = timing
+        self._profiler = None
+        return timing
+
+    def format_hotspots(self):
+        """Formats the top-N functions across all tests by cumulative time (cprofile) or samples (sampling)."""
+        sampling = self.mode == 'sampling'
+        header = f"{'test':<80} {'wall':>8} {'cpu':>8} {'blocked':>8}"
+        lines = [f"{header} {'blocked samples':>16}" if sampling else header]
+        for test_id, timing in sorted(self.timings.items(), key=lambda item: item[1]['wall_time'], reverse=True):
+            line = f"{test_id:<80} {timing['wall_time']:7.2f}s {timing['cpu_time']:7.2f}s " \
+                   f"{timing['blocked_time']:7.2f}s"
+            if sampling:
+                line += f" {timing['blocked_samples']:>7}/{timing['samples']:<8}"
+            lines.append(line)
+        lines.append("")
+
+        if self.mode == 'cprofile':
+            if self.profile_files:
+                stream = io.StringIO()
+                stats = pstats.Stats(*self.profile_files, stream=stream)
+                stats.strip_dirs().sort_stats('cumulative').print_stats(self.top)
+                lines.append(stream.getvalue())
+        else:
+            total = sum(self.self_samples.values()) or 1
+            lines.append(f"{'inclusive':>10} {'self':>8}  function")
+            for label, count in self.inclusive_samples.most_common(self.top):
+                lines.append(f"{100 * count / total:9.1f}% {100 * self.self_samples[label] / total:7.1f}%  {label}")
+        return "\n".join(lines)
+
+    def write_report(self):
+        """Writes hotspots.txt and timings.json to the output directory and returns the hotspot report."""
+        report = self.format_hotspots()
+        with open(os.path.join(self.output_dir, 'hotspots.txt'), 'w') as f:
+            f.write(report)
+        with open(os.path.join(self.output_dir, 'timings.json'), 'w') as f:
+            json.dump({'mode': self.mode, 'tests': self.timings}, f, indent=2)
+        return report
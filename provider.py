@@ -1,16 +1,78 @@
+import time
 import yaml
 import path_searcher as path_builder
+from collections import namedtuple
+from kubernetes.client.exceptions import ApiException
 from logger import LoggerManager
 from path_searcher import get_config_path
 from k8s import KubernetesResourceManager
 from config_loader import ConfigLoader
+from tracer import LifecycleTracer
 
 config_data_file = get_config_path()
 config_data = ConfigLoader.load_config()
 manifests_path = path_builder.get_manifest_path()
 
 # Setup logger
-logger = LoggerManager.get_logger(config_data)
+logger = LoggerManager.get_logger(config_data, 'provider')
+
+# Phase durations in seconds; a phase that did not complete before the deadline is None
+ProviderInstallReport = namedtuple('ProviderInstallReport', [
+    'provider_name', 'revision_name', 'ready', 'package_pull', 'revision_activation', 'crd_establishment',
+    'total', 'crds', 'failed_phase',
+])
+
+
+def _conditions(resource):
+    return {condition.get('type'): condition.get('status')
+            for condition in (resource.get('status') or {}).get('conditions') or []}
+
+
+def _read(resource_api, name):
+    """Returns the current object, or None if it does not exist yet."""
+    try:
+        current = resource_api.get(name=name).to_dict()
+    except ApiException as e:
+        if e.status != 404:
+            raise
+        return None
+    LifecycleTracer.observe(current)
+    return current
+
+
+def _wait_for(resource_api, name, predicate, deadline):
+    """Reads an object once, then watches it until the predicate holds; returns the object or None on timeout."""
+    current = _read(resource_api, name)
+    if current is not None and predicate(current):
+        return current
+    resource_version = current['metadata']['resourceVersion'] if current is not None else None
+
+    while time.monotonic() < deadline:
+        remaining = max(1, int(deadline - time.monotonic()))
+        try:
+            for event in resource_api.watch(name=name, resource_version=resource_version, timeout=remaining):
+                current = event['raw_object']
+                if event['type'] == 'ERROR':
+                    # A Status, e.g. 410 Gone once the resourceVersion was compacted; re-read and watch from there
+                    raise ApiException(status=current.get('code'), reason=current.get('message'))
+                resource_version = current['metadata']['resourceVersion']
+                if event['type'] == 'DELETED':
+                    LifecycleTracer.observe_deleted(current.get('kind'), name)
+                    continue
+                LifecycleTracer.observe(current)
+                if predicate(current):
+                    return current
+                if time.monotonic() >= deadline:
+                    break
+        except ApiException as e:
+            if e.status != 410:
+                raise
+            logger.info("Watch of '%s' expired, re-reading it.", name)
+            current = _read(resource_api, name)
+            if current is not None and predicate(current):
+                return current
+            resource_version = current['metadata']['resourceVersion'] if current is not None else None
+    return None
 
 
 def install_digital_ocean_provider():
@@ -28,9 +90,9 @@ def install_digital_ocean_provider():
         provider_api = dynamic_client.resources.get(api_version='pkg.crossplane.io/v1', kind='Provider')
 
         provider_api.create(body=yaml_content, namespace="crossplane-system")
-        logger.info(f"Digital Ocean Provider '{provider_name}' applied successfully.")
+        logger.info("Digital Ocean Provider '%s' applied successfully.", provider_name)
     except Exception as e:
-        logger.error(f"Failed to apply Digital Ocean Provider: {e}")
+        logger.error("Failed to apply Digital Ocean Provider: %s", e)
 
 
 def uninstall_digital_ocean_provider():
@@ -44,9 +106,9 @@ def uninstall_digital_ocean_provider():
             f"{manifests_path}/digital_ocean/digital_ocean_provider.yaml"
         )
 
-        logger.info(f"Digital Ocean Provider '{provider_name}' deleted successfully.")
+        logger.info("Digital Ocean Provider '%s' deleted successfully.", provider_name)
     except Exception as e:
-        logger.error(f"Failed to delete Digital Ocean Provider '{provider_name}': {e}")
+        logger.error("Failed to delete Digital Ocean Provider '%s': %s", provider_name, e)
 
 
 def setup_digital_ocean_provider():
@@ -54,4 +116,86 @@ def setup_digital_ocean_provider():
         KubernetesResourceManager.create_resource_from_yaml(
             f"{manifests_path}/digital_ocean/digital_ocean_provider_config.yaml")
     except Exception as e:
-        logger.error(f"Failed to Set Up Digital Ocean Provider: {e}")
+        logger.error("Failed to Set Up Digital Ocean Provider: %s", e)
+
+
+def install_provider_and_wait(provider_yaml_file, timeout=None):
+    """
+    Installs a Provider package and watches it until the package is pulled, its ProviderRevision
+    is Healthy and every CRD it owns is Established, recording how long each phase took.
+    """
+    timeout = timeout or config_data.get('provider', {}).get('install_timeout', 300)
+    dynamic_client = KubernetesResourceManager.get_dynamic_kubernetes_client()
+
+    with open(provider_yaml_file, 'r') as f:
+        yaml_content = yaml.safe_load(f)
+    provider_name = yaml_content['metadata']['name']
+
+    provider_api = dynamic_client.resources.get(api_version='pkg.crossplane.io/v1', kind='Provider')
+    revision_api = dynamic_client.resources.get(api_version='pkg.crossplane.io/v1', kind='ProviderRevision')
+    crd_api = dynamic_client.resources.get(api_version='apiextensions.k8s.io/v1', kind='CustomResourceDefinition')
+
+    started = time.monotonic()
+    deadline = started + timeout
+    phases = {'package_pull': None, 'revision_activation': None, 'crd_establishment': None}
+    revision_name = None
+    crds = []
+
+    def report(failed_phase=None):
+        install_report = ProviderInstallReport(
+            provider_name=provider_name, revision_name=revision_name, ready=failed_phase is None,
+            total=time.monotonic() - started, crds=crds, failed_phase=failed_phase, **phases)
+        if failed_phase:
+            logger.error("Provider '%s' did not complete phase '%s' within %ss.", provider_name, failed_phase, timeout)
+        else:
+            logger.info("Provider '%s' ready in %.1fs (package pull %.1fs, revision activation %.1fs, CRD "
+                        "establishment %.1fs).",
+                        provider_name, install_report.total, phases['package_pull'], phases['revision_activation'],
+                        phases['crd_establishment'])
+        return install_report
+
+    try:
+        provider_api.create(body=yaml_content)
+    except ApiException as e:
+        if e.status != 409:
+            raise
+        logger.info("Provider '%s' already exists, waiting for it to become ready.", provider_name)
+
+    # The package manager creates the ProviderRevision once the package image has been pulled and parsed
+    provider = _wait_for(provider_api, provider_name,
+                         lambda current: (current.get('status') or {}).get('currentRevision'), deadline)
+    if provider is None:
+        return report('package_pull')
+    revision_name = provider['status']['currentRevision']
+    phases['package_pull'] = time.monotonic() - started
+
+    phase_started = time.monotonic()
+    revision = _wait_for(revision_api, revision_name,
+                         lambda current: _conditions(current).get('Healthy') == 'True', deadline)
+    if revision is None or _wait_for(provider_api, provider_name,
+                                     lambda current: _conditions(current).get('Installed') == 'True'
+                                     and _conditions(current).get('Healthy') == 'True', deadline) is None:
+        return report('revision_activation')
+    phases['revision_activation'] = time.monotonic() - phase_started
+
+    phase_started = time.monotonic()
+    crds = [ref['name'] for ref in (revision.get('status') or {}).get('objectRefs') or []
+            if ref.get('kind') == 'CustomResourceDefinition']
+    for crd_name in crds:
+        crd = _wait_for(crd_api, crd_name, lambda current: _conditions(current).get('Established') == 'True',
+                        deadline)
+        if crd is None:
+            return report('crd_establishment')
+        # Established means the API server serves the group; confirm discovery agrees for a served version
+        served_version = next((version['name'] for version in crd['spec']['versions'] if version.get('served')),
+                              None)
+        if served_version is None:
+            logger.error("CRD '%s' of provider '%s' serves no version.", crd_name, provider_name)
+            return report('crd_establishment')
+        response = KubernetesResourceManager.send_request_and_get_response(
+            "GET", f"apis/{crd['spec']['group']}/{served_version}")
+        if response.status_code != 200:
+            return report('crd_establishment')
+    phases['crd_establishment'] = time.monotonic() - phase_started
+
+    return report()
@@ -0,0 +1,182 @@
+import base64
+import os
+import string
+import time
+import yaml
+import path_searcher as path_builder
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from kubernetes.client.exceptions import ApiException
+
+import provider
+from config_loader import ConfigLoader
+from k8s import KubernetesResourceManager
+from logger import LoggerManager
+
+config_data = ConfigLoader.load_config()
+manifests_path = path_builder.get_manifest_path()
+
+# Setup logger
+logger = LoggerManager.get_logger(config_data, 'provider')
+
+ProviderEntry = namedtuple('ProviderEntry', ['name', 'provider', 'provider_config', 'secret', 'credentials_env'])
+
+ProviderSetupResult = namedtuple('ProviderSetupResult', ['name', 'ready', 'healthy', 'install_report', 'duration',
+                                                         'error'])
+
+
+def _resolve_manifest(path):
+    if not path or os.path.isabs(path):
+        return path
+    return os.path.join(manifests_path, path)
+
+
+def _load_manifest(path, substitutions=None):
+    with open(path, 'r') as f:
+        content = f.read()
+    if substitutions:
+        content = string.Template(content).safe_substitute(substitutions)
+    return yaml.safe_load(content)
+
+
+def _create_or_replace(dynamic_client, document):
+    """Creates an object or replaces the existing one, so changed credentials or settings take effect."""
+    resource_api = dynamic_client.resources.get(api_version=document['apiVersion'], kind=document['kind'])
+    namespace = document['metadata'].get('namespace')
+    try:
+        resource_api.create(body=document, namespace=namespace)
+    except ApiException as e:
+        if e.status != 409:
+            raise
+        current = resource_api.get(name=document['metadata']['name'], namespace=namespace)
+        resource_api.replace(body=dict(document, metadata=dict(
+            document['metadata'], resourceVersion=current.metadata.resourceVersion)), namespace=namespace)
+
+
+def _delete_if_present(dynamic_client, document):
+    resource_api = dynamic_client.resources.get(api_version=document['apiVersion'], kind=document['kind'])
+    try:
+        resource_api.delete(name=document['metadata']['name'], namespace=document['metadata'].get('namespace'))
+    except ApiException as e:
+        if e.status != 404:
+            raise
+
+
+class ProviderRegistry:
+    """
+    Class for installing, configuring and health-checking every provider declared under 'providers' in the config.
+    """
+
+    @staticmethod
+    def get_entries(names=None):
+        """Returns the configured providers, optionally restricted to the given names."""
+        entries = [ProviderEntry(
+            name=entry['name'],
+            provider=_resolve_manifest(entry['provider']),
+            provider_config=_resolve_manifest(entry.get('provider_config')),
+            secret=_resolve_manifest(entry.get('secret')),
+            credentials_env=entry.get('credentials_env'),
+        ) for entry in config_data.get('providers') or []]
+        if names:
+            entries = [entry for entry in entries if entry.name in names]
+        return entries
+
+    @staticmethod
+    def setup_provider(entry, timeout=None):
+        """Creates the credentials Secret, installs the Provider, waits for it and applies its ProviderConfig."""
+        started = time.monotonic()
+        install_report = None
+        try:
+            dynamic_client = KubernetesResourceManager.get_dynamic_kubernetes_client()
+
+            if entry.secret:
+                substitutions = {}
+                if entry.credentials_env:
+                    credentials = os.environ.get(entry.credentials_env)
+                    if not credentials:
+                        raise ValueError(f"Environment variable '{entry.credentials_env}' with the credentials of "
+                                         f"provider '{entry.name}' is not set")
+                    substitutions['token'] = base64.b64encode(credentials.encode('utf-8')).decode('ascii')
+                _create_or_replace(dynamic_client, _load_manifest(entry.secret, substitutions))
+
+            install_report = provider.install_provider_and_wait(entry.provider, timeout=timeout)
+            if not install_report.ready:
+                return ProviderSetupResult(entry.name, False, False, install_report, time.monotonic() - started,
+                                           f"phase '{install_report.failed_phase}' did not complete")
+
+            # The ProviderConfig kind only exists once the provider's CRDs are established
+            if entry.provider_config:
+                _create_or_replace(dynamic_client, _load_manifest(entry.provider_config))
+
+            healthy = ProviderRegistry.check_health(entry)
+            logger.info("Provider '%s' set up in %.1fs, healthy: %s.", entry.name, time.monotonic() - started, healthy)
+            return ProviderSetupResult(entry.name, True, healthy, install_report, time.monotonic() - started, None)
+        except Exception as e:
+            logger.error("Failed to set up provider '%s': %s", entry.name, e)
+            return ProviderSetupResult(entry.name, False, False, install_report, time.monotonic() - started, str(e))
+
+    @staticmethod
+    def check_health(entry):
+        """Returns True if the Provider reports both Installed and Healthy."""
+        with open(entry.provider, 'r') as f:
+            provider_name = yaml.safe_load(f)['metadata']['name']
+        response_json = KubernetesResourceManager.send_request_and_get_json_response(
+            "GET", f"apis/pkg.crossplane.io/v1/providers/{provider_name}")
+        conditions = {condition['type']: condition['status']
+                      for condition in response_json.get('status', {}).get('conditions', [])}
+        return conditions.get('Installed') == 'True' and conditions.get('Healthy') == 'True'
+
+    @staticmethod
+    def setup_all(names=None, max_workers=None, timeout=None):
+        """
+        Sets up every configured provider concurrently, so bootstrap takes as long as the slowest provider.
+        Returns {provider name: ProviderSetupResult}.
+        """
+        entries = ProviderRegistry.get_entries(names)
+        if not entries:
+            return {}
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=max_workers or len(entries)) as executor:
+            results = list(executor.map(lambda entry: ProviderRegistry.setup_provider(entry, timeout), entries))
+
+        logger.info("Set up %s/%s providers in %.1fs.",
+                    sum(result.ready for result in results), len(results), time.monotonic() - started)
+        return {result.name: result for result in results}
+
+    @staticmethod
+    def check_health_all(names=None, max_workers=None):
+        """Health-checks every configured provider concurrently and returns {provider name: healthy}."""
+        entries = ProviderRegistry.get_entries(names)
+        if not entries:
+            return {}
+        with ThreadPoolExecutor(max_workers=max_workers or len(entries)) as executor:
+            return dict(zip((entry.name for entry in entries), executor.map(ProviderRegistry.check_health, entries)))
+
+    @staticmethod
+    def teardown_all(names=None, max_workers=None):
+        """Deletes the ProviderConfig, Provider and credentials Secret of every configured provider concurrently."""
+        def teardown(entry):
+            if entry.provider_config:
+                KubernetesResourceManager.delete_cluster_resource_by_file(entry.provider_config)
+            KubernetesResourceManager.delete_cluster_resource_by_file(entry.provider)
+            if entry.secret:
+                try:
+                    _delete_if_present(KubernetesResourceManager.get_dynamic_kubernetes_client(),
+                                       _load_manifest(entry.secret))
+                except Exception as e:
+                    logger.error("Failed to delete the credentials Secret of provider '%s': %s", entry.name, e)
+
+        entries = ProviderRegistry.get_entries(names)
+        if entries:
+            with ThreadPoolExecutor(max_workers=max_workers or len(entries)) as executor:
+                list(executor.map(teardown, entries))
+
+    @staticmethod
+    def format_results(results):
+        """Formats the setup results of setup_all, one line per provider."""
+        lines = []
+        for name, result in sorted(results.items()):
+            state = 'ready' if result.ready else f"failed: {result.error}"
+            lines.append(f"{name:<40} {state}, healthy: {result.healthy} ({result.duration:.1f}s)")
+        return "\n".join(lines)
@@ -0,0 +1,245 @@
+import threading
+import time
+import yaml
+from collections import namedtuple
+from urllib.parse import urlencode
+
+from config_loader import ConfigLoader
+from k8s import KubernetesResourceManager
+from logger import LoggerManager
+from tracer import LifecycleTracer
+
+config_data = ConfigLoader.load_config()
+
+# Setup logger
+logger = LoggerManager.get_logger(config_data, 'k8s')
+
+# predicate: callable taking the observed object, or None while the object does not exist
+BarrierTarget = namedtuple('BarrierTarget', ['api_version', 'kind', 'namespace', 'name', 'predicate'])
+
+# last_status: the 'status' of the last observed version of the object, or None if it was never seen
+# error: why the object could not be observed, e.g. its kind could not be listed, or None
+UnsatisfiedTarget = namedtuple('UnsatisfiedTarget', ['target', 'exists', 'last_status', 'error'])
+
+BarrierResult = namedtuple('BarrierResult', ['satisfied', 'unsatisfied', 'elapsed'])
+
+# List failures that can pass, so the list is retried with backoff; any other status fails the barrier
+RETRIED_LIST_STATUSES = {429, 500, 502, 503, 504}
+MAX_LIST_BACKOFF = 16
+
+
+class BarrierListError(Exception):
+    """Raised when the list of a barrier's GVK is answered with an error status, e.g. 403 or 404."""
+
+    def __init__(self, api_path, status_code, message):
+        super().__init__(f"Listing {api_path} returned {status_code}: {message}")
+        self.status_code = status_code
+
+
+def condition_is(condition_type, status='True'):
+    """Predicate: the object has the given status condition, e.g. condition_is('Ready')."""
+    def predicate(resource):
+        conditions = ((resource or {}).get('status') or {}).get('conditions') or []
+        return any(condition.get('type') == condition_type and condition.get('status') == status
+                   for condition in conditions)
+    return predicate
+
+
+def all_of(*predicates):
+    """Predicate: every given predicate holds."""
+    return lambda resource: all(predicate(resource) for predicate in predicates)
+
+
+def exists(resource):
+    """Predicate: the object exists."""
+    return resource is not None
+
+
+def absent(resource):
+    """Predicate: the object does not exist, e.g. after its finalizers ran."""
+    return resource is None
+
+
+def targets_from_manifest(yaml_file_path, predicate=exists):
+    """Returns one target per document of a manifest file or generated document, all waiting on the same predicate."""
+    if isinstance(yaml_file_path, dict):
+        documents = [yaml_file_path]
+    else:
+        with open(yaml_file_path, 'r') as f:
+            documents = [document for document in yaml.safe_load_all(f) if document]
+    return [BarrierTarget(document['apiVersion'], document['kind'], document['metadata'].get('namespace'),
+                          document['metadata']['name'], predicate) for document in documents]
+
+
+class _GroupWatch:
+    """List+watch of one GVK, evaluating the predicates of every target of that GVK."""
+
+    def __init__(self, api_version, kind, targets, deadline):
+        self.targets = {(target.namespace, target.name): target for target in targets}
+        self.pending = set(self.targets)
+        self.last_seen = {}
+        self.deadline = deadline
+        self.response = None
+        self.stopped = False
+        self.error = None
+
+        api_prefix = "apis" if "/" in api_version else "api"
+        plural = KubernetesResourceManager.resolve_plural(api_version, kind)
+        namespaces = {target.namespace for target in targets}
+        # A single namespace is listed directly; mixed namespaces are listed across all of them
+        namespace_path = f"namespaces/{next(iter(namespaces))}/" if len(namespaces) == 1 and None not in namespaces \
+            else ""
+        self.api_path = f"{api_prefix}/{api_version}/{namespace_path}{plural}"
+        # A lone target is selected server-side, so unrelated objects of a busy GVK are not streamed
+        self.params = {'fieldSelector': f"metadata.name={targets[0].name}"} if len(targets) == 1 else {}
+
+    def _evaluate(self, key):
+        resource = self.last_seen.get(key)
+        if self.targets[key].predicate(resource):
+            self.pending.discard(key)
+        else:
+            self.pending.add(key)
+
+    def _observe(self, event_type, resource):
+        metadata = resource.get('metadata', {})
+        key = (metadata.get('namespace'), metadata.get('name'))
+        if key not in self.targets:
+            return
+        if event_type == 'DELETED':
+            self.last_seen.pop(key, None)
+            LifecycleTracer.observe_deleted(resource.get('kind'), key[1], key[0])
+        else:
+            self.last_seen[key] = resource
+            LifecycleTracer.observe(resource)
+        self._evaluate(key)
+
+    def _list(self):
+        response = KubernetesResourceManager.send_request_and_get_response(
+            "GET", f"{self.api_path}?{urlencode(self.params)}" if self.params else self.api_path)
+        if response.status_code != 200:
+            # The body is a Status, which would otherwise read as an empty list and satisfy 'absent'
+            raise BarrierListError(self.api_path, response.status_code, response.text)
+        response_json = response.json()
+        LifecycleTracer.observe(response_json)
+        item_kind = (response_json.get('kind') or '').rsplit('List', 1)[0]
+        self.last_seen = {}
+        for item in response_json.get('items', []):
+            item.setdefault('kind', item_kind)
+            metadata = item.get('metadata', {})
+            if (metadata.get('namespace'), metadata.get('name')) in self.targets:
+                self.last_seen[(metadata.get('namespace'), metadata.get('name'))] = item
+        for key in self.targets:
+            self._evaluate(key)
+        return response_json.get('metadata', {}).get('resourceVersion')
+
+    def _backoff(self, delay):
+        time.sleep(max(0, min(delay, self.deadline - time.monotonic())))
+        return min(delay * 2, MAX_LIST_BACKOFF)
+
+    def run(self):
+        resource_version = None
+        delay = 1
+        while self.pending and not self.stopped and time.monotonic() < self.deadline:
+            try:
+                if resource_version is None:
+                    resource_version = self._list()
+                    delay = 1
+                    if not self.pending:
+                        break
+                remaining = max(1, int(self.deadline - time.monotonic()))
+                self.response = KubernetesResourceManager.open_watch(self.api_path, resource_version,
+                                                                     timeout_seconds=remaining, params=self.params)
+                for watch_event in KubernetesResourceManager.iter_watch_events(self.response):
+                    resource = watch_event.get('object', {})
+                    if watch_event.get('type') == 'ERROR':
+                        # 410 Gone: relist and watch again from the fresh resourceVersion
+                        resource_version = None
+                        break
+                    resource_version = resource.get('metadata', {}).get('resourceVersion', resource_version)
+                    if watch_event.get('type') != 'BOOKMARK':
+                        self._observe(watch_event['type'], resource)
+                    if not self.pending or self.stopped:
+                        break
+            except BarrierListError as e:
+                if e.status_code not in RETRIED_LIST_STATUSES:
+                    self.error = str(e)
+                    break
+                logger.warning("%s, retrying in %ss", e, delay)
+                delay = self._backoff(delay)
+            except Exception as e:
+                if self.stopped:
+                    break
+                logger.warning("Readiness watch on %s interrupted, retrying in %ss: %s", self.api_path, delay, e)
+                delay = self._backoff(delay)
+            finally:
+                if self.response is not None:
+                    self.response.close()
+
+    def stop(self):
+        self.stopped = True
+        if self.response is not None:
+            self.response.close()
+
+
+class ReadinessBarrier:
+    """
+    Class for waiting on many objects at once: one list+watch per GVK evaluates every target's predicate
+    against the stream, instead of polling or watching each object separately.
+    """
+
+    @staticmethod
+    def wait(targets, timeout=300):
+        """
+        Blocks until every target's predicate holds or the timeout passes, and returns a BarrierResult
+        listing the targets that were still unsatisfied with their last observed status.
+        """
+        started = time.monotonic()
+        deadline = started + timeout
+        groups = {}
+        for target in targets:
+            groups.setdefault((target.api_version, target.kind), []).append(target)
+
+        watches = [_GroupWatch(api_version, kind, group_targets, deadline)
+                   for (api_version, kind), group_targets in groups.items()]
+        threads = [threading.Thread(target=LoggerManager.with_test_id(watch.run), name=f"barrier-{watch.api_path}",
+                                    daemon=True)
+                   for watch in watches]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(max(0, deadline - time.monotonic()))
+        for watch in watches:
+            watch.stop()
+
+        satisfied = []
+        unsatisfied = []
+        for watch in watches:
+            for key, target in watch.targets.items():
+                if key in watch.pending:
+                    resource = watch.last_seen.get(key)
+                    unsatisfied.append(UnsatisfiedTarget(target, resource is not None,
+                                                         (resource or {}).get('status'), watch.error))
+                else:
+                    satisfied.append(target)
+
+        result = BarrierResult(satisfied, unsatisfied, time.monotonic() - started)
+        for item in unsatisfied:
+            if item.error:
+                logger.error("'%s' named '%s' could not be observed: %s", item.target.kind, item.target.name,
+                             item.error)
+            else:
+                logger.warning("'%s' named '%s' not ready after %ss, last status: %s", item.target.kind,
+                               item.target.name, timeout, item.last_status if item.exists else 'not found')
+        return result
+
+    @staticmethod
+    def _describe(item):
+        if item.error:
+            return item.error
+        return item.last_status if item.exists else 'not found'
+
+    @staticmethod
+    def format_unsatisfied(result):
+        """Formats the unsatisfied targets of a BarrierResult for assertion messages."""
+        return "\n".join(f"{item.target.kind}/{item.target.name}: {ReadinessBarrier._describe(item)}"
+                         for item in result.unsatisfied)
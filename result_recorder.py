@@ -0,0 +1,89 @@
+import json
+import os
+import time
+import unittest
+
+from logger import LoggerManager
+
+
+class RecordingTestResult(unittest.TextTestResult):
+    """
+    Test result that records the outcome and wall-clock duration of every test for the run report.
+    Failure annotators are called with a failed test and return extra report fields, e.g. cluster events.
+    Listeners get start_test(test) and stop_test(test) around every test; stop_test may return report fields.
+    """
+    failure_annotators = []
+    listeners = []
+
+    def __init__(self, stream, descriptions, verbosity):
+        super().__init__(stream, descriptions, verbosity)
+        self.records = []
+        self._started = {}
+
+    def startTest(self, test):
+        self._started[test.id()] = (time.time(), time.perf_counter())
+        LoggerManager.set_test_id(test.id())
+        super().startTest(test)
+        for listener in self.listeners:
+            listener.start_test(test)
+
+    def stopTest(self, test):
+        for listener in reversed(self.listeners):
+            fields = listener.stop_test(test)
+            if fields and self.records and self.records[-1]['test'] == test.id():
+                self.records[-1].update(fields)
+        super().stopTest(test)
+        LoggerManager.set_test_id(None)
+
+    def _record(self, test, outcome, detail=None):
+        started_at, started = self._started.pop(test.id(), (None, None))
+        record = {
+            'test': test.id(),
+            'outcome': outcome,
+            'started': started_at,
+            'duration': time.perf_counter() - started if started is not None else 0.0,
+            'detail': detail,
+        }
+        if outcome in ('failed', 'error'):
+            for annotator in self.failure_annotators:
+                record.update(annotator(test))
+            if record.get('events'):
+                self.stream.writeln(f"\nEvents for {test.id()}:\n" + "\n".join(record['events']))
+        self.records.append(record)
+
+    def addSuccess(self, test):
+        super().addSuccess(test)
+        self._record(test, 'passed')
+
+    def addFailure(self, test, err):
+        super().addFailure(test, err)
+        self._record(test, 'failed', self._exc_info_to_string(err, test))
+
+    def addError(self, test, err):
+        super().addError(test, err)
+        self._record(test, 'error', self._exc_info_to_string(err, test))
+
+    def addSkip(self, test, reason):
+        super().addSkip(test, reason)
+        self._record(test, 'skipped', reason)
+
+    def addExpectedFailure(self, test, err):
+        super().addExpectedFailure(test, err)
+        self._record(test, 'passed')
+
+    def addUnexpectedSuccess(self, test):
+        super().addUnexpectedSuccess(test)
+        self._record(test, 'failed', 'unexpected success')
+
+
+def write_report(records, report_path, **metadata):
+    """Writes the recorded test results as a JSON report."""
+    os.makedirs(os.path.dirname(os.path.abspath(report_path)), exist_ok=True)
+    with open(report_path, 'w') as f:
+        json.dump(dict(metadata, tests=records), f, indent=2)
+
+
+def read_report(report_path):
+    """Reads a JSON report written by write_report."""
+    with open(report_path, 'r') as f:
+        return json.load(f)
@@ -1,6 +1,265 @@
+import argparse
+import os
+import sys
 import unittest
+from datetime import datetime, timezone
 
-if __name__ == '__main__':
+from cassette import Cassette
+from cluster_fanout import ClusterFanOut
+from event_collector import ClusterEventCollector
+from fingerprint import TestFingerprint
+from helm import CrossplaneHelmManager
+from leak_scanner import REAPED_REASONS, LeakScanner
+from metrics_sampler import MetricsSampler
+from namespace_pool import NamespacePool
+from perf_history import PerfHistory
+from preflight import Preflight
+from profiling import PROFILE_MODES, TestProfiler
+from provider_registry import ProviderRegistry
+from result_recorder import RecordingTestResult, write_report
+from sharding import TestSharding, parse_shard
+from soak import SoakTest
+from teardown_queue import TeardownQueue
+from tracer import LifecycleTracer
+from version_matrix import VersionMatrix
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Crossplane test suite.")
+    parser.add_argument('--report', help="write a JSON report of per-test outcomes and durations to this path")
+    parser.add_argument('--incremental', action='store_true',
+                        help="skip tests whose manifests, source and cluster versions are unchanged since they "
+                             "last passed in an incremental run")
+    parser.add_argument('--shard', metavar='I/N',
+                        help="run only shard I of N, balanced by recorded test durations")
+    parser.add_argument('--namespace-pool', action='store_true',
+                        help="lease namespaces with the shared RBAC to the namespaced tests from a pool created while "
+                             "the suite is prepared and recycled between tests (see 'namespace_pool' in config.yaml)")
+    parser.add_argument('--events', action='store_true',
+                        help="watch cluster events during the run and attach them to failing tests")
+    parser.add_argument('--trace', metavar='DIR',
+                        help="record a timeline of resource operations and status transitions, write it to "
+                             "DIR/trace.json (Chrome trace format) and print each test's critical path")
+    parser.add_argument('--metrics', metavar='DIR',
+                        help="sample the metrics of the Crossplane, RBAC manager and provider pods during the run, "
+                             "write them to DIR/metrics.json and report each test's controller activity "
+                             "(see 'metrics' in config.yaml)")
+    parser.add_argument('--profile', choices=PROFILE_MODES,
+                        help="profile every test deterministically (cprofile) or by stack sampling, and report "
+                             "wall, CPU and blocked time with the top hotspots")
+    parser.add_argument('--profile-dir', default='reports/profile',
+                        help="directory for the per-test profiles and the hotspot report")
+    cassette_mode = parser.add_mutually_exclusive_group()
+    cassette_mode.add_argument('--record', dest='cassette', action='store_const', const='record',
+                               help="record every Kubernetes API exchange into one cassette per test")
+    cassette_mode.add_argument('--replay', dest='cassette', action='store_const', const='replay',
+                               help="answer every Kubernetes API call from the recorded cassettes, without a cluster")
+    parser.add_argument('--cassette-dir', default='tests/cassettes', help="directory of the cassettes")
+    parser.add_argument('--scan-leaks', action='store_true',
+                        help="after the run, list Crossplane objects the run created and did not delete")
+    parser.add_argument('--reap-leaks', action='store_true',
+                        help="like --scan-leaks, and delete the leftovers labelled with this run's id and what they "
+                             "composed, claims first")
+    parser.add_argument('--preflight', action='store_true',
+                        help="instead of the suite, dry-run every manifest against the cluster (server-side apply, "
+                             "dryRun=All) and report the documents it would reject")
+    parser.add_argument('--perf-history', action='store_true',
+                        help="append test durations, API latencies and times to Ready to the performance history "
+                             "and compare the run with its rolling baseline")
+    parser.add_argument('--perf-report', action='store_true',
+                        help="instead of the suite, compare the latest recorded run with its rolling baseline")
+    parser.add_argument('--soak', action='store_true',
+                        help="instead of the suite, churn claims at a target rate and report latency drift "
+                             "(see 'soak' in config.yaml)")
+    parser.add_argument('--soak-duration', type=float, help="soak duration in seconds")
+    parser.add_argument('--soak-rate', type=float, help="soak operations per second")
+    parser.add_argument('--install-crossplane', action='store_true',
+                        help="install or upgrade the configured Crossplane chart before running the suite")
+    parser.add_argument('--providers',
+                        help="comma-separated 'providers' from config.yaml, or 'all', to set up concurrently before "
+                             "the suite (credentials Secret, Provider, ProviderConfig); the run stops if one of "
+                             "them does not become ready")
+    parser.add_argument('--teardown-providers', action='store_true',
+                        help="after the suite, delete the ProviderConfig, Provider and credentials Secret of the "
+                             "--providers")
+    parser.add_argument('--matrix', help="comma-separated 'matrix' entries from config.yaml (Crossplane version "
+                                         "and cluster target) to run concurrently, or 'all'")
+    parser.add_argument('--clusters', help="comma-separated cluster targets from config.yaml to run against "
+                                           "concurrently, or 'all'")
+    return parser.parse_args(argv)
+
+
+def suite_args(args, target):
+    """
+    Returns the flags of a suite run to forward to the child run against one fan-out or matrix target. Output
+    directories get a subdirectory per target, so concurrent children never write the same files.
+    """
+    forwarded = []
+    for flag in ('incremental', 'namespace_pool', 'events', 'scan_leaks', 'reap_leaks', 'perf_history',
+                 'install_crossplane', 'teardown_providers'):
+        if getattr(args, flag):
+            forwarded.append(f"--{flag.replace('_', '-')}")
+    for flag in ('shard', 'providers'):
+        if getattr(args, flag):
+            forwarded.extend([f"--{flag}", getattr(args, flag)])
+    for flag in ('trace', 'metrics'):
+        if getattr(args, flag):
+            forwarded.extend([f"--{flag}", os.path.join(getattr(args, flag), target)])
+    if args.profile:
+        forwarded.extend(['--profile', args.profile, '--profile-dir', os.path.join(args.profile_dir, target)])
+    if args.cassette:
+        forwarded.extend([f"--{args.cassette}", '--cassette-dir', os.path.join(args.cassette_dir, target)])
+    return forwarded
+
+
+def run_suite(args):
+    run_started = datetime.now(timezone.utc)
+    cassette = None
+    if args.cassette:
+        cassette = Cassette(args.cassette, args.cassette_dir).install()
+        RecordingTestResult.listeners.append(cassette)
+    if args.install_crossplane:
+        CrossplaneHelmManager.run_sync(CrossplaneHelmManager.install_crossplane_helm_chart())
+    provider_names = None if args.providers in (None, 'all') else args.providers.split(',')
+    if args.providers:
+        setup_results = ProviderRegistry.setup_all(provider_names)
+        if not setup_results:
+            raise ValueError(f"No providers named {args.providers} under 'providers' in config.yaml")
+        print(f"Providers:\n{ProviderRegistry.format_results(setup_results)}")
+        if not all(result.ready for result in setup_results.values()):
+            return False
+    if args.namespace_pool:
+        NamespacePool.shared()
     suite = unittest.defaultTestLoader.discover(start_dir='tests', pattern='test_*.py')
-    runner = unittest.TextTestRunner(verbosity=2)
-    runner.run(suite)
+    if args.shard:
+        suite = TestSharding.select_shard(suite, *parse_shard(args.shard))
+    # Fingerprinting costs a cluster version lookup and a cache write, so it only runs for incremental runs
+    fingerprints = TestFingerprint.fingerprint_suite(suite, skip_unchanged=True) if args.incremental else {}
+
+    if args.trace:
+        LifecycleTracer.enable()
+    if args.perf_history:
+        PerfHistory.start_run()
+
+    profiler = None
+    if args.profile:
+        profiler = TestProfiler(args.profile, args.profile_dir)
+        RecordingTestResult.listeners.append(profiler)
+
+    collector = None
+    if args.events:
+        collector = ClusterEventCollector.start_session()
+        RecordingTestResult.failure_annotators.append(collector.annotate_failure)
+
+    sampler = None
+    if args.metrics:
+        sampler = MetricsSampler.start_session()
+        RecordingTestResult.listeners.append(sampler)
+
+    runner = unittest.TextTestRunner(verbosity=2, resultclass=RecordingTestResult)
+    try:
+        result = runner.run(suite)
+    finally:
+        # Queued teardowns still call the API, so they finish before the collector and the cassette stop
+        teardown_report = TeardownQueue.drain()
+        if args.namespace_pool:
+            NamespacePool.close_shared()
+        if args.providers and args.teardown_providers:
+            ProviderRegistry.teardown_all(provider_names)
+        if sampler is not None:
+            sampler.stop()
+        if collector is not None:
+            collector.stop()
+        if cassette is not None:
+            cassette.stop()
+
+    if teardown_report.failures:
+        print(f"Teardown failures:\n{TeardownQueue.format_failures(teardown_report)}")
+    TestFingerprint.record_results(fingerprints, result.records)
+    TestSharding.record_durations(result.records)
+    if args.report:
+        write_report(result.records, args.report)
+    if args.trace:
+        LifecycleTracer.export_chrome_trace(os.path.join(args.trace, 'trace.json'), result.records)
+        print(LifecycleTracer.format_critical_paths(result.records))
+    if profiler is not None:
+        print(profiler.write_report())
+    if sampler is not None:
+        sampler.write_series(os.path.join(args.metrics, 'metrics.json'))
+        print(f"Controller activity during the run:\n{sampler.format_summary(sampler.summarize())}")
+    if args.perf_history:
+        print(PerfHistory.format_comparison(PerfHistory.compare(PerfHistory.record_run(result.records))))
+    if args.scan_leaks or args.reap_leaks:
+        scan_result = LeakScanner.scan(since=run_started)
+        leaks = [leak for leak in scan_result.leaks if leak.reason in REAPED_REASONS]
+        created = [leak for leak in scan_result.leaks if leak.reason not in REAPED_REASONS]
+        if leaks:
+            print(f"Leaked objects:\n{LeakScanner.format_leaks(leaks)}")
+            if args.reap_leaks:
+                LeakScanner.reap(leaks)
+        if created:
+            print(f"Objects created during the run without this run's label, possibly by other runs "
+                  f"(not reaped):\n{LeakScanner.format_leaks(created)}")
+    return result.wasSuccessful()
+
+
+def run_preflight(args):
+    report = Preflight.run()
+    print(Preflight.format_report(report))
+    return not any(result.status == 'rejected' for result in report.results)
+
+
+def run_perf_report(args):
+    comparison = PerfHistory.compare()
+    print(PerfHistory.format_comparison(comparison))
+    return comparison is not None and not comparison.regressions
+
+
+def run_soak(args):
+    soak_test = SoakTest()
+    sampler = MetricsSampler.start_session() if args.metrics else None
+    try:
+        report = soak_test.run(duration=args.soak_duration, rate=args.soak_rate)
+    finally:
+        if sampler is not None:
+            sampler.stop()
+        soak_test.cleanup()
+    if sampler is not None:
+        sampler.write_series(os.path.join(args.metrics, 'metrics.json'))
+        print(f"Controller activity during the soak:\n{sampler.format_summary(sampler.summarize())}")
+    SoakTest.write_report(report, args.report or 'reports/soak.json')
+    print(f"{report.operations} operations, {report.errors} errors in {report.elapsed:.0f}s")
+    for flag in report.flags:
+        print(f"DRIFT: {flag}")
+    return not report.flags
+
+
+def run_matrix(args):
+    entry_names = None if args.matrix == 'all' else args.matrix.split(',')
+    merged = VersionMatrix.run(entry_names, runner_args=lambda name: suite_args(args, name))
+    print(ClusterFanOut.format_report(merged))
+    return all(entry['exit_code'] == 0 for entry in merged['clusters'].values())
+
+
+def run_fan_out(args):
+    cluster_names = None if args.clusters == 'all' else args.clusters.split(',')
+    merged = ClusterFanOut.run(cluster_names, runner_args=lambda name: suite_args(args, name))
+    print(ClusterFanOut.format_report(merged))
+    return all(cluster['exit_code'] == 0 for cluster in merged['clusters'].values())
+
+
+if __name__ == '__main__':
+    arguments = parse_args()
+    if arguments.preflight:
+        successful = run_preflight(arguments)
+    elif arguments.perf_report:
+        successful = run_perf_report(arguments)
+    elif arguments.soak:
+        successful = run_soak(arguments)
+    elif arguments.matrix:
+        successful = run_matrix(arguments)
+    elif arguments.clusters:
+        successful = run_fan_out(arguments)
+    else:
+        successful = run_suite(arguments)
+    sys.exit(0 if successful else 1)
@@ -0,0 +1,332 @@
+import hashlib
+import json
+import os
+import re
+import yaml
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import path_searcher as path_builder
+from config_loader import ConfigLoader
+from json_patch import apply_json_patch
+from logger import LoggerManager
+
+config_data = ConfigLoader.load_config()
+manifests_path = path_builder.get_manifest_path()
+
+# Setup logger
+logger = LoggerManager.get_logger(config_data, 'validation')
+
+# A single field-addressed violation, shaped like the 'causes' of a Kubernetes 422 response
+SchemaViolation = namedtuple('SchemaViolation', ['field', 'reason', 'message', 'value'])
+
+# Top-level fields the API server manages for every object
+OBJECT_SYSTEM_FIELDS = ('apiVersion', 'kind', 'metadata', 'status')
+
+# Fields Crossplane injects into the spec of every claim and composite resource
+CROSSPLANE_SPEC_FIELDS = (
+    'claimRef', 'compositeDeletePolicy', 'compositionRef', 'compositionRevisionRef',
+    'compositionRevisionSelector', 'compositionSelector', 'compositionUpdatePolicy',
+    'environmentConfigRefs', 'publishConnectionDetailsTo', 'resourceRef', 'resourceRefs',
+    'writeConnectionSecretToRef',
+)
+
+_TYPE_CHECKS = {
+    'object': lambda value: isinstance(value, dict),
+    'array': lambda value: isinstance(value, list),
+    'string': lambda value: isinstance(value, str),
+    'boolean': lambda value: isinstance(value, bool),
+    'integer': lambda value: isinstance(value, int) and not isinstance(value, bool),
+    'number': lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+}
+
+# Compiled validators keyed by the content hash of their openAPIV3Schema
+_compiled_schemas = {}
+# (apiVersion, kind) -> schema hash, for both the composite and the claim kind of every XRD
+_schema_index = {}
+
+
+def _join(path, field):
+    return f"{path}.{field}" if path else field
+
+
+def _compile(schema, report_unknown=True):
+    """
+    Compiles an OpenAPI v3 structural schema into a validator function.
+    Value validations inside allOf/anyOf/oneOf do not declare fields, so unknown fields are only reported outside them.
+    """
+    checks = []
+
+    expected_type = schema.get('type')
+    nullable = schema.get('nullable', False)
+    int_or_string = schema.get('x-kubernetes-int-or-string', False)
+
+    if int_or_string:
+        def check_int_or_string(value, path, errors):
+            if not _TYPE_CHECKS['integer'](value) and not isinstance(value, str):
+                errors.append(SchemaViolation(path, 'FieldValueTypeInvalid',
+                                              "must be an integer or a string", value))
+                return False
+            return True
+
+        checks.append(check_int_or_string)
+    elif expected_type in _TYPE_CHECKS:
+        type_check = _TYPE_CHECKS[expected_type]
+
+        def check_type(value, path, errors):
+            if not type_check(value):
+                errors.append(SchemaViolation(path, 'FieldValueTypeInvalid',
+                                              f"must be of type {expected_type}", value))
+                return False
+            return True
+
+        checks.append(check_type)
+
+    if 'enum' in schema:
+        allowed = schema['enum']
+
+        def check_enum(value, path, errors):
+            if value not in allowed:
+                errors.append(SchemaViolation(path, 'FieldValueNotSupported',
+                                              f"supported values: {', '.join(map(str, allowed))}", value))
+            return True
+
+        checks.append(check_enum)
+
+    if 'pattern' in schema:
+        pattern = re.compile(schema['pattern'])
+
+        def check_pattern(value, path, errors):
+            if isinstance(value, str) and not pattern.search(value):
+                errors.append(SchemaViolation(path, 'FieldValueInvalid',
+                                              f"should match '{pattern.pattern}'", value))
+            return True
+
+        checks.append(check_pattern)
+
+    for keyword, compare, text in (('minLength', lambda v, b: len(v) < b, "at least {} chars long"),
+                                   ('maxLength', lambda v, b: len(v) > b, "at most {} chars long")):
+        if keyword in schema:
+            checks.append(_bound_check(schema[keyword], compare, text, str))
+
+    for keyword, compare, text in (('minItems', lambda v, b: len(v) < b, "at least {} items"),
+                                   ('maxItems', lambda v, b: len(v) > b, "at most {} items")):
+        if keyword in schema:
+            checks.append(_bound_check(schema[keyword], compare, text, list))
+
+    if 'minimum' in schema:
+        exclusive = schema.get('exclusiveMinimum', False)
+        compare = (lambda v, b: v <= b) if exclusive else (lambda v, b: v < b)
+        text = "should be greater than {}" if exclusive else "should be greater than or equal to {}"
+        checks.append(_bound_check(schema['minimum'], compare, text, (int, float)))
+
+    if 'maximum' in schema:
+        exclusive = schema.get('exclusiveMaximum', False)
+        compare = (lambda v, b: v >= b) if exclusive else (lambda v, b: v > b)
+        text = "should be less than {}" if exclusive else "should be less than or equal to {}"
+        checks.append(_bound_check(schema['maximum'], compare, text, (int, float)))
+
+    properties = {name: _compile(sub_schema, report_unknown)
+                  for name, sub_schema in schema.get('properties', {}).items()}
+    required = schema.get('required', [])
+    additional = schema.get('additionalProperties')
+    preserve_unknown = schema.get('x-kubernetes-preserve-unknown-fields', False)
+    additional_check = _compile(additional, report_unknown) if isinstance(additional, dict) else None
+
+    if properties or required or additional is not None or expected_type == 'object':
+        def check_object(value, path, errors):
+            if not isinstance(value, dict):
+                return True
+            for name in required:
+                if name not in value:
+                    errors.append(SchemaViolation(_join(path, name), 'FieldValueRequired',
+                                                  "Required value", None))
+            for name, item in value.items():
+                field_path = _join(path, name)
+                if name in properties:
+                    properties[name](item, field_path, errors)
+                elif additional_check is not None:
+                    additional_check(item, field_path, errors)
+                elif report_unknown and not (preserve_unknown or additional is True):
+                    errors.append(SchemaViolation(field_path, 'FieldValueUnknown',
+                                                  "field not declared in schema", item))
+            return True
+
+        checks.append(check_object)
+
+    if isinstance(schema.get('items'), dict):
+        item_check = _compile(schema['items'], report_unknown)
+
+        def check_items(value, path, errors):
+            if isinstance(value, list):
+                for index, item in enumerate(value):
+                    item_check(item, f"{path}[{index}]", errors)
+            return True
+
+        checks.append(check_items)
+
+    for keyword in ('allOf', 'anyOf', 'oneOf'):
+        if keyword in schema:
+            checks.append(_combinator_check(keyword, [_compile(sub_schema, False) for sub_schema in schema[keyword]]))
+
+    def validate(value, path, errors):
+        if value is None and nullable:
+            return
+        for check in checks:
+            if not check(value, path, errors):
+                return
+
+    return validate
+
+
+def _bound_check(bound, compare, text, value_types):
+    def check_bound(value, path, errors):
+        if isinstance(value, value_types) and not isinstance(value, bool) and compare(value, bound):
+            errors.append(SchemaViolation(path, 'FieldValueInvalid', text.format(bound), value))
+        return True
+
+    return check_bound
+
+
+def _combinator_check(keyword, validators):
+    def check_combinator(value, path, errors):
+        results = []
+        for validator in validators:
+            branch_errors = []
+            validator(value, path, branch_errors)
+            results.append(branch_errors)
+
+        passed = sum(1 for branch_errors in results if not branch_errors)
+        if keyword == 'allOf':
+            for branch_errors in results:
+                errors.extend(branch_errors)
+        elif keyword == 'anyOf' and passed == 0:
+            errors.append(SchemaViolation(path, 'FieldValueInvalid', "must match at least one schema in anyOf", value))
+        elif keyword == 'oneOf' and passed != 1:
+            errors.append(SchemaViolation(path, 'FieldValueInvalid', "must match exactly one schema in oneOf", value))
+        return True
+
+    return check_combinator
+
+
+def _schema_hash(schema):
+    return hashlib.sha256(json.dumps(schema, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _load_documents(yaml_file_path):
+    with open(yaml_file_path, 'r') as f:
+        return [document for document in yaml.safe_load_all(f) if document]
+
+
+class ManifestSchemaValidator:
+    """
+    Class for validating claims and composite resources against XRD schemas without a cluster round trip.
+    """
+
+    @staticmethod
+    def register_xrd(xrd_content):
+        """Compiles and indexes the schema of every version of a CompositeResourceDefinition."""
+        xrd_spec = xrd_content.get('spec', {})
+        group = xrd_spec.get('group')
+        kinds = [xrd_spec.get('names', {}).get('kind'), xrd_spec.get('claimNames', {}).get('kind')]
+
+        for version in xrd_spec.get('versions', []):
+            schema = version.get('schema', {}).get('openAPIV3Schema')
+            if not schema:
+                continue
+
+            schema_hash = _schema_hash(schema)
+            if schema_hash not in _compiled_schemas:
+                _compiled_schemas[schema_hash] = _compile(schema)
+
+            api_version = f"{group}/{version.get('name')}"
+            for kind in filter(None, kinds):
+                # The last registration wins, so re-registering an updated XRD replaces its schema
+                _schema_index[(api_version, kind)] = schema_hash
+
+    @staticmethod
+    def load_xrds_from_directory(directory=None):
+        """Registers every CompositeResourceDefinition found under the manifests directory."""
+        directory = directory or manifests_path
+        for root, _, files in sorted(os.walk(directory)):
+            for file_name in sorted(files):
+                if not file_name.endswith(('.yaml', '.yml')):
+                    continue
+                for document in _load_documents(os.path.join(root, file_name)):
+                    if document.get('kind') == 'CompositeResourceDefinition':
+                        ManifestSchemaValidator.register_xrd(document)
+
+    @staticmethod
+    def get_schema_validator(api_version, kind):
+        """Returns the compiled validator for a claim or composite kind, or None if no XRD defines it."""
+        if not _schema_index:
+            ManifestSchemaValidator.load_xrds_from_directory()
+        schema_hash = _schema_index.get((api_version, kind))
+        return _compiled_schemas.get(schema_hash) if schema_hash else None
+
+    @staticmethod
+    def validate_resource(resource_data):
+        """Validates a claim or composite resource and returns a list of SchemaViolation."""
+        validator = ManifestSchemaValidator.get_schema_validator(resource_data.get('apiVersion'),
+                                                                 resource_data.get('kind'))
+        if validator is None:
+            return []
+
+        body = {key: value for key, value in resource_data.items() if key not in OBJECT_SYSTEM_FIELDS}
+        if isinstance(body.get('spec'), dict):
+            body['spec'] = {key: value for key, value in body['spec'].items() if key not in CROSSPLANE_SPEC_FIELDS}
+
+        errors = []
+        validator(body, '', errors)
+        return errors
+
+    @staticmethod
+    def validate_patch(resource_data, patch_operations):
+        """Validates the result of applying JSON patch operations to a resource."""
+        patched = resource_data
+        for operation in patch_operations:
+            try:
+                patched = apply_json_patch(patched, [operation])
+            except (KeyError, IndexError, ValueError, TypeError):
+                field = '.'.join(operation['path'].lstrip('/').split('/'))
+                return [SchemaViolation(field, 'FieldValueInvalid',
+                                        f"cannot apply '{operation['op']}' operation: path does not exist",
+                                        operation.get('value'))]
+        return ManifestSchemaValidator.validate_resource(patched)
+
+    @staticmethod
+    def validate_updates(resource_data, updates):
+        """Validates the updates dict (JSON pointer -> value) used by the resource update helpers."""
+        patch_operations = [{"op": "replace", "path": path, "value": value} for path, value in updates.items()]
+        return ManifestSchemaValidator.validate_patch(resource_data, patch_operations)
+
+    @staticmethod
+    def validate_file(yaml_file_path):
+        """Validates every document in a YAML file."""
+        errors = []
+        for document in _load_documents(yaml_file_path):
+            errors.extend(ManifestSchemaValidator.validate_resource(document))
+        return errors
+
+    @staticmethod
+    def validate_directory(directory=None, max_workers=None):
+        """Validates every manifest under a directory in parallel and returns {file path: violations}."""
+        directory = directory or manifests_path
+        ManifestSchemaValidator.load_xrds_from_directory(directory)
+
+        yaml_files = [os.path.join(root, file_name)
+                      for root, _, files in os.walk(directory)
+                      for file_name in sorted(files) if file_name.endswith(('.yaml', '.yml'))]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = dict(zip(yaml_files, executor.map(ManifestSchemaValidator.validate_file, yaml_files)))
+
+        for yaml_file, errors in results.items():
+            for error in errors:
+                logger.error("Schema violation in %s: %s: %s (%s)", yaml_file, error.field, error.message, error.reason)
+        return results
+
+    @staticmethod
+    def format_violations(errors):
+        """Formats violations the same way the API server reports an invalid object."""
+        return "; ".join(f"{error.field}: {error.reason}: {error.message}" for error in errors)
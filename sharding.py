@@ -0,0 +1,123 @@
+import heapq
+import os
+import unittest
+import yaml
+
+import path_searcher as path_builder
+from config_loader import ConfigLoader
+from fingerprint import TestFingerprint, iterate_tests, read_json_cache, update_json_cache
+from logger import LoggerManager
+
+config_data = ConfigLoader.load_config()
+manifests_path = path_builder.get_manifest_path()
+
+# Setup logger
+logger = LoggerManager.get_logger(config_data, 'runner')
+
+DURATIONS_PATH = os.path.join(path_builder.get_project_root_path(), '.test_cache', 'durations.json')
+
+# Weight of the latest run in the smoothed duration of a test
+DURATION_SMOOTHING = 0.5
+
+# Assumed duration of tests without history, in seconds, if no test has history either
+DEFAULT_DURATION = 30.0
+
+
+def parse_shard(shard):
+    """Parses 'i/N' (1-based) into (index, count)."""
+    index, count = (int(part) for part in shard.split('/'))
+    if not 1 <= index <= count:
+        raise ValueError(f"Invalid shard '{shard}', expected i/N with 1 <= i <= N")
+    return index, count
+
+
+def plan_shards(singletons, durations, shard_count):
+    """
+    Assigns tests to shards by longest-processing-time-first bin packing. Tests sharing a cluster-scoped
+    singleton are packed as one unit, so they never run concurrently on different machines.
+    singletons: {test id: set of singleton keys}; durations: {test id: seconds}.
+    Returns the test ids of every shard and every shard's estimated duration.
+    """
+    # Union tests that share a singleton into groups
+    parent = {test_id: test_id for test_id in singletons}
+
+    def find(test_id):
+        while parent[test_id] != test_id:
+            parent[test_id] = parent[parent[test_id]]
+            test_id = parent[test_id]
+        return test_id
+
+    owners = {}
+    for test_id in sorted(singletons):
+        for key in singletons[test_id]:
+            if key in owners:
+                parent[find(test_id)] = find(owners[key])
+            else:
+                owners[key] = test_id
+
+    groups = {}
+    for test_id in sorted(singletons):
+        groups.setdefault(find(test_id), []).append(test_id)
+
+    known = sorted(durations[test_id] for test_id in singletons if test_id in durations)
+    fallback = known[len(known) // 2] if known else DEFAULT_DURATION
+    weighted = sorted(((sum(durations.get(test_id, fallback) for test_id in members), members)
+                       for members in groups.values()), key=lambda group: (-group[0], group[1]))
+
+    # Sorting and tie-breaking on names keeps the plan identical on every machine
+    shards = [[] for _ in range(shard_count)]
+    loads = [(0.0, index) for index in range(shard_count)]
+    for weight, members in weighted:
+        load, index = heapq.heappop(loads)
+        shards[index].extend(members)
+        heapq.heappush(loads, (load + weight, index))
+    return shards, [load for load, _ in sorted(loads, key=lambda item: item[1])]
+
+
+class TestSharding:
+    """
+    Class for splitting the suite across CI machines by recorded test durations, keeping tests that
+    mutate the same cluster-scoped objects (XRDs, Providers, Compositions, ClusterRoles) on one shard.
+    """
+
+    @staticmethod
+    def load_durations():
+        return read_json_cache(DURATIONS_PATH)
+
+    @staticmethod
+    def record_durations(records):
+        """Folds the durations of a run's passed and failed tests into the smoothed history."""
+        # Fan-out runs record at the same time, so the history is merged under the cache's lock
+        with update_json_cache(DURATIONS_PATH) as durations:
+            for record in records:
+                if record['outcome'] == 'skipped':
+                    continue
+                previous = durations.get(record['test'])
+                durations[record['test']] = record['duration'] if previous is None else \
+                    DURATION_SMOOTHING * record['duration'] + (1 - DURATION_SMOOTHING) * previous
+
+    @staticmethod
+    def singletons_for_test(test):
+        """Returns the (kind, name) of every cluster-scoped object in the manifests a test references."""
+        keys = set()
+        for manifest in TestFingerprint.manifests_for_test(test):
+            manifest_path = os.path.join(manifests_path, manifest)
+            if not os.path.exists(manifest_path):
+                continue
+            with open(manifest_path, 'r') as f:
+                for document in yaml.safe_load_all(f):
+                    if document and not document.get('metadata', {}).get('namespace'):
+                        keys.add((document.get('kind'), document.get('metadata', {}).get('name')))
+        return keys
+
+    @staticmethod
+    def select_shard(suite, shard_index, shard_count):
+        """Returns a suite with the tests of one shard (1-based), in their original order."""
+        tests = list(iterate_tests(suite))
+        singletons = {test.id(): TestSharding.singletons_for_test(test) for test in tests}
+        shards, estimates = plan_shards(singletons, TestSharding.load_durations(), shard_count)
+
+        selected = set(shards[shard_index - 1])
+        for index, (shard, estimate) in enumerate(zip(shards, estimates), start=1):
+            logger.info("Shard %s/%s: %s tests, estimated %.0fs", index, shard_count, len(shard), estimate)
+        return unittest.TestSuite(test for test in tests if test.id() in selected)
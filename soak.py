@@ -0,0 +1,357 @@
+import copy
+import json
+import os
+import random
+import threading
+import time
+import yaml
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import path_searcher as path_builder
+from batch_patch import percentile
+from config_loader import ConfigLoader
+from json_patch import create_merge_patch
+from k8s import RUN_ID_LABEL, KubernetesResourceManager
+from logger import LoggerManager
+
+config_data = ConfigLoader.load_config()
+manifests_path = path_builder.get_manifest_path()
+
+# Setup logger
+logger = LoggerManager.get_logger(config_data, 'soak')
+
+DEFAULT_SOAK_CONFIG = {
+    'manifest': 'digital_ocean/digital_ocean_claim.yaml',
+    'update_manifest': 'digital_ocean/digital_ocean_claim_update.yaml',
+    # The XRD and Composition the claims need; the soak does not start without them
+    'xrd': 'digital_ocean/digital_ocean_xrd.yaml',
+    'composition': 'digital_ocean/digital_ocean_xr.yaml',
+    'name_prefix': 'soak',
+    'rate': 1.0,
+    'duration': 3600,
+    'mix': {'create': 0.4, 'patch': 0.4, 'delete': 0.2},
+    'max_objects': 50,
+    'window': 60,
+    'stuck_deletion_after': 300,
+    'ready_timeout': 300,
+    'drift_threshold': 1.5,
+    'max_workers': 32,
+}
+
+# One aggregation window of the soak time series; latencies are (p50, p95) in seconds
+SoakWindow = namedtuple('SoakWindow', ['start', 'operations', 'errors', 'api_latency', 'response_time',
+                                       'reconcile_latency', 'deletion_latency', 'live_objects', 'pending_deletions'])
+
+# never_ready: claims created more than ready_timeout seconds before the end that never became Ready
+SoakReport = namedtuple('SoakReport', ['windows', 'flags', 'stuck_deletions', 'never_ready', 'operations', 'errors',
+                                       'elapsed'])
+
+
+def _p50_p95(values):
+    return (percentile(values, 50), percentile(values, 95)) if values else None
+
+
+def _condition(resource, condition_type):
+    return next((condition for condition in (resource.get('status') or {}).get('conditions') or []
+                 if condition.get('type') == condition_type), {})
+
+
+class SoakTest:
+    """
+    Class that churns claims for a long period at a target rate with an open-loop scheduler: operations
+    start on a Poisson schedule whether or not earlier ones finished, so a slow control plane shows up as
+    growing latency instead of a lower request rate. Records API latency, reconcile latency and error rates
+    per time window and flags drift: latency creep, rising error rates and objects stuck in deletion.
+    """
+
+    def __init__(self, soak_config=None):
+        self.config = dict(DEFAULT_SOAK_CONFIG, **(soak_config or config_data.get('soak') or {}))
+        with open(os.path.join(manifests_path, self.config['manifest']), 'r') as f:
+            self.manifest = yaml.safe_load(f)
+        with open(os.path.join(manifests_path, self.config['update_manifest']), 'r') as f:
+            update_manifest = yaml.safe_load(f)
+        # Patches alternate between the update payload and its inverse, so every patch is a real change
+        self.patches = [create_merge_patch(self.manifest, update_manifest),
+                        create_merge_patch(update_manifest, self.manifest)]
+
+        self.collection_url = KubernetesResourceManager.get_resource_url(self.manifest).rsplit('/', 1)[0]
+        self.run_id = ConfigLoader.get_run_id()
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self._live = {}
+        self._pending_ready = {}
+        self._pending_sync = {}
+        self._pending_deletion = {}
+        self._samples = []
+        self._stopped = threading.Event()
+        self._watch_response = None
+
+    def _headers(self, content_type='application/json'):
+        return {'Authorization': f"Bearer {KubernetesResourceManager.get_admin_token()}",
+                'Content-Type': content_type}
+
+    def _record(self, kind, value=None, error=None, response_time=None):
+        with self._lock:
+            self._samples.append((time.time(), kind, value, error, response_time))
+
+    def _create(self):
+        with self._lock:
+            if len(self._live) >= self.config['max_objects']:
+                return 'skipped'
+            self._sequence += 1
+            name = f"{self.config['name_prefix']}-{self.run_id}-{self._sequence}"
+        document = copy.deepcopy(self.manifest)
+        document['metadata']['name'] = name
+        document['metadata'].setdefault('labels', {})[RUN_ID_LABEL] = self.run_id
+
+        started = time.perf_counter()
+        response = KubernetesResourceManager.get_http_session().post(self.collection_url, data=json.dumps(document),
+                                                                     headers=self._headers())
+        if response.status_code == 201:
+            with self._lock:
+                self._live[name] = 0
+                self._pending_ready[name] = time.monotonic()
+        return response.status_code, time.perf_counter() - started, response.status_code != 201
+
+    def _patch(self):
+        with self._lock:
+            if not self._live:
+                return 'skipped'
+            name = random.choice(list(self._live))
+            patch = self.patches[self._live[name] % 2]
+            self._live[name] += 1
+
+        started = time.perf_counter()
+        response = KubernetesResourceManager.get_http_session().patch(
+            f"{self.collection_url}/{name}", data=json.dumps(patch),
+            headers=self._headers('application/merge-patch+json'))
+        if response.status_code == 200:
+            generation = response.json().get('metadata', {}).get('generation')
+            with self._lock:
+                self._pending_sync[name] = (time.monotonic(), generation)
+        return response.status_code, time.perf_counter() - started, response.status_code != 200
+
+    def _delete(self):
+        with self._lock:
+            if not self._live:
+                return 'skipped'
+            name = random.choice(list(self._live))
+            del self._live[name]
+            self._pending_ready.pop(name, None)
+            self._pending_sync.pop(name, None)
+
+        started = time.perf_counter()
+        response = KubernetesResourceManager.get_http_session().delete(f"{self.collection_url}/{name}",
+                                                                       headers=self._headers())
+        if response.status_code in (200, 202):
+            with self._lock:
+                self._pending_deletion[name] = time.monotonic()
+        return response.status_code, time.perf_counter() - started, response.status_code not in (200, 202, 404)
+
+    def _run_operation(self, operation, scheduled):
+        try:
+            outcome = {'create': self._create, 'patch': self._patch, 'delete': self._delete}[operation]()
+            if outcome == 'skipped':
+                return
+            _, latency, failed = outcome
+            # Response time is measured from the scheduled start, so queueing behind a slow API is not hidden
+            self._record(operation, latency, failed, time.monotonic() - scheduled)
+        except Exception as e:
+            logger.warning("Soak %s failed: %s", operation, e)
+            self._record(operation, None, True, time.monotonic() - scheduled)
+
+    def _watch_loop(self):
+        api_path = self.collection_url[len(KubernetesResourceManager.get_cluster_uri()):].lstrip('/')
+        params = {'labelSelector': f"{RUN_ID_LABEL}={self.run_id}"}
+        resource_version = None
+        while not self._stopped.is_set():
+            try:
+                self._watch_response = KubernetesResourceManager.open_watch(api_path, resource_version, params=params)
+                for watch_event in KubernetesResourceManager.iter_watch_events(self._watch_response):
+                    if watch_event.get('type') == 'ERROR':
+                        resource_version = None
+                        break
+                    self._observe(watch_event['type'], watch_event.get('object', {}))
+                    resource_version = watch_event.get('object', {}).get('metadata', {}).get('resourceVersion')
+            except Exception as e:
+                if self._stopped.is_set():
+                    break
+                logger.warning("Soak watch interrupted, reconnecting: %s", e)
+                time.sleep(1)
+
+    def _observe(self, event_type, resource):
+        name = resource.get('metadata', {}).get('name')
+        now = time.monotonic()
+        with self._lock:
+            if event_type == 'DELETED':
+                started = self._pending_deletion.pop(name, None)
+                if started is not None:
+                    self._samples.append((time.time(), 'deletion', now - started, False, None))
+                return
+            if name in self._pending_ready and _condition(resource, 'Ready').get('status') == 'True':
+                self._samples.append((time.time(), 'reconcile', now - self._pending_ready.pop(name), False, None))
+            if name in self._pending_sync:
+                started, generation = self._pending_sync[name]
+                synced = _condition(resource, 'Synced')
+                if synced.get('status') == 'True' and synced.get('observedGeneration', -1) >= (generation or 0):
+                    del self._pending_sync[name]
+                    self._samples.append((time.time(), 'reconcile', now - started, False, None))
+
+    def _windows(self, started):
+        window = self.config['window']
+        buckets = {}
+        for timestamp, kind, value, error, response_time in self._samples:
+            buckets.setdefault(int((timestamp - started) // window), []).append((kind, value, error, response_time))
+
+        windows = []
+        for index in sorted(buckets):
+            samples = buckets[index]
+            operations = {}
+            errors = {}
+            gauges = [value for kind, value, _, _ in samples if kind == 'gauge']
+            for kind, _, error, _ in samples:
+                if kind in ('create', 'patch', 'delete'):
+                    operations[kind] = operations.get(kind, 0) + 1
+                    errors[kind] = errors.get(kind, 0) + bool(error)
+            windows.append(SoakWindow(
+                start=index * window,
+                operations=operations,
+                errors=errors,
+                api_latency=_p50_p95([value for kind, value, error, _ in samples
+                                      if kind in operations and value is not None and not error]),
+                response_time=_p50_p95([response_time for kind, _, _, response_time in samples if kind in operations]),
+                reconcile_latency=_p50_p95([value for kind, value, _, _ in samples if kind == 'reconcile']),
+                deletion_latency=_p50_p95([value for kind, value, _, _ in samples if kind == 'deletion']),
+                live_objects=gauges[-1][0] if gauges else None,
+                pending_deletions=gauges[-1][1] if gauges else None,
+            ))
+        return windows
+
+    def _detect_drift(self, windows):
+        """Compares the p95 latencies and error rate of the last third of the run with the first third."""
+        flags = []
+        if len(windows) < 3:
+            return flags
+        third = len(windows) // 3
+        threshold = self.config['drift_threshold']
+
+        def median_p95(selected, field):
+            values = [getattr(window, field)[1] for window in selected if getattr(window, field)]
+            return percentile(values, 50) if values else None
+
+        for field in ('api_latency', 'reconcile_latency', 'deletion_latency'):
+            baseline, recent = median_p95(windows[:third], field), median_p95(windows[-third:], field)
+            if baseline and recent and recent > baseline * threshold:
+                flags.append(f"{field} p95 crept from {baseline:.3f}s to {recent:.3f}s")
+
+        def error_rate(selected):
+            total = sum(sum(window.operations.values()) for window in selected)
+            return sum(sum(window.errors.values()) for window in selected) / total if total else 0.0
+
+        baseline_errors, recent_errors = error_rate(windows[:third]), error_rate(windows[-third:])
+        if recent_errors > max(baseline_errors * threshold, 0.01):
+            flags.append(f"error rate rose from {baseline_errors:.1%} to {recent_errors:.1%}")
+        return flags
+
+    def _gauge_loop(self, started):
+        # Live and pending-deletion counts are sampled once per window as the run goes
+        while not self._stopped.wait(self.config['window']):
+            with self._lock:
+                live, pending = len(self._live), len(self._pending_deletion)
+                self._samples.append((time.time(), 'gauge', (live, pending), False, None))
+            logger.info("Soak at %.0fs: %s live objects, %s pending deletions.", time.time() - started, live, pending)
+
+    def check_prerequisites(self):
+        """Raises RuntimeError unless the XRD is established and the Composition exists."""
+        missing = []
+        session = KubernetesResourceManager.get_http_session()
+        for key in ('xrd', 'composition'):
+            with open(os.path.join(manifests_path, self.config[key]), 'r') as f:
+                document = yaml.safe_load(f)
+            response = session.get(KubernetesResourceManager.get_resource_url(document), headers=self._headers())
+            description = f"{document['kind']} '{document['metadata']['name']}'"
+            if response.status_code != 200:
+                missing.append(f"{description} (status {response.status_code})")
+            elif key == 'xrd' and _condition(response.json(), 'Established').get('status') != 'True':
+                missing.append(f"{description} (not established)")
+        if missing:
+            raise RuntimeError(f"The soak claims need {', '.join(missing)}; create them before soaking")
+
+    def run(self, duration=None, rate=None):
+        """
+        Checks the prerequisites, then runs the soak for duration seconds at rate operations per second and
+        returns a SoakReport.
+        """
+        self.check_prerequisites()
+        duration = duration or self.config['duration']
+        rate = rate or self.config['rate']
+        operations = list(self.config['mix'])
+        weights = [self.config['mix'][operation] for operation in operations]
+
+        started = time.time()
+        watcher = threading.Thread(target=self._watch_loop, name='soak-watch', daemon=True)
+        watcher.start()
+        threading.Thread(target=self._gauge_loop, args=(started,), name='soak-gauges', daemon=True).start()
+
+        deadline = time.monotonic() + duration
+        next_start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.config['max_workers']) as executor:
+            while next_start < deadline:
+                delay = next_start - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self._run_operation, random.choices(operations, weights)[0], next_start)
+                next_start += random.expovariate(rate)
+
+        self._stopped.set()
+        if self._watch_response is not None:
+            self._watch_response.close()
+        return self._report(started)
+
+    def _report(self, started):
+        stuck_after = self.config['stuck_deletion_after']
+        ready_timeout = self.config['ready_timeout']
+        now = time.monotonic()
+        with self._lock:
+            stuck_deletions = sorted(name for name, deleted in self._pending_deletion.items()
+                                     if now - deleted > stuck_after)
+            never_ready = sorted(name for name, created in self._pending_ready.items()
+                                 if now - created > ready_timeout)
+        windows = self._windows(started)
+        flags = self._detect_drift(windows)
+        if stuck_deletions:
+            flags.append(f"{len(stuck_deletions)} objects stuck in deletion for more than {stuck_after}s")
+        if never_ready:
+            flags.append(f"{len(never_ready)} claims not Ready {ready_timeout}s after their creation")
+
+        samples = [sample for sample in self._samples if sample[1] in ('create', 'patch', 'delete')]
+        report = SoakReport(windows, flags, stuck_deletions, never_ready, len(samples),
+                            sum(bool(sample[3]) for sample in samples), time.time() - started)
+        for flag in flags:
+            logger.warning("Soak drift: %s", flag)
+        return report
+
+    def cleanup(self):
+        """Deletes every object the soak created that is still live."""
+        with self._lock:
+            names = list(self._live)
+            self._live.clear()
+        session = KubernetesResourceManager.get_http_session()
+        for name in names:
+            session.delete(f"{self.collection_url}/{name}", headers=self._headers())
+
+    @staticmethod
+    def write_report(report, report_path):
+        """Writes a SoakReport as JSON."""
+        os.makedirs(os.path.dirname(os.path.abspath(report_path)), exist_ok=True)
+        with open(report_path, 'w') as f:
+            json.dump({
+                'elapsed': report.elapsed,
+                'operations': report.operations,
+                'errors': report.errors,
+                'flags': report.flags,
+                'stuck_deletions': report.stuck_deletions,
+                'never_ready': report.never_ready,
+                'windows': [window._asdict() for window in report.windows],
+            }, f, indent=2)
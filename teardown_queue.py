@@ -0,0 +1,172 @@
+import threading
+import time
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from config_loader import ConfigLoader
+from k8s import KubernetesResourceManager, describe_manifest, load_manifest
+from logger import LoggerManager
+from readiness_barrier import BarrierTarget, ReadinessBarrier, absent
+
+config_data = ConfigLoader.load_config()
+
+# Setup logger
+logger = LoggerManager.get_logger(config_data, 'k8s')
+
+DEFAULT_TEARDOWN_CONFIG = {
+    'max_workers': 8,
+    'finalizer_timeout': 300,
+}
+
+TeardownFailure = namedtuple('TeardownFailure', ['test_id', 'description', 'error'])
+
+TeardownReport = namedtuple('TeardownReport', ['completed', 'failures', 'elapsed'])
+
+
+def _teardown_config():
+    return dict(DEFAULT_TEARDOWN_CONFIG, **(config_data.get('teardown') or {}))
+
+
+def object_key(document):
+    """Identifies the object a manifest describes, so a create can wait for a pending teardown of it."""
+    metadata = document.get('metadata') or {}
+    return document.get('apiVersion'), document.get('kind'), metadata.get('namespace'), metadata.get('name')
+
+
+class TeardownQueue:
+    """
+    Class that takes cleanup off the tests' critical path: tests enqueue deletions, which background workers
+    run, waiting for finalizers, while later tests go on. Creating an object whose teardown is still pending
+    waits for it, so objects whose names cannot be unique per test (see ManifestTemplates.generate_for_test),
+    e.g. XRDs, never collide with their predecessors' leftovers.
+    drain() waits for all queued work at the end of the run and reports what failed.
+    """
+    _executor = None
+    # (future, test id, description) of the work queued since the last drain
+    _futures = []
+    _pending = Counter()
+    _lock = threading.Lock()
+    _changed = threading.Condition(_lock)
+
+    @staticmethod
+    def _get_executor():
+        with TeardownQueue._lock:
+            if TeardownQueue._executor is None:
+                TeardownQueue._executor = ThreadPoolExecutor(max_workers=_teardown_config()['max_workers'],
+                                                             thread_name_prefix='teardown')
+                KubernetesResourceManager.before_create_hooks.append(TeardownQueue.wait_for)
+            return TeardownQueue._executor
+
+    @staticmethod
+    def submit(function, *args, keys=(), description=None):
+        """
+        Queues cleanup work; creates of any of the given object keys wait until it has finished.
+        Exceptions raised by the work are reported by drain().
+        """
+        executor = TeardownQueue._get_executor()
+        test_id = LoggerManager.get_test_id()
+        description = description or getattr(function, '__name__', str(function))
+        with TeardownQueue._lock:
+            TeardownQueue._pending.update(keys)
+
+        def run():
+            try:
+                function(*args)
+                failure = None
+            except Exception as e:
+                logger.warning("Teardown of %s failed: %s", description, e)
+                failure = TeardownFailure(test_id, description, str(e))
+            with TeardownQueue._changed:
+                for key in keys:
+                    TeardownQueue._pending[key] -= 1
+                    if TeardownQueue._pending[key] <= 0:
+                        del TeardownQueue._pending[key]
+                TeardownQueue._changed.notify_all()
+            return failure
+
+        # The work's log records, traced calls and recorded interactions belong to the test that queued it
+        future = executor.submit(LoggerManager.with_test_id(run))
+        with TeardownQueue._lock:
+            TeardownQueue._futures.append((future, test_id, description))
+        return future
+
+    @staticmethod
+    def delete(*resources):
+        """
+        Queues the deletion of manifests (file paths or documents), one after the other in the given order,
+        each waiting until the object and its finalizers are gone, e.g. a claim before its XRD.
+        """
+        documents = [load_manifest(resource) for resource in resources]
+        return TeardownQueue.submit(TeardownQueue._delete_all, documents,
+                                    keys=[object_key(document) for document in documents],
+                                    description=", ".join(describe_manifest(resource) for resource in resources))
+
+    @staticmethod
+    def _delete_all(documents):
+        errors = []
+        for document in documents:
+            try:
+                TeardownQueue._delete_and_wait(document)
+            except Exception as e:
+                # The next objects are still deleted, e.g. an XRD whose claim got stuck
+                errors.append(str(e))
+        if errors:
+            raise RuntimeError("; ".join(errors))
+
+    @staticmethod
+    def _delete_and_wait(document):
+        api_version, kind, namespace, name = object_key(document)
+        headers = {'Authorization': f"Bearer {KubernetesResourceManager.get_admin_token()}"}
+        response = KubernetesResourceManager.get_http_session().delete(
+            KubernetesResourceManager.get_resource_url(document), headers=headers)
+        if response.status_code == 404:
+            return
+        if response.status_code not in (200, 202):
+            raise RuntimeError(f"deleting {kind} '{name}' returned {response.status_code}: {response.text}")
+
+        timeout = _teardown_config()['finalizer_timeout']
+        result = ReadinessBarrier.wait([BarrierTarget(api_version, kind, namespace, name, absent)], timeout=timeout)
+        if result.unsatisfied:
+            raise RuntimeError(f"{kind} '{name}' still exists {timeout}s after its deletion")
+
+    @staticmethod
+    def wait_for(document, timeout=None):
+        """Blocks while a teardown of the object a manifest describes is pending."""
+        key = object_key(document)
+        timeout = timeout or _teardown_config()['finalizer_timeout']
+        with TeardownQueue._changed:
+            if not TeardownQueue._pending[key]:
+                return
+            started = time.monotonic()
+            TeardownQueue._changed.wait_for(lambda: not TeardownQueue._pending[key], timeout)
+        logger.info("Waited %.2fs for the pending teardown of %s '%s'", time.monotonic() - started, key[1], key[3])
+
+    @staticmethod
+    def drain(timeout=None):
+        """
+        Waits for the teardowns queued since the last drain and returns a TeardownReport of them; the queue
+        starts over afterwards. Teardowns still running after the timeout are reported as failures.
+        """
+        started = time.monotonic()
+        with TeardownQueue._lock:
+            futures, TeardownQueue._futures = TeardownQueue._futures, []
+        completed = 0
+        failures = []
+        for future, test_id, description in futures:
+            try:
+                failure = future.result(None if timeout is None else max(0.0, timeout - (time.monotonic() - started)))
+                completed += 1
+            except FutureTimeoutError:
+                failure = TeardownFailure(test_id, description, f"still running after {timeout}s")
+            if failure is not None:
+                failures.append(failure)
+        report = TeardownReport(completed, failures, time.monotonic() - started)
+        if futures:
+            logger.info("Drained %s teardowns in %.2fs, %s failed", report.completed, report.elapsed,
+                        len(report.failures))
+        return report
+
+    @staticmethod
+    def format_failures(report):
+        return "\n".join(f"{failure.test_id or 'outside tests'}: {failure.description}: {failure.error}"
+                         for failure in report.failures)
@@ -0,0 +1,140 @@
+import json
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import path_searcher as path_builder
+
+from batch_patch import BatchPatchEngine, BatchPatchError, is_conflict
+from k8s import KubernetesResourceManager
+
+manifests_path = path_builder.get_manifest_path()
+
+TEST_FAILED = "testing value /metadata/resourceVersion failed: test failed"
+
+
+def claim(name):
+    return {'apiVersion': 'compute.crossplane.io/v1alpha1', 'kind': 'DropletClaim',
+            'metadata': {'name': name, 'namespace': 'default'}, 'spec': {'parameters': {'size': 's-1vcpu-1gb'}}}
+
+
+class FakeSession:
+    """In-memory API server for PATCH with a resourceVersion 'test'; other writers can bump an object once."""
+
+    def __init__(self, names, contended=(), delay=0):
+        self.versions = {name: 1 for name in names}
+        self.contended = set(contended)
+        self.delay = delay
+        self.patches = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, headers=None):
+        name = url.rsplit('/', 1)[-1]
+        if name not in self.versions:
+            return SimpleNamespace(status_code=404, text='not found')
+        body = {'metadata': {'name': name, 'resourceVersion': str(self.versions[name])}}
+        return SimpleNamespace(status_code=200, json=lambda: body, text=json.dumps(body))
+
+    def patch(self, url, data=None, headers=None):
+        name = url.rsplit('/', 1)[-1]
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+            if name in self.contended:
+                # Another writer got there first
+                self.contended.discard(name)
+                self.versions[name] += 1
+            operations = json.loads(data)
+            if operations[0]['value'] != str(self.versions[name]):
+                return SimpleNamespace(status_code=422, text=TEST_FAILED)
+            self.versions[name] += 1
+            self.patches.append((name, operations[1:]))
+        return SimpleNamespace(status_code=200, text='{}')
+
+
+class TestBatchPatch(unittest.TestCase):
+
+    # Objective: Verify that a JSON patch whose resourceVersion 'test' failed is retried as a conflict.
+    def test_failed_test_operation_is_a_conflict(self):
+        # given
+        failed_test = json.dumps({
+            "kind": "Status", "apiVersion": "v1", "status": "Failure", "reason": "Invalid", "code": 422,
+            "message": "the server rejected our request due to an error in our request: "
+                       "testing value /metadata/resourceVersion failed: test failed",
+        })
+        invalid_value = json.dumps({
+            "kind": "Status", "apiVersion": "v1", "status": "Failure", "reason": "Invalid", "code": 422,
+            "message": "DropletClaim.compute.crossplane.io \"example-claim\" is invalid: spec.parameters.size: "
+                       "Invalid value: \"integer\": spec.parameters.size in body must be of type string",
+        })
+
+        # when / then
+        self.assertTrue(is_conflict(422, failed_test))
+        self.assertTrue(is_conflict(409, ""))
+        self.assertFalse(is_conflict(422, invalid_value))
+
+    def patch_many(self, session, targets, **kwargs):
+        with mock.patch.object(KubernetesResourceManager, 'get_http_session', return_value=session), \
+                mock.patch.object(KubernetesResourceManager, 'get_admin_token', return_value='token'), \
+                mock.patch.object(KubernetesResourceManager, 'resolve_plural', return_value='dropletclaims'):
+            return BatchPatchEngine.patch_many(targets, **kwargs)
+
+    # Objective: Verify that manifests given as files or documents are patched, and failures are summarized.
+    def test_patch_many_summarizes_results(self):
+        # given
+        session = FakeSession(['test-droplet-claim-1', 'claim-b'])
+        operations = [{"op": "replace", "path": "/spec/parameters/size", "value": "s-2vcpu-2gb"}]
+        targets = [(f"{manifests_path}/digital_ocean/digital_ocean_claim.yaml", operations),
+                   (claim('claim-b'), operations), (claim('claim-missing'), operations)]
+
+        # when
+        summary = self.patch_many(session, targets)
+
+        # then
+        self.assertEqual((summary.total, summary.succeeded, summary.failed), (3, 2, 1))
+        self.assertEqual(sorted(name for name, _ in session.patches), ['claim-b', 'test-droplet-claim-1'])
+        self.assertEqual(summary.results[2].status_code, 404)
+        with self.assertRaises(BatchPatchError):
+            self.patch_many(session, targets[2:], raise_on_error=True)
+
+    # Objective: Verify that a patch that lost a race is retried on the fresh object, rebuilding callable patches.
+    def test_conflict_is_retried_on_the_fresh_version(self):
+        # given
+        session = FakeSession(['claim-a'], contended=['claim-a'])
+        seen_versions = []
+
+        def resize(live):
+            seen_versions.append(live['metadata']['resourceVersion'])
+            return [{"op": "replace", "path": "/spec/parameters/size", "value": "s-2vcpu-2gb"}]
+
+        # when
+        with mock.patch('time.sleep'):
+            summary = self.patch_many(session, [(claim('claim-a'), resize)])
+
+        # then
+        self.assertEqual(summary.succeeded, 1)
+        self.assertEqual(summary.conflicts_retried, 1)
+        self.assertEqual(seen_versions, ['1', '2'])
+        self.assertEqual(session.versions['claim-a'], 3)
+
+    # Objective: Verify that patches run concurrently, bounded by the worker pool size.
+    def test_worker_pool_bounds_concurrency(self):
+        # given
+        names = [f"claim-{index}" for index in range(12)]
+        session = FakeSession(names, delay=0.05)
+        operations = [{"op": "replace", "path": "/spec/parameters/size", "value": "s-2vcpu-2gb"}]
+
+        # when
+        summary = self.patch_many(session, [(claim(name), operations) for name in names], max_workers=4)
+
+        # then
+        self.assertEqual(summary.succeeded, 12)
+        self.assertGreater(session.max_in_flight, 1)
+        self.assertLessEqual(session.max_in_flight, 4)
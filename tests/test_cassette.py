@@ -0,0 +1,84 @@
+import json
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from cassette import REDACTED_DATA, Cassette, CassetteSession, redact, request_key
+from logger import LoggerManager
+
+
+class FakeSession:
+    """Answers every request with the next of the given bodies."""
+
+    def __init__(self, *bodies):
+        self.hooks = {'response': []}
+        self.bodies = list(bodies)
+
+    def request(self, method, url, params=None, stream=False, **kwargs):
+        return SimpleNamespace(status_code=200, reason='OK', text=json.dumps(self.bodies.pop(0)))
+
+
+class TestCassette(unittest.TestCase):
+
+    # Objective: Verify that requests match regardless of host, parameter order and resourceVersion.
+    def test_request_key_ignores_host_order_and_volatile_parameters(self):
+        # when
+        recorded = request_key("get", "https://10.0.0.1:6443/api/v1/namespaces/default/events?watch=true"
+                                      "&resourceVersion=120&allowWatchBookmarks=true")
+        replayed = request_key("GET", "http://localhost/api/v1/namespaces/default/events",
+                               [("allowWatchBookmarks", "true"), ("watch", "true"), ("resourceVersion", "9")])
+
+        # then
+        self.assertEqual(recorded, replayed)
+        self.assertEqual(recorded, "GET /api/v1/namespaces/default/events?allowWatchBookmarks=true&watch=true")
+
+    # Objective: Verify that Secret data never reaches a cassette, in single objects, lists and watch events.
+    def test_redact_removes_secret_data(self):
+        # given
+        secret = {"kind": "Secret", "metadata": {"name": "do-creds", "managedFields": [{"manager": "kubectl"}]},
+                  "data": {"token": "c2VjcmV0"}}
+        secret_list = {"kind": "SecretList", "items": [{"metadata": {"name": "do-creds"}, "data": {"token": "x"}}]}
+        event = {"type": "MODIFIED", "object": secret}
+
+        # when
+        redacted = [json.loads(redact(json.dumps(document))) for document in (secret, secret_list, event)]
+
+        # then
+        self.assertEqual(redacted[0], {"kind": "Secret", "metadata": {"name": "do-creds"},
+                                       "data": {"token": REDACTED_DATA}})
+        self.assertEqual(redacted[1]["items"][0]["data"], {"token": REDACTED_DATA})
+        self.assertEqual(redacted[2]["object"]["data"], {"token": REDACTED_DATA})
+        self.assertEqual(redact("Authorization: Bearer abc.def"), "Authorization: Bearer REDACTED")
+
+
+    # Objective: Verify that replay answers repeated requests in recorded order, per test and outside any test.
+    def test_record_and_replay_round_trip(self):
+        # given
+        url = "https://10.0.0.1:6443/apis/compute.crossplane.io/v1alpha1/namespaces/default/dropletclaims/claim"
+        test_id = 'test_main.TestMain.test_claim_creation'
+        with tempfile.TemporaryDirectory() as cassette_dir:
+            recorder = Cassette('record', cassette_dir)
+            session = CassetteSession(recorder, FakeSession({'step': 'a'}, {'step': 'b'}, {'step': 'c'},
+                                                            {'step': 'd'}))
+            session.get(url)
+            session.get(url)
+            with LoggerManager.bound_test_id(test_id):
+                session.get(url)
+                session.get(url)
+            recorder.stop()
+
+            # when
+            player = Cassette('replay', cassette_dir)
+            player._load()
+            replaying = CassetteSession(player)
+            session_steps = [replaying.get(url).json()['step'] for _ in range(2)]
+            with LoggerManager.bound_test_id(test_id):
+                test_steps = [replaying.get(url).json()['step'] for _ in range(3)]
+
+        # then
+        self.assertEqual(session_steps, ['a', 'b'])
+        self.assertEqual(test_steps, ['c', 'd', 'd'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import version_matrix
+from cluster_fanout import ClusterFanOut
+from helm import CrossplaneHelmManager
+from run_tests import parse_args, suite_args
+from version_matrix import VersionMatrix
+
+
+class TestClusterFanOut(unittest.TestCase):
+
+    # Objective: Verify that the runner's flags reach every child run, with output directories per target.
+    def test_child_runs_get_the_runner_flags(self):
+        # given
+        args = parse_args(['--clusters', 'all', '--events', '--incremental', '--trace', 'reports/trace',
+                           '--profile', 'sampling', '--record', '--providers', 'provider-digitalocean'])
+        output_dir = tempfile.mkdtemp()
+
+        # when
+        with mock.patch('subprocess.call', return_value=0) as call:
+            report = ClusterFanOut.run_cluster('kind-a', lambda name: suite_args(args, name), output_dir)
+        command = call.call_args.args[0]
+
+        # then
+        self.assertEqual(report['exit_code'], 0)
+        self.assertEqual(command[2:4], ['--report', os.path.join(output_dir, 'kind-a.json')])
+        self.assertEqual(command[4:], [
+            '--incremental', '--events', '--providers', 'provider-digitalocean',
+            '--trace', os.path.join('reports/trace', 'kind-a'),
+            '--profile', 'sampling', '--profile-dir', os.path.join('reports/profile', 'kind-a'),
+            '--record', '--cassette-dir', os.path.join('tests/cassettes', 'kind-a')])
+        self.assertNotIn('--clusters', command)
+
+    # Objective: Verify that matrix entries install their chart version and also get the runner's flags.
+    def test_matrix_entries_get_the_runner_flags(self):
+        # given
+        args = parse_args(['--matrix', 'all', '--events', '--metrics', 'reports/metrics'])
+        matrix = [{'name': 'v1-15', 'cluster': 'kind-a', 'version': '1.15.0', 'values': {}}]
+
+        # when
+        with mock.patch.dict(version_matrix.config_data, {'matrix': matrix}), \
+                mock.patch.object(CrossplaneHelmManager, 'prefetch_charts'), \
+                mock.patch('subprocess.call', return_value=0) as call:
+            VersionMatrix.run(['v1-15'], runner_args=lambda name: suite_args(args, name),
+                              output_dir=tempfile.mkdtemp())
+        command = call.call_args.args[0]
+
+        # then
+        self.assertEqual(command[4:], ['--install-crossplane', '--events',
+                                       '--metrics', os.path.join('reports/metrics', 'v1-15')])
@@ -57,15 +57,15 @@ class TestComponentInstallation(unittest.TestCase):
     # ==================================================================================
     def test_provider_installation(self):
         # given
-        provider.install_digital_ocean_provider()
-
-        # when
-        k8s.create_resource_from_yaml(
+        install_report = provider.install_provider_and_wait(
             f"{path_builder.get_manifest_path()}/digital_ocean/digital_ocean_provider.yaml")
 
-        response_json = k8s.send_request("GET", "apis/pkg.crossplane.io/v1/providers/provider-digitalocean")
+        # when
+        response_json = k8s.KubernetesResourceManager.send_request_and_get_json_response(
+            "GET", "apis/pkg.crossplane.io/v1/providers/provider-digitalocean")
 
         # then
+        self.assertTrue(install_report.ready, f"Provider did not complete phase '{install_report.failed_phase}'")
         self.assertEqual(response_json['metadata']['name'], "provider-digitalocean")
 
         conditions = {condition['type']: condition for condition in response_json['status']['conditions']}
@@ -0,0 +1,112 @@
+import base64
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import yaml
+from kubernetes.config import kube_config
+
+import credentials
+from credentials import CredentialProvider
+
+
+def jwt(expiry):
+    payload = base64.urlsafe_b64encode(json.dumps({'exp': int(expiry)}).encode()).decode().rstrip('=')
+    return f"eyJhbGciOiJub25lIn0.{payload}.c2ln"
+
+
+def kubeconfig(user):
+    return {'current-context': 'test',
+            'contexts': [{'name': 'test', 'context': {'cluster': 'test', 'user': 'test'}}],
+            'clusters': [{'name': 'test', 'cluster': {'server': 'https://127.0.0.1:6443'}}],
+            'users': [{'name': 'test', 'user': user}]}
+
+
+def oidc_user(id_token):
+    return {'auth-provider': {'name': 'oidc', 'config': {
+        'client-id': 'crossplane-tests', 'client-secret': 'secret', 'idp-issuer-url': 'https://issuer.example',
+        'id-token': id_token, 'refresh-token': 'refresh-1'}}}
+
+
+class TestCredentialProvider(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.kubeconfig_path = os.path.join(self.directory.name, 'config')
+        self.providers = []
+
+    def tearDown(self):
+        for provider in self.providers:
+            provider.stop()
+        self.directory.cleanup()
+
+    def provider_for(self, user, refresh_margin=60):
+        with open(self.kubeconfig_path, 'w') as f:
+            yaml.safe_dump(kubeconfig(user), f)
+        provider = CredentialProvider({'kubeconfig_path': self.kubeconfig_path, 'token_refresh_margin': refresh_margin})
+        self.providers.append(provider)
+        return provider
+
+    # Objective: Verify that the exec plugin runs once at startup, and its token is cached until it expires.
+    def test_exec_plugin_token_is_cached(self):
+        # given
+        provider = self.provider_for({'exec': {'command': 'crossplane-test-credentials'}})
+
+        # when
+        with mock.patch.object(credentials, '_run_exec_plugin',
+                               return_value=('exec-token', time.time() + 3600)) as run_exec_plugin, \
+                mock.patch.object(kube_config, 'ExecProvider') as loader_exec_provider:
+            tokens = [provider.get_token(), provider.get_token()]
+
+        # then
+        self.assertEqual(tokens, ['exec-token', 'exec-token'])
+        run_exec_plugin.assert_called_once()
+        loader_exec_provider.assert_not_called()
+
+    # Objective: Verify that an expired token is refreshed by the caller, and one close to expiry in the background.
+    def test_tokens_are_refreshed_before_and_on_expiry(self):
+        # given
+        provider = self.provider_for({'exec': {'command': 'crossplane-test-credentials'}}, refresh_margin=0)
+        tokens = [('token-1', time.time() - 1), ('token-2', time.time() + 1), ('token-3', time.time() + 3600)]
+
+        # when
+        with mock.patch.object(credentials, '_run_exec_plugin', side_effect=tokens):
+            expired_token = provider.get_token()
+            deadline = time.monotonic() + 5
+            while provider.get_token() != 'token-3' and time.monotonic() < deadline:
+                time.sleep(0.1)
+
+        # then
+        self.assertEqual(expired_token, 'token-2')
+        self.assertEqual(provider.get_token(), 'token-3')
+        self.assertTrue(provider._refresher.is_alive())
+
+    # Objective: Verify that an expiring OIDC id token is renewed once, and later refreshes reuse the renewed tokens.
+    def test_oidc_token_is_renewed_once(self):
+        # given
+        expiring_token, renewed_token = jwt(time.time() + 120), jwt(time.time() + 3600)
+        provider = self.provider_for(oidc_user(expiring_token))
+        renewals = []
+
+        def renew(loader, provider_config):
+            renewals.append(provider_config['config']['refresh-token'])
+            provider_config['config'].value.update({'id-token': renewed_token, 'refresh-token': 'refresh-2'})
+
+        # when
+        with mock.patch.object(kube_config.KubeConfigLoader, '_refresh_oidc', autospec=True, side_effect=renew):
+            startup_token = provider.get_token()
+            provider._refresh()
+
+        # then
+        self.assertEqual(startup_token, renewed_token)
+        self.assertEqual(provider.get_token(), renewed_token)
+        self.assertAlmostEqual(provider._expiry, credentials._jwt_expiry(renewed_token))
+        self.assertEqual(renewals, ['refresh-1'])
+        self.assertIsNotNone(provider._refresher)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+from unittest import mock
+
+import yaml
+import path_searcher as path_builder
+
+from event_collector import ClusterEventCollector, related_kinds
+from k8s import KubernetesResourceManager
+
+manifests_path = path_builder.get_manifest_path()
+
+
+def event(uid, resource_version, kind, name, reason='Synced', namespace='default'):
+    return {'metadata': {'uid': uid, 'resourceVersion': resource_version,
+                         'creationTimestamp': f"2026-01-01T00:00:{resource_version:0>2}Z"},
+            'regarding': {'kind': kind, 'name': name, 'namespace': namespace}, 'reason': reason}
+
+
+class TestClusterEventCollector(unittest.TestCase):
+
+    # Objective: Verify that relisting after a 410 does not buffer the events already in the ring again.
+    def test_relist_does_not_duplicate_buffered_events(self):
+        # given
+        collector = ClusterEventCollector(capacity=10)
+        created, synced = event('a', '1', 'DropletClaim', 'claim'), event('b', '2', 'DropletClaim', 'claim')
+        listed = {'metadata': {'resourceVersion': '2'}, 'items': [created, synced]}
+
+        # when
+        with mock.patch.object(KubernetesResourceManager, 'send_request_and_get_json_response', return_value=listed):
+            collector._relist()
+            collector._relist()
+        collector._add(event('b', '3', 'DropletClaim', 'claim', reason='Ready'))
+
+        # then
+        self.assertEqual(len(collector._ring), 3)
+        self.assertEqual([item['reason'] for item in collector.events_for('DropletClaim', 'claim')],
+                         ['Synced', 'Ready'])
+
+    # Objective: Verify that related events are the ones of the kinds a claim composes, not of any kind with its name.
+    def test_related_events_match_the_composed_kinds(self):
+        # given
+        with open(f"{manifests_path}/digital_ocean/digital_ocean_xrd.yaml", 'r') as f:
+            xrd = yaml.safe_load(f)
+        with open(f"{manifests_path}/digital_ocean/digital_ocean_xr.yaml", 'r') as f:
+            composition = yaml.safe_load(f)
+        collector = ClusterEventCollector(capacity=10)
+        for item in (event('a', '1', 'DropletClaim', 'claim'),
+                     event('b', '2', 'XDroplet', 'claim-x7k2p', namespace=None),
+                     event('c', '3', 'Droplet', 'claim-x7k2p-9fz4q', namespace=None),
+                     event('d', '4', 'DropletClaim', 'claim-2'),
+                     event('e', '5', 'Secret', 'claim-connection')):
+            collector._add(item)
+
+        # when
+        kinds = related_kinds([xrd, composition])
+        events = collector.events_for('DropletClaim', 'claim', 'default', kinds['DropletClaim'])
+
+        # then
+        self.assertEqual(kinds, {'DropletClaim': {'XDroplet', 'Droplet'}, 'XDroplet': {'Droplet'}})
+        self.assertEqual([item['metadata']['uid'] for item in events], ['a', 'b', 'c'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import fingerprint
+from k8s import KubernetesResourceManager
+from namespace_pool import NamespacePool
+import sharding
+
+manifests_path = "unused"
+
+
+class RbacCase:
+    """Stands in for a test case; only its source is read."""
+    _testMethodName = 'check_role'
+
+    def id(self):
+        return 'test_main.TestMain.check_role'
+
+    def check_role(self):
+        KubernetesResourceManager.create_resource_from_yaml(
+            f"{manifests_path}/digital_ocean/digital_ocean_xrd.yaml")
+        NamespacePool.namespace_for(self)
+
+
+class TestFingerprintSelection(unittest.TestCase):
+
+    # Objective: Verify that a test's manifests include those of the fixtures it calls, e.g. the pool's RBAC.
+    def test_manifests_include_fixture_manifests(self):
+        # given
+        test = RbacCase()
+
+        # when
+        manifests = fingerprint.TestFingerprint.manifests_for_test(test)
+        singletons = sharding.TestSharding.singletons_for_test(test)
+
+        # then
+        self.assertEqual(manifests, sorted(["digital_ocean/digital_ocean_xrd.yaml"] + NamespacePool.manifests()))
+        self.assertIn("shared_resourses/role.yaml", manifests)
+        self.assertIn(("Namespace", "example-namespace"), singletons)
+
+    # Objective: Verify that a change to config.yaml changes every test's fingerprint.
+    def test_config_changes_change_the_fingerprint(self):
+        # given
+        test = RbacCase()
+        cluster_versions = {'chart_version': '1.15.0', 'provider_revisions': [], 'framework': 'abc'}
+        with tempfile.NamedTemporaryFile('w', suffix='.yaml', delete=False) as config_file:
+            config_file.write("namespace_pool:\n  size: 4\n")
+        self.addCleanup(os.remove, config_file.name)
+
+        # when
+        with mock.patch.object(fingerprint, 'CONFIG_PATH', config_file.name):
+            before = fingerprint.TestFingerprint.compute(test, cluster_versions)
+            with open(config_file.name, 'w') as f:
+                f.write("namespace_pool:\n  size: 8\n")
+            after = fingerprint.TestFingerprint.compute(test, cluster_versions)
+
+        # then
+        self.assertNotEqual(before, after)
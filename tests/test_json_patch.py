@@ -0,0 +1,78 @@
+import unittest
+import yaml
+import path_searcher as path_builder
+
+from json_patch import apply_json_patch, apply_merge_patch, create_json_patch, create_merge_patch
+
+manifests_path = path_builder.get_manifest_path()
+
+
+def load_manifest(file_name):
+    with open(f"{manifests_path}/digital_ocean/{file_name}", 'r') as f:
+        return yaml.safe_load(f)
+
+
+class TestJsonPatch(unittest.TestCase):
+
+    # Objective: Verify that an XRD schema update only sends the changed leaf, not the schema subtree.
+    def test_xrd_update_diff_is_minimal(self):
+        # given
+        original = load_manifest("digital_ocean_xrd.yaml")
+        updated = load_manifest("digital_ocean_xrd_update.yaml")
+
+        # when
+        patch = create_json_patch(original, updated)
+
+        # then
+        self.assertEqual(patch, [{
+            "op": "replace",
+            "path": "/spec/versions/0/schema/openAPIV3Schema/properties/spec/properties/parameters/properties/image/default",
+            "value": "fedora"
+        }])
+        self.assertEqual(apply_json_patch(original, patch), updated)
+
+    def test_live_diff_keeps_server_fields(self):
+        # given
+        live = load_manifest("digital_ocean_claim.yaml")
+        live["metadata"]["resourceVersion"] = "42"
+        live["status"] = {"conditions": []}
+        desired = load_manifest("digital_ocean_claim_update.yaml")
+
+        # when
+        patch = create_json_patch(live, desired, prune=False)
+
+        # then
+        self.assertEqual(patch, [{"op": "replace", "path": "/spec/parameters/size", "value": "s-2vcpu-2gb"}])
+
+    def test_list_insertion_and_removal(self):
+        # given
+        source = {"rules": [{"verbs": ["get"]}, {"verbs": ["list"]}, {"verbs": ["watch"]}]}
+        target = {"rules": [{"verbs": ["get"]}, {"verbs": ["create"]}, {"verbs": ["list"]}, {"verbs": ["watch"]}],
+                  "extra": True}
+        shorter = {"rules": [{"verbs": ["get"]}, {"verbs": ["watch"]}]}
+
+        # when
+        insert_patch = create_json_patch(source, target)
+        remove_patch = create_json_patch(source, shorter)
+
+        # then
+        self.assertEqual(insert_patch, [
+            {"op": "add", "path": "/rules/1", "value": {"verbs": ["create"]}},
+            {"op": "add", "path": "/extra", "value": True}
+        ])
+        self.assertEqual(remove_patch, [{"op": "remove", "path": "/rules/1"}])
+        self.assertEqual(apply_json_patch(source, insert_patch), target)
+        self.assertEqual(apply_json_patch(source, remove_patch), shorter)
+
+    def test_merge_patch(self):
+        # given
+        original = load_manifest("digital_ocean_claim.yaml")
+        updated = load_manifest("digital_ocean_claim_update.yaml")
+        del updated["spec"]["parameters"]["region"]
+
+        # when
+        patch = create_merge_patch(original, updated)
+
+        # then
+        self.assertEqual(patch, {"spec": {"parameters": {"region": None, "size": "s-2vcpu-2gb"}}})
+        self.assertEqual(apply_merge_patch(original, patch), updated)
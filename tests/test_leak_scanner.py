@@ -0,0 +1,68 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from k8s import RUN_ID_LABEL, KubernetesResourceManager
+from leak_scanner import COMPOSITE_LABEL, CrossplaneResource, LeakScanner
+
+CLAIMS = CrossplaneResource('compute.crossplane.io/v1alpha1', 'dropletclaims', 'DropletClaim', True, 'claim')
+COMPOSITES = CrossplaneResource('compute.crossplane.io/v1alpha1', 'xdroplets', 'XDroplet', False, 'composite')
+DROPLETS = CrossplaneResource('compute.do.crossplane.io/v1alpha1', 'droplets', 'Droplet', False, 'managed')
+USAGES = CrossplaneResource('do.crossplane.io/v1alpha1', 'providerconfigusages', 'ProviderConfigUsage', False,
+                            'usage')
+
+LISTED = {
+    'dropletclaims': [{'name': 'claim', 'namespace': 'default', 'labels': {RUN_ID_LABEL: 'run-1'}}],
+    'xdroplets': [{'name': 'claim-x7k2p', 'labels': {'crossplane.io/claim-name': 'claim',
+                                                     'crossplane.io/claim-namespace': 'default'}}],
+    'droplets': [{'name': 'claim-x7k2p-9fz4q', 'labels': {COMPOSITE_LABEL: 'claim-x7k2p'}},
+                 {'name': 'other-run-droplet', 'labels': {RUN_ID_LABEL: 'run-2'}}],
+    'providerconfigusages': [
+        {'name': 'usage-of-claim', 'resourceRef': {'apiVersion': 'compute.do.crossplane.io/v1alpha1',
+                                                   'kind': 'Droplet', 'name': 'claim-x7k2p-9fz4q'}},
+        {'name': 'usage-of-other-run', 'resourceRef': {'apiVersion': 'compute.do.crossplane.io/v1alpha1',
+                                                       'kind': 'Droplet', 'name': 'other-run-droplet'}}],
+}
+
+
+class TestLeakScanner(unittest.TestCase):
+
+    def scan(self):
+        with mock.patch.object(LeakScanner, 'discover_crossplane_resources',
+                               return_value=[USAGES, DROPLETS, COMPOSITES, CLAIMS]), \
+                mock.patch.object(LeakScanner, 'list_metadata',
+                                  side_effect=lambda resource: LISTED[resource.resource]), \
+                mock.patch.object(LeakScanner, 'list_usages',
+                                  side_effect=lambda resource: LISTED[resource.resource]):
+            return LeakScanner.scan(run_id='run-1', max_workers=2)
+
+    # Objective: Verify that ProviderConfigUsages are attributed to this run through the managed resource they track.
+    def test_usages_of_leaked_managed_resources_are_attributed(self):
+        # when
+        result = self.scan()
+
+        # then
+        self.assertEqual([(leak.tier, leak.name, leak.reason) for leak in result.leaks],
+                         [('claim', 'claim', 'run-label'), ('composite', 'claim-x7k2p', 'composed'),
+                          ('managed', 'claim-x7k2p-9fz4q', 'composed'), ('usage', 'usage-of-claim', 'composed')])
+
+    # Objective: Verify that reaping deletes attributed usages too, after the objects they track.
+    def test_attributed_usages_are_reaped_last(self):
+        # given
+        leaks = self.scan().leaks
+        session = SimpleNamespace(delete=mock.Mock(return_value=SimpleNamespace(status_code=200)))
+
+        # when
+        with mock.patch.object(KubernetesResourceManager, 'get_http_session', return_value=session), \
+                mock.patch.object(KubernetesResourceManager, 'get_cluster_uri', return_value='https://cluster'), \
+                mock.patch.object(KubernetesResourceManager, 'get_admin_token', return_value='token'):
+            results = LeakScanner.reap(leaks, max_workers=1)
+
+        # then
+        self.assertEqual(len(results), 4)
+        self.assertEqual(session.delete.call_args_list[-1].args[0],
+                         'https://cluster/apis/do.crossplane.io/v1alpha1/providerconfigusages/usage-of-claim')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import json
+import logging
+import queue
+import threading
+import unittest
+
+import logger
+from logger import JsonFormatter, LoggerManager, NonBlockingQueueHandler, _subsystem_levels
+
+
+class TestLoggerManager(unittest.TestCase):
+
+    def setUp(self):
+        self.saved_dropped = LoggerManager.dropped_records
+        self.records = queue.Queue(maxsize=1)
+        handler = NonBlockingQueueHandler(self.records)
+        handler.addFilter(logger.TestContextFilter())
+        self.logger = logging.getLogger('test_logger.pipeline')
+        self.logger.addHandler(handler)
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.handler = handler
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        LoggerManager.dropped_records = self.saved_dropped
+
+    # Objective: Verify that records are queued unformatted with the test id, and dropped rather than blocking.
+    def test_queue_handler_stamps_test_id_and_drops_when_full(self):
+        # given
+        resource = {'kind': 'DropletClaim'}
+
+        # when
+        with LoggerManager.bound_test_id('test_main.TestMain.test_claim_creation'):
+            self.logger.info("Created %s", resource, extra={'gvk': 'compute.crossplane.io/v1alpha1/DropletClaim'})
+            self.logger.info("Dropped, the queue is full")
+        record = self.records.get_nowait()
+        entry = json.loads(JsonFormatter().format(record))
+
+        # then
+        self.assertEqual(record.msg, "Created %s")
+        self.assertEqual(LoggerManager.dropped_records, self.saved_dropped + 1)
+        self.assertEqual(entry['test_id'], 'test_main.TestMain.test_claim_creation')
+        self.assertEqual(entry['gvk'], 'compute.crossplane.io/v1alpha1/DropletClaim')
+        self.assertEqual(entry['message'], "Created {'kind': 'DropletClaim'}")
+        self.assertIsNone(LoggerManager.get_test_id())
+
+    # Objective: Verify that worker threads carry the submitting test's id only when handed work with it.
+    def test_worker_threads_carry_the_submitters_test_id(self):
+        # given
+        seen = {}
+
+        def work(name):
+            seen[name] = LoggerManager.get_test_id()
+
+        # when
+        with LoggerManager.bound_test_id('test_main.TestMain.test_claim_updating'):
+            threads = [threading.Thread(target=LoggerManager.with_test_id(work), args=('worker',)),
+                       threading.Thread(target=work, args=('background',))]
+        for thread in threads:
+            thread.start()
+            thread.join()
+
+        # then
+        self.assertEqual(seen, {'worker': 'test_main.TestMain.test_claim_updating', 'background': None})
+
+    # Objective: Verify that each subsystem's 'logging' flag sets its level, and disabled ones still log errors.
+    def test_subsystem_levels_follow_their_logging_flags(self):
+        # given
+        config_data = {'k8s': {'logging': True}, 'helm': {'logging': False}, 'provider': {'logging': 'debug'}}
+
+        # when
+        levels = _subsystem_levels(config_data)
+
+        # then
+        self.assertEqual(levels, {'k8s': logging.INFO, 'helm': logging.ERROR, 'provider': logging.DEBUG})
+        self.assertEqual(_subsystem_levels({})['k8s'], logging.INFO)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,13 +2,41 @@ import time
 import unittest
 import path_searcher as path_builder
 
-from k8s import KubernetesResourceManager
+from k8s import KubernetesResourceManager, load_manifest
+from manifest_templates import ManifestTemplates
+from namespace_pool import NamespacePool
+from readiness_barrier import ReadinessBarrier, all_of, condition_is, targets_from_manifest
+from teardown_queue import TeardownQueue
 
 manifests_path = path_builder.get_manifest_path()
 
 
+def given_xrd(xrd_yaml_path):
+    """
+    Creates an XRD unless it exists. Its name derives from its group and plural and cannot be made unique per test,
+    so the tests that only build on it share it and leave it in place; the class teardown deletes it.
+    """
+    xrd = load_manifest(xrd_yaml_path)
+    TeardownQueue.wait_for(xrd)
+    response = KubernetesResourceManager.send_request_and_get_response(
+        "GET", f"apis/apiextensions.crossplane.io/v1/compositeresourcedefinitions/{xrd['metadata']['name']}")
+    if response.status_code == 404:
+        KubernetesResourceManager.create_resource_from_yaml(xrd)
+
+
+def bind_to_composition(claim, composition):
+    """Makes a claim select its test's own Composition rather than another test's, which may be torn down."""
+    claim['spec']['compositionRef'] = {'name': composition['metadata']['name']}
+    return claim
+
+
 class TestMain(unittest.TestCase):
 
+    @classmethod
+    def tearDownClass(cls):
+        # The XRD shared by the claim and Composition tests
+        TeardownQueue.delete(f"{manifests_path}/digital_ocean/digital_ocean_xrd.yaml")
+
     # Test Case 16: Composite Resource Claim Creation Test
     # Preconditions:
     # Valid XRC YAML file is available.
@@ -27,29 +55,36 @@ class TestMain(unittest.TestCase):
     # Delete all Crossplane components that were created for this test, including all Crossplane components created by Crossplane itself.
     def test_claim_creation(self):
         # given
-        KubernetesResourceManager.create_resource_from_yaml(
-            f"{manifests_path}/digital_ocean/digital_ocean_xrd.yaml")
-        KubernetesResourceManager.create_resource_from_yaml(
-            f"{manifests_path}/digital_ocean/digital_ocean_xr.yaml")
+        given_xrd(f"{manifests_path}/digital_ocean/digital_ocean_xrd.yaml")
+        composition, claim = ManifestTemplates.generate_for_test(
+            self,
+            f"{manifests_path}/digital_ocean/digital_ocean_xr.yaml",
+            f"{manifests_path}/digital_ocean/digital_ocean_claim.yaml")
+        bind_to_composition(claim, composition)
+        KubernetesResourceManager.create_resource_from_yaml(composition)
+        barrier_result = ReadinessBarrier.wait(targets_from_manifest(
+            f"{manifests_path}/digital_ocean/digital_ocean_xrd.yaml",
+            all_of(condition_is("Established"), condition_is("Offered"))))
+        self.assertFalse(barrier_result.unsatisfied, ReadinessBarrier.format_unsatisfied(barrier_result))
 
         # when
-        KubernetesResourceManager.create_resource_from_yaml(
-            f"{manifests_path}/digital_ocean/digital_ocean_claim.yaml")
-        response_json = KubernetesResourceManager.send_request_and_get_json_response("GET",
-                                                                                     "apis/compute.crossplane.io/v1alpha1/namespaces/default/dropletclaims/test-droplet-claim-1")
+        KubernetesResourceManager.create_resource_from_yaml(claim)
+        claim_barrier_result = ReadinessBarrier.wait(targets_from_manifest(
+            claim, all_of(condition_is("Synced"), condition_is("Ready"))))
+        response_json = KubernetesResourceManager.send_request_and_get_json_response(
+            "GET", f"apis/compute.crossplane.io/v1alpha1/namespaces/default/dropletclaims/{claim['metadata']['name']}")
 
         # then
-        self.assertEqual(response_json['metadata']['name'], "test-droplet-claim-1")
+        self.assertFalse(claim_barrier_result.unsatisfied,
+                         ReadinessBarrier.format_unsatisfied(claim_barrier_result))
+        self.assertEqual(response_json['metadata']['name'], claim['metadata']['name'])
 
         conditions = {condition['type']: condition for condition in response_json['status']['conditions']}
         self.assertEqual(conditions.get("Synced", {}).get("status"), "True", "'Synced' condition is not True")
         self.assertEqual(conditions.get("Ready", {}).get("status"), "True", "'Ready' condition is not True")
 
         # post condition
-        KubernetesResourceManager.delete_resource_by_file(
-            f"{manifests_path}/digital_ocean/digital_ocean_xrd.yaml")
-        KubernetesResourceManager.delete_resource_by_file(
-            f"{manifests_path}/digital_ocean/digital_ocean_xr.yaml")
+        TeardownQueue.delete(claim, composition)
 
     # Test Case 17: Composite Resource Claim Update Test
     # Preconditions:
@@ -71,27 +106,24 @@ class TestMain(unittest.TestCase):
     # Delete all Crossplane components that were created for this test, including all Crossplane components created by Crossplane itself.
     def test_claim_updating(self):
         # given
-        KubernetesResourceManager.create_resource_from_yaml(
-            f"{manifests_path}/digital_ocean/digital_ocean_xrd.yaml")
-        KubernetesResourceManager.create_resource_from_yaml(
-            f"{manifests_path}/digital_ocean/digital_ocean_xr.yaml")
-        KubernetesResourceManager.create_resource_from_yaml(
-            f"{manifests_path}/digital_ocean/digital_ocean_claim.yaml")
+        given_xrd(f"{manifests_path}/digital_ocean/digital_ocean_xrd.yaml")
+        composition, claim, claim_update = ManifestTemplates.generate_for_test(
+            self,
+            f"{manifests_path}/digital_ocean/digital_ocean_xr.yaml",
+            f"{manifests_path}/digital_ocean/digital_ocean_claim.yaml",
+            f"{manifests_path}/digital_ocean/digital_ocean_claim_update.yaml")
+        bind_to_composition(claim, composition)
+        KubernetesResourceManager.create_resource_from_yaml(composition)
+        KubernetesResourceManager.create_resource_from_yaml(claim)
 
         # when
-        updates = {
-            "/spec/parameters/size": "s-2vcpu-2gb",
-            "/spec/parameters/image": "ubuntu-20-04-x64"
-        }
-        KubernetesResourceManager.update_resource_parameters_with_namespace_from_yaml(
-            f"{manifests_path}/digital_ocean/digital_ocean_claim_update.yaml",
-            updates)
+        KubernetesResourceManager.update_resource_from_manifest_diff(claim_update)
 
-        response_json = KubernetesResourceManager.send_request_and_get_json_response("GET",
-                                                                                     "apis/compute.crossplane.io/v1alpha1/namespaces/default/dropletclaims/test-droplet-claim-1")
+        response_json = KubernetesResourceManager.send_request_and_get_json_response(
+            "GET", f"apis/compute.crossplane.io/v1alpha1/namespaces/default/dropletclaims/{claim['metadata']['name']}")
 
         # then
-        self.assertEqual(response_json['metadata']['name'], "test-droplet-claim-1")
+        self.assertEqual(response_json['metadata']['name'], claim['metadata']['name'])
         self.assertEqual(response_json['spec']['parameters']['size'], "s-2vcpu-2gb")
 
         conditions = {condition['type']: condition for condition in response_json['status']['conditions']}
@@ -99,12 +131,7 @@ class TestMain(unittest.TestCase):
         self.assertEqual(conditions.get("Ready", {}).get("status"), "True", "'Ready' condition is not True")
 
         # post condition
-        KubernetesResourceManager.delete_resource_by_file(
-            f"{manifests_path}/digital_ocean/digital_ocean_claim.yaml")
-        KubernetesResourceManager.delete_resource_by_file(
-            f"{manifests_path}/digital_ocean/digital_ocean_xrd.yaml")
-        KubernetesResourceManager.delete_resource_by_file(
-            f"{manifests_path}/digital_ocean/digital_ocean_xr.yaml")
+        TeardownQueue.delete(claim, composition)
 
     # Test Case 18: Composite Resource Claim Deletion Test
     # Preconditions:
@@ -125,28 +152,26 @@ class TestMain(unittest.TestCase):
     # Delete all Crossplane components that were created for this test, including all Crossplane components created by Crossplane itself.
     def test_claim_deleting(self):
         # given
-        KubernetesResourceManager.create_resource_from_yaml(
-            f"{manifests_path}/digital_ocean/digital_ocean_xrd.yaml")
-        KubernetesResourceManager.create_resource_from_yaml(
-            f"{manifests_path}/digital_ocean/digital_ocean_xr.yaml")
-        KubernetesResourceManager.create_resource_from_yaml(
+        given_xrd(f"{manifests_path}/digital_ocean/digital_ocean_xrd.yaml")
+        composition, claim = ManifestTemplates.generate_for_test(
+            self,
+            f"{manifests_path}/digital_ocean/digital_ocean_xr.yaml",
             f"{manifests_path}/digital_ocean/digital_ocean_claim.yaml")
+        bind_to_composition(claim, composition)
+        KubernetesResourceManager.create_resource_from_yaml(composition)
+        KubernetesResourceManager.create_resource_from_yaml(claim)
 
         # when
-        KubernetesResourceManager.delete_resource_by_file(
-            f"{manifests_path}/digital_ocean/digital_ocean_claim.yaml")
+        KubernetesResourceManager.delete_resource_by_file(claim)
 
-        response = KubernetesResourceManager.send_request_and_get_response("GET",
-                                                                           "apis/compute.crossplane.io/v1alpha1/namespaces/default/dropletclaims/test-droplet-claim-1")
+        response = KubernetesResourceManager.send_request_and_get_response(
+            "GET", f"apis/compute.crossplane.io/v1alpha1/namespaces/default/dropletclaims/{claim['metadata']['name']}")
 
         # then
         self.assertEqual(response.status_code, 404)
 
         # post condition
-        KubernetesResourceManager.delete_resource_by_file(
-            f"{manifests_path}/digital_ocean/digital_ocean_xrd.yaml")
-        KubernetesResourceManager.delete_resource_by_file(
-            f"{manifests_path}/digital_ocean/digital_ocean_xr.yaml")
+        TeardownQueue.delete(composition)
 
     # Test Case 6: Provider Permission Limitation Test
     # Objective:
@@ -305,7 +330,7 @@ class TestMain(unittest.TestCase):
                       "'Offered' condition is not True or False")
 
         # post condition
-        KubernetesResourceManager.delete_resource_by_file(xrd_yaml_path)
+        TeardownQueue.delete(xrd_yaml_path)
 
     # Test Case 10: XRD Update Test
     # Objective: Ensure that an update to an existing XRD is applied correctly, reflecting the changes in the cluster.
@@ -330,11 +355,9 @@ class TestMain(unittest.TestCase):
         self.assertEqual(initial_default_image, "ubuntu-20-04-x64",
                          "Initial default image should be 'ubuntu-20-04-x64'.")
 
-        # Apply updates to change the default image
-        updates = {
-            "/spec/versions/0/schema/openAPIV3Schema/properties/spec/properties/parameters/properties/image/default": "fedora"
-        }
-        KubernetesResourceManager.update_cluster_resource_parameters(xrd_yaml_path, updates)
+        # Apply the updated XRD manifest, which changes the default image
+        KubernetesResourceManager.update_resource_from_manifest_diff(
+            f"{manifests_path}/digital_ocean/digital_ocean_xrd_update.yaml", xrd_yaml_path)
 
         # Retrieve updated XRD
         updated_response_json = KubernetesResourceManager.send_request_and_get_json_response(
@@ -349,7 +372,7 @@ class TestMain(unittest.TestCase):
         self.assertEqual(updated_default_image, "fedora", "Expected updated default image to be 'fedora'.")
 
         # post condition
-        KubernetesResourceManager.delete_resource_by_file(xrd_yaml_path)
+        TeardownQueue.delete(xrd_yaml_path)
 
     # ==================================================================================
     # Test Case 11: XRD Deletion Test
@@ -420,7 +443,7 @@ class TestMain(unittest.TestCase):
         self.assertEqual(provider_aggregate_system_role_json.status_code, 200)
 
         # post condition
-        KubernetesResourceManager.delete_resource_by_file(xrd_yaml_path)
+        TeardownQueue.delete(xrd_yaml_path)
 
     # ==================================================================================
     # Test Case 14: Composition Update Test
@@ -441,14 +464,13 @@ class TestMain(unittest.TestCase):
     # ==================================================================================
     def test_xr_updating(self):
         # given
-        xr_yaml_path = f"{manifests_path}/digital_ocean/digital_ocean_xr.yaml"
-        KubernetesResourceManager.create_resource_from_yaml(xr_yaml_path)
+        composition, = ManifestTemplates.generate_for_test(
+            self, f"{manifests_path}/digital_ocean/digital_ocean_xr.yaml")
+        composition_path = f"/apis/apiextensions.crossplane.io/v1/compositions/{composition['metadata']['name']}"
+        KubernetesResourceManager.create_resource_from_yaml(composition)
 
         # when
-        response_json = KubernetesResourceManager.send_request_and_get_json_response(
-            "GET",
-            "/apis/apiextensions.crossplane.io/v1/compositions/xdroplet-composition"
-        )
+        response_json = KubernetesResourceManager.send_request_and_get_json_response("GET", composition_path)
         initial_volume_size_default = response_json["spec"]["resources"][0]["base"]["spec"]["forProvider"]["size"]
         self.assertEqual(initial_volume_size_default, "s-1vcpu-1gb",
                          "Initial default volume size should be 's-1vcpu-1gb'.")
@@ -456,19 +478,16 @@ class TestMain(unittest.TestCase):
         updates = {
             "/spec/resources/0/base/spec/forProvider/size": "s-1vcpu-2gb"
         }
-        KubernetesResourceManager.update_cluster_resource_parameters(xr_yaml_path, updates)
+        KubernetesResourceManager.update_cluster_resource_parameters(composition, updates)
 
         # then
-        response_updated_json = KubernetesResourceManager.send_request_and_get_json_response(
-            "GET",
-            "/apis/apiextensions.crossplane.io/v1/compositions/xdroplet-composition"
-        )
+        response_updated_json = KubernetesResourceManager.send_request_and_get_json_response("GET", composition_path)
         updated_volume_size = response_updated_json["spec"]["resources"][0]["base"]["spec"]["forProvider"]["size"]
         self.assertEqual(updated_volume_size, "s-1vcpu-2gb",
                          "Updated default volume size should be 's-1vcpu-2gb'.")
 
         # post condition
-        KubernetesResourceManager.delete_resource_by_file(xr_yaml_path)
+        TeardownQueue.delete(composition)
 
     # ==================================================================================
     # Test Case 19: CRUD Permission Test
@@ -490,18 +509,14 @@ class TestMain(unittest.TestCase):
     # ==============================================================================
     def test_role_permissions_by_name(self):
         # given
-        KubernetesResourceManager.create_resource_from_yaml(
-            f"{manifests_path}/digital_ocean/digital_ocean_xrd.yaml")
-        KubernetesResourceManager.create_resource_from_yaml(
-            f"{manifests_path}/digital_ocean/digital_ocean_xr.yaml")
-        KubernetesResourceManager.create_resource_from_yaml(
-            f"{manifests_path}/shared_resourses/role.yaml")
-        KubernetesResourceManager.create_resource_from_yaml(
-            f"{manifests_path}/shared_resourses/role_binding.yaml")
+        given_xrd(f"{manifests_path}/digital_ocean/digital_ocean_xrd.yaml")
+        composition, = ManifestTemplates.generate_for_test(
+            self, f"{manifests_path}/digital_ocean/digital_ocean_xr.yaml")
+        KubernetesResourceManager.create_resource_from_yaml(composition)
+        namespace = NamespacePool.namespace_for(self)
 
         # when
         role_name = "crossplane-edit"
-        namespace = "example-namespace"
         role_api_path = f"/apis/rbac.authorization.k8s.io/v1/namespaces/{namespace}/roles/{role_name}"
         response_json = KubernetesResourceManager.send_request_and_get_json_response("GET", role_api_path)
 
@@ -531,14 +546,7 @@ class TestMain(unittest.TestCase):
                             f"Role {role_name} does not have the expected permissions for {resource} with verbs {expected_verbs}")
 
         # post condition
-        KubernetesResourceManager.delete_resource_by_file(
-            f"{manifests_path}/digital_ocean/digital_ocean_xrd.yaml")
-        KubernetesResourceManager.delete_resource_by_file(
-            f"{manifests_path}/digital_ocean/digital_ocean_xr.yaml")
-        KubernetesResourceManager.delete_resource_by_file(
-            f"{manifests_path}/shared_resourses/role.yaml")
-        KubernetesResourceManager.delete_resource_by_file(
-            f"{manifests_path}/shared_resourses/role_binding.yaml")
+        TeardownQueue.delete(composition)
 
     # ==================================================================================
     # Test Case 21: Access to ConfigMaps Test
@@ -650,31 +658,22 @@ class TestMain(unittest.TestCase):
     # Delete all Crossplane components that were created for this test, including all Crossplane components created by Crossplane itself.
     def test_xr_creating(self):
         # given
-        KubernetesResourceManager.create_resource_from_yaml(
-            f"{manifests_path}/digital_ocean/digital_ocean_xrd.yaml"
-        )
+        given_xrd(f"{manifests_path}/digital_ocean/digital_ocean_xrd.yaml")
+        composition, = ManifestTemplates.generate_for_test(
+            self, f"{manifests_path}/digital_ocean/digital_ocean_xr.yaml")
 
         # when
-        KubernetesResourceManager.create_resource_from_yaml(
-            f"{manifests_path}/digital_ocean/digital_ocean_xr.yaml"
-        )
+        KubernetesResourceManager.create_resource_from_yaml(composition)
         response_json = KubernetesResourceManager.send_request_and_get_json_response(
-            "GET",
-            "/apis/apiextensions.crossplane.io/v1/compositions/xdroplet-composition"
-        )
+            "GET", f"/apis/apiextensions.crossplane.io/v1/compositions/{composition['metadata']['name']}")
 
         # then
-        self.assertEqual(response_json['metadata']['name'], "xdroplet-composition")
+        self.assertEqual(response_json['metadata']['name'], composition['metadata']['name'])
         self.assertEqual(response_json['spec']['compositeTypeRef']['kind'], "XDroplet")
         self.assertEqual(response_json['spec']['compositeTypeRef']['apiVersion'], "compute.crossplane.io/v1alpha1")
 
         # post condition
-        KubernetesResourceManager.delete_cluster_resource_by_file(
-            f"{manifests_path}/digital_ocean/digital_ocean_xrd.yaml"
-        )
-        KubernetesResourceManager.delete_cluster_resource_by_file(
-            f"{manifests_path}/digital_ocean/digital_ocean_xr.yaml"
-        )
+        TeardownQueue.delete(composition)
 
     # Test Case 15: Composition Deletion Test
     # Objective: Confirm that deleting a Composition removes it from the cluster.
@@ -692,29 +691,20 @@ class TestMain(unittest.TestCase):
     # Delete all Crossplane components that were created for this test, including all Crossplane components created by Crossplane itself.
     def test_xr_deleting(self):
         # given
-        KubernetesResourceManager.create_resource_from_yaml(
-            f"{manifests_path}/digital_ocean/digital_ocean_xrd.yaml"
-        )
-        KubernetesResourceManager.create_resource_from_yaml(
-            f"{manifests_path}/digital_ocean/digital_ocean_xr.yaml"
-        )
+        given_xrd(f"{manifests_path}/digital_ocean/digital_ocean_xrd.yaml")
+        composition, = ManifestTemplates.generate_for_test(
+            self, f"{manifests_path}/digital_ocean/digital_ocean_xr.yaml")
+        KubernetesResourceManager.create_resource_from_yaml(composition)
 
         # when
-        KubernetesResourceManager.delete_cluster_resource_by_file(
-            f"{manifests_path}/digital_ocean/digital_ocean_xr.yaml"
-        )
+        KubernetesResourceManager.delete_cluster_resource_by_file(composition)
 
-        remove_response = KubernetesResourceManager.send_request_and_get_response("GET",
-                                                                                  "/apis/apiextensions.crossplane.io/v1/compositions/xdroplet-composition")
+        remove_response = KubernetesResourceManager.send_request_and_get_response(
+            "GET", f"/apis/apiextensions.crossplane.io/v1/compositions/{composition['metadata']['name']}")
 
         # then
         self.assertEqual(remove_response.status_code, 404)
 
-        # post condition
-        KubernetesResourceManager.delete_cluster_resource_by_file(
-            f"{manifests_path}/digital_ocean/digital_ocean_xrd.yaml"
-        )
-
     # Test Case 24: RBAC Manager Binding Integrity Test
     # Objective: Ensure that the RBAC Manager cannot modify or delete bindings it does not own.
     # Preconditions:
@@ -778,25 +768,14 @@ class TestMain(unittest.TestCase):
     # Delete all Crossplane components that were created for this test, including all Crossplane components created by Crossplane itself.
     def test_user_namespace_scope(self):
         # given
-        KubernetesResourceManager.create_resource_from_yaml(
-            f"{manifests_path}/digital_ocean/digital_ocean_xrd.yaml"
-        )
-        KubernetesResourceManager.create_resource_from_yaml(
-            f"{manifests_path}/digital_ocean/digital_ocean_xr.yaml"
-        )
-        KubernetesResourceManager.create_resource_from_yaml(
-            f"{manifests_path}/shared_resourses/namespace.yaml"
-        )
-        KubernetesResourceManager.create_resource_from_yaml(
-            f"{manifests_path}/shared_resourses/role.yaml"
-        )
-        KubernetesResourceManager.create_resource_from_yaml(
-            f"{manifests_path}/shared_resourses/role_binding.yaml"
-        )
+        given_xrd(f"{manifests_path}/digital_ocean/digital_ocean_xrd.yaml")
+        composition, = ManifestTemplates.generate_for_test(
+            self, f"{manifests_path}/digital_ocean/digital_ocean_xr.yaml")
+        KubernetesResourceManager.create_resource_from_yaml(composition)
+        namespace = NamespacePool.namespace_for(self)
 
         # when
         role_name = "crossplane-edit"
-        namespace = "example-namespace"
         role_api_path = f"/apis/rbac.authorization.k8s.io/v1/namespaces/{namespace}/roles/{role_name}"
         response_json = KubernetesResourceManager.send_request_and_get_json_response("GET", role_api_path)
 
@@ -826,17 +805,7 @@ class TestMain(unittest.TestCase):
                             f"Role {role_name} does not have the expected permissions for {resource} with verbs {expected_verbs}")
 
         # post condition
-        KubernetesResourceManager.delete_cluster_resource_by_file(
-            f"{manifests_path}/digital_ocean/digital_ocean_xrd.yaml")
-        KubernetesResourceManager.delete_cluster_resource_by_file(
-            f"{manifests_path}/digital_ocean/digital_ocean_xr.yaml")
-        KubernetesResourceManager.send_request_and_get_response(
-            "DELETE",
-            f"/api/v1/namespaces/{namespace}")
-        KubernetesResourceManager.delete_resource_by_file(
-            f"{manifests_path}/shared_resourses/role.yaml")
-        KubernetesResourceManager.delete_resource_by_file(
-            f"{manifests_path}/shared_resourses/role_binding.yaml")
+        TeardownQueue.delete(composition)
 
     # Test Case 3: Provider Managed Resource Creation Test
     # Objective:
@@ -855,16 +824,18 @@ class TestMain(unittest.TestCase):
     # Cleanup:
     # Delete all Crossplane components that were created for this test, including all Crossplane components created by Crossplane itself.
     def test_managed_resource_creation(self):
+        # given
+        droplet, = ManifestTemplates.generate_for_test(
+            self, f"{manifests_path}/digital_ocean/digital_ocean_manage_resourse.yaml")
 
         # when
-        KubernetesResourceManager.create_resource_from_yaml(
-            f"{manifests_path}/digital_ocean/digital_ocean_manage_resourse.yaml")
+        KubernetesResourceManager.create_resource_from_yaml(droplet)
 
-        response_json = KubernetesResourceManager.send_request_and_get_json_response("GET",
-                                                                                     "apis/compute.do.crossplane.io/v1alpha1/droplets/test-crossplane-droplet")
+        response_json = KubernetesResourceManager.send_request_and_get_json_response(
+            "GET", f"apis/compute.do.crossplane.io/v1alpha1/droplets/{droplet['metadata']['name']}")
 
         # then
-        self.assertEqual(response_json['metadata']['name'], "test-crossplane-droplet")
+        self.assertEqual(response_json['metadata']['name'], droplet['metadata']['name'])
         self.assertEqual(response_json['spec']['forProvider']['region'], "nyc1")
         self.assertEqual(response_json['spec']['forProvider']['size'], "s-1vcpu-1gb")
 
@@ -873,8 +844,7 @@ class TestMain(unittest.TestCase):
         self.assertEqual(conditions.get("Ready", {}).get("status"), "False", "'Ready' condition is not True")
 
         # post condition
-        KubernetesResourceManager.delete_resource_by_file(
-            f"{manifests_path}/digital_ocean/digital_ocean_manage_resourse.yaml")
+        TeardownQueue.delete(droplet)
 
     # Test Case 4: Provider Managed Resource Update Test
     # Objective:
@@ -892,32 +862,29 @@ class TestMain(unittest.TestCase):
     # Delete all Crossplane components that were created for this test, including all Crossplane components created by Crossplane itself.
     def test_manage_resource_updating(self):
         # given
-        KubernetesResourceManager.create_resource_from_yaml(
-            f"{manifests_path}/digital_ocean/digital_ocean_provider_config.yaml")
-        KubernetesResourceManager.create_resource_from_yaml(
+        provider_config, droplet = ManifestTemplates.generate_for_test(
+            self,
+            f"{manifests_path}/digital_ocean/digital_ocean_provider_config.yaml",
             f"{manifests_path}/digital_ocean/digital_ocean_manage_resourse.yaml")
+        KubernetesResourceManager.create_resource_from_yaml(provider_config)
+        KubernetesResourceManager.create_resource_from_yaml(droplet)
 
         # when
         updates = {
             "/spec/forProvider/size": "s-2vcpu-2gb",
             "/spec/forProvider/image": "ubuntu-20-04-x64"
         }
-        KubernetesResourceManager.update_cluster_resource_parameters(
-            f"{manifests_path}/digital_ocean/digital_ocean_manage_resourse.yaml",
-            updates)
-        response_json = KubernetesResourceManager.send_request_and_get_json_response("GET",
-                                                                                     "apis/compute.do.crossplane.io/v1alpha1/droplets/test-crossplane-droplet")
+        KubernetesResourceManager.update_cluster_resource_parameters(droplet, updates)
+        response_json = KubernetesResourceManager.send_request_and_get_json_response(
+            "GET", f"apis/compute.do.crossplane.io/v1alpha1/droplets/{droplet['metadata']['name']}")
 
         # then
-        self.assertEqual(response_json['metadata']['name'], "test-crossplane-droplet")
+        self.assertEqual(response_json['metadata']['name'], droplet['metadata']['name'])
         self.assertEqual(response_json['spec']['forProvider']['region'], "nyc1")
         self.assertEqual(response_json['spec']['forProvider']['size'], "s-2vcpu-2gb")
 
         # post condition
-        KubernetesResourceManager.delete_resource_by_file(
-            f"{manifests_path}/digital_ocean/digital_ocean_provider_config.yaml")
-        KubernetesResourceManager.delete_resource_by_file(
-            f"{manifests_path}/digital_ocean/digital_ocean_manage_resourse.yaml")
+        TeardownQueue.delete(droplet, provider_config)
 
     # Test Case 5: Provider Managed Resource Deletion Test
     # Objective:
@@ -935,21 +902,21 @@ class TestMain(unittest.TestCase):
     # Delete all Crossplane components that were created for this test, including all Crossplane components created by Crossplane itself.
     def test_manage_resource_deleting(self):
         # given
-        KubernetesResourceManager.create_resource_from_yaml(
-            f"{manifests_path}/digital_ocean/digital_ocean_provider_config.yaml")
-        KubernetesResourceManager.create_resource_from_yaml(
+        provider_config, droplet = ManifestTemplates.generate_for_test(
+            self,
+            f"{manifests_path}/digital_ocean/digital_ocean_provider_config.yaml",
             f"{manifests_path}/digital_ocean/digital_ocean_manage_resourse.yaml")
+        KubernetesResourceManager.create_resource_from_yaml(provider_config)
+        KubernetesResourceManager.create_resource_from_yaml(droplet)
 
         # when
-        KubernetesResourceManager.delete_cluster_resource_by_file(
-            f"{manifests_path}/digital_ocean/digital_ocean_manage_resourse.yaml")
+        KubernetesResourceManager.delete_cluster_resource_by_file(droplet)
 
-        response = KubernetesResourceManager.send_request_and_get_response("GET",
-                                                                           "apis/compute.do.crossplane.io/v1alpha1/droplets/test-crossplane-droplet")
+        response = KubernetesResourceManager.send_request_and_get_response(
+            "GET", f"apis/compute.do.crossplane.io/v1alpha1/droplets/{droplet['metadata']['name']}")
 
         # then
         self.assertEqual(response.status_code, 404)
 
         # post condition
-        KubernetesResourceManager.delete_resource_by_file(
-            f"{manifests_path}/digital_ocean/digital_ocean_provider_config.yaml")
+        TeardownQueue.delete(provider_config)
@@ -0,0 +1,58 @@
+import unittest
+
+from manifest_templates import ManifestTemplates
+
+
+class TestManifestTemplates(unittest.TestCase):
+
+    # Objective: Verify that generated documents are independent copies with unique names.
+    def test_generated_documents_are_unique_and_independent(self):
+        # given
+        template = ManifestTemplates.get("digital_ocean/digital_ocean_claim.yaml")
+
+        # when
+        first, second = template.generate_many(2, parameters={"size": "s-2vcpu-2gb"})
+        first["spec"]["parameters"]["region"] = "ams3"
+
+        # then
+        self.assertEqual([first["metadata"]["name"], second["metadata"]["name"]],
+                         ["test-droplet-claim-1-0", "test-droplet-claim-1-1"])
+        self.assertEqual(second["spec"]["parameters"], {"image": "ubuntu-20-04-x64", "region": "nyc1",
+                                                        "size": "s-2vcpu-2gb"})
+        self.assertEqual(template.generate()["spec"]["parameters"]["size"], "s-1vcpu-1gb")
+
+    # Objective: Verify that a bundle renames its members consistently but keeps spec-derived names.
+    def test_bundle_keeps_xrd_name_and_suffixes_the_rest(self):
+        # when
+        xrd, composition, claim = ManifestTemplates.generate_bundle(
+            ["digital_ocean/digital_ocean_xrd.yaml", "digital_ocean/digital_ocean_xr.yaml",
+             "digital_ocean/digital_ocean_claim.yaml"], "w1", namespace="team-a")
+
+        # then
+        self.assertEqual(xrd["metadata"]["name"], "xdroplets.compute.crossplane.io")
+        self.assertEqual(composition["metadata"]["name"], "xdroplet-composition-w1")
+        self.assertEqual(claim["metadata"], {"name": "test-droplet-claim-1-w1", "namespace": "team-a"})
+
+    # Objective: Verify that each test case gets its own names, so its creates never wait on another test's teardown.
+    def test_generated_names_are_unique_per_test(self):
+        # given
+        manifests = ["digital_ocean/digital_ocean_xrd.yaml", "digital_ocean/digital_ocean_provider_config.yaml",
+                     "digital_ocean/digital_ocean_manage_resourse.yaml"]
+
+        # when
+        first = ManifestTemplates.generate_for_test(self, *manifests)
+        second = ManifestTemplates.generate_for_test(
+            TestManifestTemplates("test_generated_documents_are_unique_and_independent"), *manifests)
+
+        # then
+        self.assertEqual([document["metadata"]["name"] for document in first],
+                         ["xdroplets.compute.crossplane.io",
+                          "digital-ocean-provider-config-test-generated-names-are-unique-per-test",
+                          "test-crossplane-droplet-test-generated-names-are-unique-per-test"])
+        self.assertEqual(first[2]["spec"]["providerConfigRef"]["name"], first[1]["metadata"]["name"])
+        self.assertEqual(first[0]["metadata"]["name"], second[0]["metadata"]["name"])
+        self.assertNotEqual(first[2]["metadata"]["name"], second[2]["metadata"]["name"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import itertools
+import unittest
+from unittest import mock
+
+from metrics_sampler import MetricsSampler, histogram_quantile, interval_points, parse_exposition, snapshot
+
+
+def _exposition(reconciles, seconds, fast, depth, requests):
+    return [
+        "# HELP controller_runtime_reconcile_time_seconds Length of time per reconciliation per controller",
+        "# TYPE controller_runtime_reconcile_time_seconds histogram",
+        f'controller_runtime_reconcile_time_seconds_bucket{{controller="claim/dropletclaims",le="0.1"}} {fast}',
+        f'controller_runtime_reconcile_time_seconds_bucket{{controller="claim/dropletclaims",le="+Inf"}} {reconciles}',
+        f'controller_runtime_reconcile_time_seconds_sum{{controller="claim/dropletclaims"}} {seconds}',
+        f'controller_runtime_reconcile_time_seconds_count{{controller="claim/dropletclaims"}} {reconciles}',
+        f'workqueue_depth{{name="claim/dropletclaims"}} {depth}',
+        f'rest_client_requests_total{{code="200",host="10.96.0.1:443",method="GET"}} {requests}',
+        f'rest_client_requests_total{{code="200",host="10.96.0.1:443",method="PATCH"}} {requests}',
+        'go_goroutines 120',
+    ]
+
+
+class TestMetricsSampler(unittest.TestCase):
+
+    # Objective: Verify that only the scraped families are parsed and that two scrapes yield the activity in between.
+    def test_interval_activity_between_scrapes(self):
+        # given
+        previous = snapshot(parse_exposition(_exposition(10, 2.0, 9, 0, 50)))
+        current = snapshot(parse_exposition([line.encode('utf-8') for line in _exposition(30, 12.0, 11, 4, 80)]))
+
+        # when
+        points = interval_points(previous, current)
+
+        # then
+        self.assertEqual(sorted(previous), ['api_requests', 'reconciles', 'workqueue_depth'])
+        self.assertIn(('reconciles', 'claim/dropletclaims', 20.0), points)
+        self.assertIn(('reconcile_seconds', 'claim/dropletclaims', 10.0), points)
+        self.assertIn(('workqueue_depth', 'claim/dropletclaims', 4.0), points)
+        self.assertIn(('api_requests', '200', 60.0), points)
+        # 2 of the 20 reconciles took at most 0.1s, so the p95 is the largest finite bucket bound
+        self.assertIn(('reconcile_p95', 'claim/dropletclaims', 0.1), points)
+
+    # Objective: Verify that a restarted controller's counters are counted from zero instead of going negative.
+    def test_counter_reset_after_restart(self):
+        # given
+        previous = snapshot(parse_exposition(_exposition(500, 90.0, 400, 2, 9000)))
+        current = snapshot(parse_exposition(_exposition(8, 0.4, 8, 0, 30)))
+
+        # when
+        points = interval_points(previous, current)
+
+        # then
+        self.assertIn(('reconciles', 'claim/dropletclaims', 8.0), points)
+        self.assertIn(('reconcile_seconds', 'claim/dropletclaims', 0.4), points)
+        self.assertIn(('workqueue_depth', 'claim/dropletclaims', 0.0), points)
+        self.assertIn(('api_requests', '200', 60.0), points)
+        self.assertAlmostEqual(histogram_quantile(0.5, {0.1: 5.0, 1.0: 10.0, float('inf'): 10.0}), 0.1)
+
+    # Objective: Verify that a test is charged only the activity between its start and its end, not what preceded it.
+    def test_activity_before_a_test_is_not_charged_to_it(self):
+        # given
+        sampler = MetricsSampler(interval=60)
+        scrapes = [snapshot(parse_exposition(_exposition(reconciles, reconciles / 10, 0, 0, 0)))
+                   for reconciles in (10, 15, 35)]
+
+        with mock.patch.object(sampler, '_discover_pods', return_value=[('crossplane', 'crossplane-7d9f')]), \
+                mock.patch.object(sampler, '_scrape', side_effect=scrapes), \
+                mock.patch('time.time', side_effect=itertools.count(1000)):
+            sampler.sample()
+
+            # when
+            sampler.start_test(None)
+            sampler.stop_test(None)
+            controllers, _ = sampler.summarize(sampler._test_started)
+
+        # then
+        self.assertEqual([activity.reconciles for activity in controllers], [20.0])
@@ -0,0 +1,81 @@
+import unittest
+from unittest import mock
+
+from k8s import KubernetesResourceManager
+from namespace_pool import NamespacePool, NamespacedResource
+from teardown_queue import TeardownQueue
+
+
+class TestNamespacePool(unittest.TestCase):
+
+    def setUp(self):
+        self.saved_shared = NamespacePool._shared
+
+    def tearDown(self):
+        NamespacePool._shared = self.saved_shared
+
+    # Objective: Verify that a test leases a pooled namespace and hands it back for recycling when it finishes.
+    def test_namespace_is_leased_for_the_test(self):
+        # given
+        pool = NamespacePool(size=1)
+        recycled = []
+        pool._recycle = recycled.append
+        pool._ready.put("pool-run-1")
+        NamespacePool._shared = pool
+        test = unittest.TestCase()
+
+        # when
+        namespace = NamespacePool.namespace_for(test)
+        leased_before_cleanup = list(recycled)
+        test.doCleanups()
+        pool.close()
+
+        # then
+        self.assertEqual(namespace, "pool-run-1")
+        self.assertEqual(leased_before_cleanup, [])
+        self.assertEqual(recycled, ["pool-run-1"])
+
+    # Objective: Verify that without a pool every test gets its own namespace, with the RBAC, deleted afterwards.
+    def test_namespace_without_pool_is_unique_to_the_test(self):
+        # given
+        NamespacePool._shared = None
+        tests = [unittest.TestCase(), unittest.TestCase()]
+
+        # when
+        with mock.patch.object(KubernetesResourceManager, 'create_resource_from_yaml') as create, \
+                mock.patch.object(TeardownQueue, 'delete') as delete:
+            namespaces = [NamespacePool.namespace_for(test) for test in tests]
+            created = [call.args[0] for call in create.call_args_list]
+            for test in tests:
+                test.doCleanups()
+
+        # then
+        self.assertEqual(len(set(namespaces)), 2)
+        self.assertNotIn("example-namespace", namespaces)
+        self.assertEqual([(document['kind'], document['metadata']['name']) for document in created[:3]],
+                         [("Namespace", namespaces[0]), ("Role", "crossplane-edit"),
+                          ("RoleBinding", "crossplane-edit-binding")])
+        self.assertEqual({document['metadata'].get('namespace') for document in created[1:3]}, {namespaces[0]})
+        self.assertEqual([call.args[0]['metadata']['name'] for call in delete.call_args_list], namespaces)
+
+    # Objective: Verify that an emptied namespace is reused and one that does not empty in time is replaced.
+    def test_recycle_reuses_empty_and_replaces_stuck_namespaces(self):
+        # given
+        pool = NamespacePool(size=1, recycle_timeout=0)
+        configmaps = NamespacedResource("api", "v1", "configmaps")
+        pool._namespaced_resources = lambda: [configmaps]
+        pool._delete_contents = lambda name, resource: name == "pool-run-2"
+        deleted, replenished = [], []
+        pool._delete_namespace = deleted.append
+        pool._replenish = lambda: replenished.append(True)
+
+        # when
+        pool._recycle("pool-run-1")
+        pool._recycle("pool-run-2")
+        pool.close()
+
+        # then
+        self.assertEqual(pool._ready.get_nowait(), "pool-run-1")
+        self.assertTrue(pool._ready.empty())
+        self.assertEqual(deleted, ["pool-run-2"])
+        self.assertEqual(replenished, [True])
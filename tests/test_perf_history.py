@@ -0,0 +1,43 @@
+import unittest
+
+from perf_history import endpoint_template, find_regressions
+
+
+class TestPerfHistory(unittest.TestCase):
+
+    # Objective: Verify that API calls on different objects are grouped under one endpoint.
+    def test_endpoint_template_replaces_namespace_and_name(self):
+        # when
+        claim = endpoint_template("get", "https://10.0.0.1:6443/apis/compute.crossplane.io/v1alpha1/namespaces/"
+                                         "team-a/dropletclaims/test-droplet-claim-1?timeout=5s")
+        collection = endpoint_template("GET", "https://10.0.0.1:6443/apis/pkg.crossplane.io/v1/providers")
+        namespace = endpoint_template("DELETE", "https://10.0.0.1:6443/api/v1/namespaces/team-a")
+
+        # then
+        self.assertEqual(claim, "GET apis/compute.crossplane.io/v1alpha1/namespaces/{namespace}/dropletclaims/{name}")
+        self.assertEqual(collection, "GET apis/pkg.crossplane.io/v1/providers")
+        self.assertEqual(namespace, "DELETE api/v1/namespaces/{name}")
+
+    # Objective: Verify that only slowdowns that are both large and significant are reported.
+    def test_find_regressions_flags_significant_slowdowns(self):
+        # given
+        baseline = {("api", "GET slow"): [0.10, 0.11, 0.09, 0.10, 0.12, 0.10, 0.11, 0.09],
+                    ("api", "GET noisy"): [0.05, 0.30, 0.10, 0.25, 0.08, 0.20, 0.12, 0.28],
+                    ("test", "test_claim"): [30.0, 31.0, 29.5, 30.5, 30.2, 29.8] * 4,
+                    ("ready", "DropletClaim Ready"): [40.0, 41.0]}
+        latest = {("api", "GET slow"): [0.15, 0.16, 0.14, 0.17, 0.15],
+                  ("api", "GET noisy"): [0.22, 0.06, 0.18],
+                  ("test", "test_claim"): [45.0],
+                  ("ready", "DropletClaim Ready"): [90.0]}
+
+        # when
+        compared, regressions = find_regressions(latest, baseline)
+
+        # then: a single test duration can only be significant against a long enough baseline
+        self.assertEqual(compared, 3)
+        self.assertEqual([(regression.metric, regression.name) for regression in regressions],
+                         [("api", "GET slow"), ("test", "test_claim")])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,28 @@
+import unittest
+
+from preflight import assign_tiers, defined_types, load_documents
+
+
+class TestPreflight(unittest.TestCase):
+
+    # Objective: Verify that definitions are dry-run before configuration and claims of the XRDs they define.
+    def test_manifests_are_tiered_by_dependency(self):
+        # given
+        documents = load_documents()
+
+        # when
+        tiers = {(entry.manifest, entry.document['kind']): entry.tier for entry in assign_tiers(documents)}
+        types = defined_types(documents)
+
+        # then
+        self.assertEqual(types[("compute.crossplane.io", "DropletClaim")], "digital_ocean/digital_ocean_xrd.yaml")
+        self.assertEqual(tiers[("digital_ocean/digital_ocean_xrd.yaml", "CompositeResourceDefinition")],
+                         "definitions")
+        self.assertEqual(tiers[("shared_resourses/namespace.yaml", "Namespace")], "definitions")
+        self.assertEqual(tiers[("digital_ocean/digital_ocean_provider.yaml", "Provider")], "definitions")
+        self.assertEqual(tiers[("digital_ocean/digital_ocean_xr.yaml", "Composition")], "configuration")
+        self.assertEqual(tiers[("digital_ocean/digital_ocean_claim.yaml", "DropletClaim")], "instances")
+
+
+if __name__ == '__main__':
+    unittest.main()
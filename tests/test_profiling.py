@@ -0,0 +1,53 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import profiling
+
+
+def spin(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+class TestTestProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+
+    # Objective: Verify that CPU time burnt by other threads is not charged to the test as its own.
+    def test_cpu_time_is_the_test_threads_own(self):
+        # given
+        profiler = profiling.TestProfiler('cprofile', self.output_dir)
+        busy = threading.Thread(target=spin, args=(0.3,))
+
+        # when
+        profiler.start_test(self)
+        busy.start()
+        busy.join()
+        timing = profiler.stop_test(self)
+
+        # then
+        self.assertLess(timing['cpu_time'], 0.15)
+        self.assertGreater(timing['blocked_time'], 0.15)
+        self.assertTrue(os.path.exists(os.path.join(self.output_dir, f"{self.id()}.prof")))
+
+    # Objective: Verify that the sampling mode reports how many samples caught the test blocked.
+    def test_sampling_reports_blocked_samples(self):
+        # given
+        profiler = profiling.TestProfiler('sampling', self.output_dir)
+
+        # when
+        profiler.start_test(self)
+        threading.Event().wait(0.2)
+        timing = profiler.stop_test(self)
+        report = profiler.write_report()
+
+        # then
+        self.assertGreater(timing['blocked_samples'], 0)
+        self.assertLessEqual(timing['blocked_samples'], timing['samples'])
+        self.assertIn('blocked samples', report.splitlines()[0])
+        self.assertIn(f"{timing['blocked_samples']:>7}/{timing['samples']:<8}", report)
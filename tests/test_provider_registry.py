@@ -0,0 +1,92 @@
+import base64
+import os
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from kubernetes.client.exceptions import ApiException
+
+import provider
+from k8s import KubernetesResourceManager
+from provider_registry import ProviderRegistry
+
+
+class FakeResourceApi:
+
+    def __init__(self, existing=()):
+        self.objects = {name: 1 for name in existing}
+        self.calls = []
+
+    def create(self, body, namespace=None):
+        self.calls.append(('create', body))
+        if body['metadata']['name'] in self.objects:
+            raise ApiException(status=409, reason="AlreadyExists")
+        self.objects[body['metadata']['name']] = 1
+
+    def get(self, name, namespace=None):
+        return SimpleNamespace(metadata=SimpleNamespace(resourceVersion=str(self.objects[name])))
+
+    def replace(self, body, namespace=None):
+        self.calls.append(('replace', body))
+        self.objects[body['metadata']['name']] += 1
+
+    def delete(self, name, namespace=None):
+        self.calls.append(('delete', name))
+        if self.objects.pop(name, None) is None:
+            raise ApiException(status=404, reason="NotFound")
+
+
+class TestProviderRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.resource_api = FakeResourceApi(existing=['provider-do-secret'])
+        dynamic_client = SimpleNamespace(resources=SimpleNamespace(get=lambda api_version, kind: self.resource_api))
+        self.entry, = ProviderRegistry.get_entries(['provider-digitalocean'])
+        self.patches = [mock.patch.object(KubernetesResourceManager, 'get_dynamic_kubernetes_client',
+                                          return_value=dynamic_client),
+                        mock.patch.object(provider, 'install_provider_and_wait')]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in reversed(self.patches):
+            patch.stop()
+
+    # Objective: Verify that a provider whose credentials variable is unset fails before anything is created.
+    def test_missing_credentials_fail_the_setup(self):
+        # when
+        with mock.patch.dict(os.environ, {self.entry.credentials_env: ''}):
+            result = ProviderRegistry.setup_provider(self.entry)
+
+        # then
+        self.assertFalse(result.ready)
+        self.assertIn(self.entry.credentials_env, result.error)
+        self.assertEqual(self.resource_api.calls, [])
+        provider.install_provider_and_wait.assert_not_called()
+
+    # Objective: Verify that an existing credentials Secret is replaced with the current token, not kept.
+    def test_existing_secret_is_replaced(self):
+        # given
+        provider.install_provider_and_wait.return_value = SimpleNamespace(ready=True)
+
+        # when
+        with mock.patch.dict(os.environ, {self.entry.credentials_env: 'new-token'}), \
+                mock.patch.object(ProviderRegistry, 'check_health', return_value=True):
+            result = ProviderRegistry.setup_provider(self.entry)
+
+        # then
+        self.assertTrue(result.ready, result.error)
+        replaced = [body for call, body in self.resource_api.calls if call == 'replace']
+        self.assertEqual(replaced[0]['metadata']['resourceVersion'], '1')
+        self.assertEqual(base64.b64decode(replaced[0]['data']['token']), b'new-token')
+
+    # Objective: Verify that tearing a provider down also deletes its credentials Secret.
+    def test_teardown_deletes_the_secret(self):
+        # when
+        with mock.patch.object(KubernetesResourceManager, 'delete_cluster_resource_by_file') as delete:
+            ProviderRegistry.teardown_all(['provider-digitalocean'])
+
+        # then
+        self.assertEqual([call.args[0] for call in delete.call_args_list],
+                         [self.entry.provider_config, self.entry.provider])
+        self.assertEqual(self.resource_api.calls, [('delete', 'provider-do-secret')])
@@ -0,0 +1,98 @@
+import json
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from k8s import KubernetesResourceManager
+from readiness_barrier import BarrierTarget, ReadinessBarrier, absent, condition_is
+
+CLAIM_TARGET = BarrierTarget('compute.crossplane.io/v1alpha1', 'DropletClaim', 'default', 'test-droplet-claim-1',
+                             condition_is('Ready'))
+
+
+def claim(ready):
+    return {'metadata': {'name': 'test-droplet-claim-1', 'namespace': 'default', 'resourceVersion': '7'},
+            'status': {'conditions': [{'type': 'Synced', 'status': 'True'},
+                                      {'type': 'Ready', 'status': 'True' if ready else 'False'}]}}
+
+
+def list_response(status_code, items=()):
+    body = {'kind': 'DropletClaimList', 'metadata': {'resourceVersion': '7'}, 'items': list(items)} \
+        if status_code == 200 else {'kind': 'Status', 'code': status_code, 'message': 'forbidden'}
+    return SimpleNamespace(status_code=status_code, json=lambda: body, text=json.dumps(body))
+
+
+class TestReadinessBarrier(unittest.TestCase):
+
+    def setUp(self):
+        self.watch_events = []
+        self.patches = [mock.patch.object(KubernetesResourceManager, 'resolve_plural', return_value='dropletclaims'),
+                        mock.patch.object(KubernetesResourceManager, 'send_request_and_get_response'),
+                        mock.patch.object(KubernetesResourceManager, 'open_watch',
+                                          return_value=SimpleNamespace(close=lambda: None)),
+                        mock.patch.object(KubernetesResourceManager, 'iter_watch_events',
+                                          side_effect=lambda response: iter(self.watch_events)),
+                        mock.patch('time.sleep')]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in reversed(self.patches):
+            patch.stop()
+
+    # Objective: Verify that condition_is matches the condition's type and status, and a missing object never.
+    def test_condition_is_matches_type_and_status(self):
+        # then
+        self.assertTrue(condition_is('Ready')(claim(ready=True)))
+        self.assertFalse(condition_is('Ready')(claim(ready=False)))
+        self.assertTrue(condition_is('Ready', status='False')(claim(ready=False)))
+        self.assertFalse(condition_is('Ready')({'metadata': {}}))
+        self.assertFalse(condition_is('Ready')(None))
+
+    # Objective: Verify that a target becomes satisfied from the watch stream after the initial list.
+    def test_target_is_satisfied_by_a_watch_event(self):
+        # given
+        KubernetesResourceManager.send_request_and_get_response.return_value = \
+            list_response(200, [claim(ready=False)])
+        self.watch_events.append({'type': 'MODIFIED', 'object': dict(claim(ready=True), kind='DropletClaim')})
+
+        # when
+        result = ReadinessBarrier.wait([CLAIM_TARGET], timeout=5)
+
+        # then
+        self.assertEqual(result.satisfied, [CLAIM_TARGET])
+        self.assertEqual(result.unsatisfied, [])
+
+    # Objective: Verify that a forbidden list fails the barrier with its error instead of reading as no objects.
+    def test_forbidden_list_fails_the_barrier(self):
+        # given
+        KubernetesResourceManager.send_request_and_get_response.return_value = list_response(403)
+        target = CLAIM_TARGET._replace(predicate=absent)
+
+        # when
+        result = ReadinessBarrier.wait([target], timeout=5)
+
+        # then
+        self.assertEqual(result.satisfied, [])
+        unsatisfied, = result.unsatisfied
+        self.assertIn('403', unsatisfied.error)
+        self.assertIn('403', ReadinessBarrier.format_unsatisfied(result))
+        KubernetesResourceManager.send_request_and_get_response.assert_called_once()
+
+    # Objective: Verify that a list answered with a transient error is retried with backoff.
+    def test_unavailable_list_is_retried(self):
+        # given
+        KubernetesResourceManager.send_request_and_get_response.side_effect = [
+            list_response(503), list_response(503), list_response(200, [claim(ready=True)])]
+
+        # when
+        result = ReadinessBarrier.wait([CLAIM_TARGET], timeout=5)
+
+        # then
+        self.assertEqual(result.satisfied, [CLAIM_TARGET])
+        self.assertEqual([call.args[0] for call in time.sleep.call_args_list], [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
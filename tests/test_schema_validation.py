@@ -0,0 +1,123 @@
+import copy
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import yaml
+import path_searcher as path_builder
+
+from k8s import KubernetesResourceManager
+from schema_validator import ManifestSchemaValidator
+
+manifests_path = path_builder.get_manifest_path()
+
+
+class TestSchemaValidation(unittest.TestCase):
+
+    # Objective: Verify that claims are validated locally against the openAPIV3Schema of their XRD.
+    def test_valid_claim_has_no_violations(self):
+        # when
+        violations = ManifestSchemaValidator.validate_file(f"{manifests_path}/digital_ocean/digital_ocean_claim.yaml")
+
+        # then
+        self.assertEqual(violations, [])
+
+    def test_invalid_update_is_field_addressed(self):
+        # given
+        with open(f"{manifests_path}/digital_ocean/digital_ocean_claim_update.yaml", 'r') as f:
+            claim = yaml.safe_load(f)
+
+        # when
+        violations = ManifestSchemaValidator.validate_patch(claim, [
+            {"op": "replace", "path": "/spec/parameters/size", "value": 2},
+            {"op": "add", "path": "/spec/parameters/flavour", "value": "large"}
+        ])
+
+        # then
+        reasons = {violation.field: violation.reason for violation in violations}
+        self.assertEqual(reasons, {
+            "spec.parameters.size": "FieldValueTypeInvalid",
+            "spec.parameters.flavour": "FieldValueUnknown"
+        })
+
+    def test_crossplane_spec_fields_are_accepted(self):
+        # given
+        with open(f"{manifests_path}/digital_ocean/digital_ocean_claim.yaml", 'r') as f:
+            claim = yaml.safe_load(f)
+        claim['spec']['compositionRef'] = {"name": "xdroplet-composition"}
+
+        # when
+        violations = ManifestSchemaValidator.validate_resource(claim)
+
+        # then
+        self.assertEqual(violations, [])
+
+    def test_replace_of_missing_field_is_rejected(self):
+        # given
+        with open(f"{manifests_path}/digital_ocean/digital_ocean_claim.yaml", 'r') as f:
+            claim = yaml.safe_load(f)
+
+        # when
+        violations = ManifestSchemaValidator.validate_updates(claim, {"/spec/parameters/flavour": "large"})
+
+        # then
+        self.assertEqual([(violation.field, violation.reason) for violation in violations],
+                         [("spec.parameters.flavour", "FieldValueInvalid")])
+
+    # Objective: Verify that update patches are validated against the live object, not the manifest, so a
+    # replace of a field only the server populated is sent.
+    def test_update_is_validated_against_the_live_object(self):
+        # given
+        claim_path = f"{manifests_path}/digital_ocean/digital_ocean_claim.yaml"
+        with open(claim_path, 'r') as f:
+            live_claim = yaml.safe_load(f)
+        live_claim['spec']['compositionRef'] = {"name": "xdroplet-composition"}
+        session = mock.Mock()
+        session.get.return_value = SimpleNamespace(status_code=200, json=lambda: live_claim)
+        session.patch.return_value = SimpleNamespace(status_code=200)
+
+        # when
+        with mock.patch.object(KubernetesResourceManager, 'get_http_session', return_value=session), \
+                mock.patch.object(KubernetesResourceManager, 'get_admin_token', return_value='token'), \
+                mock.patch.object(KubernetesResourceManager, 'resolve_plural', return_value='dropletclaims'):
+            KubernetesResourceManager.update_resource_parameters_with_namespace_from_yaml(
+                claim_path, {"/spec/compositionRef/name": "xdroplet-composition-v2"})
+
+        # then
+        self.assertTrue(session.get.call_args.args[0].endswith('/dropletclaims/test-droplet-claim-1'))
+        session.patch.assert_called_once()
+
+    def test_manifest_directory_validation(self):
+        # when
+        results = ManifestSchemaValidator.validate_directory(manifests_path)
+
+        # then
+        self.assertIn(f"{manifests_path}/digital_ocean/digital_ocean_claim.yaml", results)
+        self.assertTrue(all(not violations for violations in results.values()))
+
+    # Objective: Verify that re-registering an updated XRD replaces the schema claims are validated against.
+    def test_reregistered_xrd_replaces_schema(self):
+        # given
+        with open(f"{manifests_path}/digital_ocean/digital_ocean_xrd.yaml", 'r') as f:
+            xrd = yaml.safe_load(f)
+        with open(f"{manifests_path}/digital_ocean/digital_ocean_claim.yaml", 'r') as f:
+            claim = yaml.safe_load(f)
+        updated_xrd = copy.deepcopy(xrd)
+        parameters = updated_xrd['spec']['versions'][0]['schema']['openAPIV3Schema']['properties']['spec'][
+            'properties']['parameters']
+        parameters['properties']['flavour'] = {"type": "string"}
+
+        patch = [{"op": "add", "path": "/spec/parameters/flavour", "value": "large"}]
+
+        # when
+        ManifestSchemaValidator.register_xrd(xrd)
+        original_violations = ManifestSchemaValidator.validate_patch(claim, patch)
+        ManifestSchemaValidator.register_xrd(updated_xrd)
+        try:
+            updated_violations = ManifestSchemaValidator.validate_patch(claim, patch)
+        finally:
+            ManifestSchemaValidator.register_xrd(xrd)
+
+        # then
+        self.assertEqual([violation.reason for violation in original_violations], ["FieldValueUnknown"])
+        self.assertEqual(updated_violations, [])
@@ -0,0 +1,43 @@
+import unittest
+
+from sharding import parse_shard, plan_shards
+
+
+class TestSharding(unittest.TestCase):
+
+    # Objective: Verify that shards are balanced by duration and that tests sharing a singleton stay together.
+    def test_plan_balances_durations_and_keeps_singletons_together(self):
+        # given
+        xrd = ("CompositeResourceDefinition", "xdroplets.compute.crossplane.io")
+        provider = ("Provider", "provider-digitalocean")
+        singletons = {"xrd_create": {xrd}, "xrd_update": {xrd}, "provider_install": {provider},
+                      "claim_create": set(), "claim_delete": set(), "role_check": set()}
+        durations = {"xrd_create": 40, "xrd_update": 50, "provider_install": 80, "claim_create": 30,
+                     "claim_delete": 20, "role_check": 10}
+
+        # when
+        shards, estimates = plan_shards(singletons, durations, 2)
+
+        # then
+        self.assertTrue(any({"xrd_create", "xrd_update"} <= set(shard) for shard in shards))
+        self.assertEqual(sorted(test_id for shard in shards for test_id in shard), sorted(singletons))
+        self.assertEqual(sorted(estimates), [110, 120])
+
+    # Objective: Verify that tests without recorded durations are weighted by the median of the known ones.
+    def test_plan_without_history_is_deterministic(self):
+        # given
+        singletons = {f"test_{index}": set() for index in range(7)}
+
+        # when
+        first, _ = plan_shards(singletons, {}, 3)
+        second, _ = plan_shards(dict(reversed(list(singletons.items()))), {}, 3)
+
+        # then
+        self.assertEqual(first, second)
+        self.assertEqual(sorted(len(shard) for shard in first), [2, 2, 3])
+        self.assertEqual(parse_shard("2/3"), (2, 3))
+        self.assertRaises(ValueError, parse_shard, "4/3")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import json
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from k8s import KubernetesResourceManager
+from soak import SoakTest
+
+
+class FakeSession:
+    """Answers GETs from the given {resource name: object} map and accepts every create."""
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.posted = []
+
+    def get(self, url, headers=None):
+        resource = self.objects.get(url.rsplit('/', 1)[-1])
+        if resource is None:
+            return SimpleNamespace(status_code=404, json=lambda: {'kind': 'Status', 'code': 404})
+        return SimpleNamespace(status_code=200, json=lambda: resource)
+
+    def post(self, url, data=None, headers=None):
+        self.posted.append(json.loads(data)['metadata']['name'])
+        return SimpleNamespace(status_code=201)
+
+
+ESTABLISHED_XRD = {'status': {'conditions': [{'type': 'Established', 'status': 'True'}]}}
+
+
+class TestSoak(unittest.TestCase):
+
+    def setUp(self):
+        self.patches = [mock.patch.object(KubernetesResourceManager, 'resolve_plural',
+                                          side_effect=lambda api_version, kind: f"{kind.lower()}s"),
+                        mock.patch.object(KubernetesResourceManager, 'get_admin_token', return_value='token')]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in reversed(self.patches):
+            patch.stop()
+
+    def soak_with(self, session, **soak_config):
+        patch = mock.patch.object(KubernetesResourceManager, 'get_http_session', return_value=session)
+        patch.start()
+        self.patches.append(patch)
+        return SoakTest(dict({'name_prefix': 'soak', 'max_objects': 5}, **soak_config))
+
+    # Objective: Verify that the soak refuses to start, before creating any claim, without its Composition.
+    def test_missing_composition_stops_the_soak(self):
+        # given
+        session = FakeSession({'xdroplets.compute.crossplane.io': ESTABLISHED_XRD})
+        soak_test = self.soak_with(session)
+
+        # when
+        with self.assertRaises(RuntimeError) as raised:
+            soak_test.run(duration=1, rate=10)
+
+        # then
+        self.assertIn("Composition 'xdroplet-composition' (status 404)", str(raised.exception))
+        self.assertEqual(session.posted, [])
+
+    # Objective: Verify that claims that never became Ready are reported and flagged at the end of the soak.
+    def test_claims_never_ready_are_reported(self):
+        # given
+        soak_test = self.soak_with(FakeSession({}), ready_timeout=0)
+        started = time.time()
+        for _ in range(2):
+            soak_test._create()
+        ready = f"soak-{soak_test.run_id}-1"
+        soak_test._observe('MODIFIED', {'metadata': {'name': ready},
+                                        'status': {'conditions': [{'type': 'Ready', 'status': 'True'}]}})
+
+        # when
+        report = soak_test._report(started)
+
+        # then
+        self.assertEqual(report.never_ready, [f"soak-{soak_test.run_id}-2"])
+        self.assertIn("1 claims not Ready 0s after their creation", report.flags)
+
+
+if __name__ == '__main__':
+    unittest.main()
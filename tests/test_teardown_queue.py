@@ -0,0 +1,61 @@
+import threading
+import unittest
+
+from logger import LoggerManager
+from teardown_queue import TeardownQueue, object_key
+
+
+class TestTeardownQueue(unittest.TestCase):
+
+    def setUp(self):
+        # set aside the teardowns queued by earlier tests so that drain only reports this test's work and
+        # the run still reports theirs
+        self.saved_futures, TeardownQueue._futures = TeardownQueue._futures, []
+
+    def tearDown(self):
+        TeardownQueue._futures = self.saved_futures + TeardownQueue._futures
+
+    # Objective: Verify that a create waits for the pending teardown of the same object and that drain reports failures.
+    def test_create_waits_for_pending_teardown(self):
+        # given
+        document = {"apiVersion": "v1", "kind": "ConfigMap",
+                    "metadata": {"name": "teardown-test", "namespace": "default"}}
+        release = threading.Event()
+        deleted = []
+
+        def delete():
+            release.wait(5)
+            deleted.append(object_key(document))
+
+        def fail():
+            raise RuntimeError("finalizer stuck")
+
+        TeardownQueue.submit(delete, keys=[object_key(document)], description="ConfigMap 'teardown-test'")
+        TeardownQueue.submit(fail, description="stuck object")
+
+        # when
+        threading.Timer(0.2, release.set).start()
+        TeardownQueue.wait_for(document, timeout=5)
+        report = TeardownQueue.drain(timeout=5)
+
+        # then
+        self.assertEqual(deleted, [("v1", "ConfigMap", "default", "teardown-test")])
+        self.assertEqual([(failure.description, failure.error) for failure in report.failures],
+                         [("stuck object", "finalizer stuck")])
+        self.assertEqual(report.completed, 2)
+        self.assertEqual(TeardownQueue.drain(timeout=5).completed, 0)
+
+    # Objective: Verify that queued work runs under the id of the test that queued it, not the one running later.
+    def test_work_runs_with_the_queuing_tests_id(self):
+        # given
+        seen = []
+
+        # when
+        with LoggerManager.bound_test_id('test_main.TestMain.test_claim_creation'):
+            TeardownQueue.submit(lambda: seen.append(LoggerManager.get_test_id()), description="record test id")
+        with LoggerManager.bound_test_id('test_main.TestMain.test_claim_updating'):
+            report = TeardownQueue.drain(timeout=5)
+
+        # then
+        self.assertEqual(seen, ['test_main.TestMain.test_claim_creation'])
+        self.assertEqual(report.failures, [])
@@ -0,0 +1,79 @@
+import json
+import os
+import tempfile
+import unittest
+from collections import OrderedDict, deque
+
+from logger import LoggerManager
+from tracer import LifecycleTracer
+
+
+def claim(ready):
+    return {'kind': 'DropletClaim', 'metadata': {'name': 'droplet', 'namespace': 'default'},
+            'status': {'conditions': [{'type': 'Ready', 'status': ready}]}}
+
+
+class TestLifecycleTracer(unittest.TestCase):
+
+    def setUp(self):
+        # The suite may run inside a traced run, whose spans and bounded buffer are put back afterwards
+        self.saved_state = (LifecycleTracer.enabled, LifecycleTracer._spans, LifecycleTracer._objects,
+                            LifecycleTracer._object_capacity)
+        self.saved_test_id = LoggerManager.get_test_id()
+        LifecycleTracer._spans = deque(maxlen=LifecycleTracer._spans.maxlen)
+        LifecycleTracer._objects = OrderedDict()
+        LifecycleTracer.enable()
+        LoggerManager.set_test_id('test_claim')
+
+    def tearDown(self):
+        LoggerManager.set_test_id(self.saved_test_id)
+        (LifecycleTracer.enabled, LifecycleTracer._spans, LifecycleTracer._objects,
+         LifecycleTracer._object_capacity) = self.saved_state
+
+    # Objective: Verify that only condition changes are recorded, not every observation of an object.
+    def test_observe_records_transitions_once(self):
+        # when
+        LifecycleTracer.observe(claim('False'))
+        LifecycleTracer.observe(claim('False'))
+        LifecycleTracer.observe({'kind': 'DropletClaimList', 'items': [claim('True')]})
+
+        # then
+        self.assertEqual([span['name'] for span in LifecycleTracer.get_spans('test_claim')],
+                         ['DropletClaim/droplet Ready=False', 'DropletClaim/droplet Ready=True'])
+
+    # Objective: Verify that the per-object state is bounded, evicting the least recently observed objects.
+    def test_object_state_is_bounded(self):
+        # given
+        LifecycleTracer.enable(object_capacity=2)
+
+        # when
+        for name in ('a', 'b', 'a', 'c'):
+            LifecycleTracer.observe(dict(claim('False'), metadata={'name': name, 'namespace': 'default'}))
+        LifecycleTracer.observe_deleted('DropletClaim', 'c', 'default')
+
+        # then
+        self.assertEqual(list(LifecycleTracer._objects), [('DropletClaim', 'default', 'a')])
+
+    # Objective: Verify that the critical path follows the chain of spans that ended the test, skipping overlaps.
+    def test_critical_path_and_chrome_export(self):
+        # given
+        for name, start, duration in [('create', 0, 10), ('wait Ready', 10, 100), ('parallel read', 20, 5),
+                                      ('delete', 110, 20)]:
+            LifecycleTracer._append({'name': name, 'category': 'op', 'start': start, 'duration': duration,
+                                     'args': {}})
+
+        # when
+        path = LifecycleTracer.critical_path('test_claim')
+        with tempfile.TemporaryDirectory() as trace_dir:
+            trace_path = os.path.join(trace_dir, 'trace.json')
+            LifecycleTracer.export_chrome_trace(trace_path)
+            with open(trace_path, 'r') as f:
+                trace = json.load(f)
+
+        # then
+        self.assertEqual([span['name'] for span in path], ['create', 'wait Ready', 'delete'])
+        self.assertEqual(len([event for event in trace['traceEvents'] if event['ph'] == 'X']), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
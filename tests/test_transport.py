@@ -0,0 +1,86 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import requests
+
+import transport
+from k8s import KubernetesResourceManager
+from transport import Http2Response, Http2Session
+
+
+class StreamedErrorResponse:
+    """A streamed requests response whose body is only loaded on first access to content."""
+
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.body_read = False
+        self.closed = False
+
+    @property
+    def content(self):
+        self.body_read = True
+        return b'{"kind":"Status","code":403}'
+
+    def close(self):
+        self.closed = True
+
+    def raise_for_status(self):
+        raise requests.HTTPError(f"{self.status_code} Forbidden", response=self)
+
+
+class TestTransport(unittest.TestCase):
+
+    # Objective: Verify that HTTP/2 responses raise requests.HTTPError for error statuses only, like requests.
+    def test_http2_errors_are_requests_errors(self):
+        # given
+        url = "https://127.0.0.1:6443/apis/compute.crossplane.io/v1alpha1/dropletclaims"
+        forbidden = Http2Response(SimpleNamespace(status_code=403, reason_phrase='Forbidden', url=url, text='{}'))
+        redirected = Http2Response(SimpleNamespace(status_code=301, reason_phrase='Moved Permanently', url=url))
+
+        # when
+        with self.assertRaises(requests.HTTPError) as raised:
+            forbidden.raise_for_status()
+        redirected.raise_for_status()
+
+        # then
+        self.assertIs(raised.exception.response, forbidden)
+        self.assertEqual(raised.exception.response.text, '{}')
+        self.assertIn('403 Forbidden', str(raised.exception))
+
+    # Objective: Verify that a rejected watch reads its Status body before it is closed and raised.
+    def test_rejected_watch_reads_the_error_body(self):
+        # given
+        response = StreamedErrorResponse(403)
+        session = SimpleNamespace(get=mock.Mock(return_value=response))
+
+        # when
+        with mock.patch.object(KubernetesResourceManager, 'get_http_session', return_value=session), \
+                mock.patch.object(KubernetesResourceManager, 'get_admin_token', return_value='token'), \
+                self.assertRaises(requests.HTTPError):
+            KubernetesResourceManager.open_watch('apis/events.k8s.io/v1/events')
+
+        # then
+        self.assertTrue(response.body_read)
+        self.assertTrue(response.closed)
+
+    # Objective: Verify that the HTTP/2 session wraps every response it sends, streamed or not.
+    @unittest.skipIf(transport.httpx is None, "httpx is not installed")
+    def test_http2_session_wraps_responses(self):
+        # given
+        httpx = transport.httpx
+        session = Http2Session()
+        session._client = httpx.Client(transport=httpx.MockTransport(
+            lambda request: httpx.Response(404, json={'kind': 'Status', 'code': 404})))
+
+        # when
+        with self.assertRaises(requests.HTTPError) as raised:
+            session.get("https://127.0.0.1:6443/api/v1/namespaces/missing", stream=True).raise_for_status()
+
+        # then
+        self.assertEqual(raised.exception.response.status_code, 404)
+        session.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,216 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+from logger import LoggerManager
+
+# Conditions whose transitions are recorded for every observed object
+TRACKED_CONDITIONS = ('Ready', 'Synced', 'Established', 'Offered', 'Installed', 'Healthy')
+
+
+def _now_us():
+    return int(time.time() * 1_000_000)
+
+
+def _object_key(resource):
+    metadata = resource.get('metadata') or {}
+    return resource.get('kind'), metadata.get('namespace'), metadata.get('name')
+
+
+class LifecycleTracer:
+    """
+    Class that timestamps manager operations and observed status transitions of Crossplane resources,
+    exports them as a Chrome trace (Perfetto, chrome://tracing) and summarises each test's critical path.
+    Tracing is off until enable() is called, so instrumented calls cost one flag check.
+    Spans and the per-object state (first observation, last conditions) are both bounded; an object evicted
+    from the state, the least recently observed first, starts a fresh lifecycle when it is observed again.
+    """
+    enabled = False
+    _spans = deque(maxlen=200000)
+    # (kind, namespace, name) -> (first seen, {condition type: status}), least recently observed first
+    _objects = OrderedDict()
+    _object_capacity = 50000
+    _lock = threading.Lock()
+
+    @staticmethod
+    def enable(capacity=None, object_capacity=None):
+        if capacity:
+            LifecycleTracer._spans = deque(maxlen=capacity)
+        if object_capacity:
+            LifecycleTracer._object_capacity = object_capacity
+        LifecycleTracer.enabled = True
+
+    @staticmethod
+    def _append(span):
+        span.setdefault('test_id', LoggerManager.get_test_id())
+        span.setdefault('thread', threading.get_ident())
+        with LifecycleTracer._lock:
+            LifecycleTracer._spans.append(span)
+
+    @staticmethod
+    @contextmanager
+    def span(name, category, **attributes):
+        """Records the duration of the enclosed block."""
+        if not LifecycleTracer.enabled:
+            yield
+            return
+        started = _now_us()
+        try:
+            yield
+        finally:
+            LifecycleTracer._append({'name': name, 'category': category, 'start': started,
+                                     'duration': _now_us() - started, 'args': attributes})
+
+    @staticmethod
+    def traced(category):
+        """Decorator recording every call of a manager method as a span named after it."""
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not LifecycleTracer.enabled:
+                    return function(*args, **kwargs)
+                target = ' '.join(os.path.basename(arg) if isinstance(arg, str)
+                                  else f"{arg.get('kind')}/{arg.get('metadata', {}).get('name')}"
+                                  for arg in args if isinstance(arg, str) or (isinstance(arg, dict) and 'kind' in arg))
+                with LifecycleTracer.span(f"{function.__name__} {target}".strip(), category):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def instant(name, category, **attributes):
+        """Records a point-in-time event, e.g. a cluster Event reason."""
+        if LifecycleTracer.enabled:
+            LifecycleTracer._append({'name': name, 'category': category, 'start': _now_us(), 'duration': None,
+                                     'args': attributes})
+
+    @staticmethod
+    def counter(name, timestamp=None, **values):
+        """Records sampled values, e.g. a controller's workqueue depth, drawn as a graph in the run's lane."""
+        if LifecycleTracer.enabled:
+            LifecycleTracer._append({'name': name, 'category': 'counter', 'start': timestamp or _now_us(),
+                                     'duration': None, 'test_id': None, 'args': values})
+
+    @staticmethod
+    def observe(resource):
+        """
+        Records the condition transitions of an object, or of every item of a list, read from the API.
+        Each transition is a span from when the object was first observed, e.g. 'DropletClaim/x Ready=True'.
+        """
+        if not LifecycleTracer.enabled or not isinstance(resource, dict):
+            return
+        if isinstance(resource.get('items'), list):
+            # Items of a list response carry no kind of their own, e.g. a DropletClaimList
+            item_kind = (resource.get('kind') or '').rsplit('List', 1)[0]
+            for item in resource['items']:
+                LifecycleTracer.observe(item if 'kind' in item else dict(item, kind=item_kind))
+            return
+        if 'metadata' not in resource or 'kind' not in resource:
+            return
+        key = _object_key(resource)
+        now = _now_us()
+        conditions = {condition.get('type'): condition.get('status')
+                      for condition in (resource.get('status') or {}).get('conditions') or []
+                      if condition.get('type') in TRACKED_CONDITIONS}
+
+        with LifecycleTracer._lock:
+            first_seen, previous = LifecycleTracer._objects.pop(key, (now, {}))
+            LifecycleTracer._objects[key] = (first_seen, conditions)
+            while len(LifecycleTracer._objects) > LifecycleTracer._object_capacity:
+                LifecycleTracer._objects.popitem(last=False)
+        for condition_type, status in conditions.items():
+            if previous.get(condition_type) != status:
+                LifecycleTracer._append({
+                    'name': f"{key[0]}/{key[2]} {condition_type}={status}", 'category': 'transition',
+                    'start': first_seen, 'duration': now - first_seen,
+                    'args': {'kind': key[0], 'namespace': key[1], 'name': key[2], 'condition': condition_type,
+                             'status': status},
+                })
+
+    @staticmethod
+    def observe_deleted(kind, name, namespace=None):
+        """Records that an object is gone, closing its lifecycle with a 'Deleted' span."""
+        if not LifecycleTracer.enabled:
+            return
+        key = (kind, namespace, name)
+        now = _now_us()
+        with LifecycleTracer._lock:
+            first_seen, _ = LifecycleTracer._objects.pop(key, (now, None))
+        LifecycleTracer._append({'name': f"{kind}/{name} Deleted", 'category': 'transition', 'start': first_seen,
+                                 'duration': now - first_seen, 'args': {'kind': kind, 'namespace': namespace,
+                                                                        'name': name}})
+
+    @staticmethod
+    def get_spans(test_id=None):
+        with LifecycleTracer._lock:
+            spans = list(LifecycleTracer._spans)
+        return [span for span in spans if test_id is None or span['test_id'] == test_id]
+
+    @staticmethod
+    def critical_path(test_id, test_end=None):
+        """
+        Walks back from the end of a test, always taking the span that finished last before the cursor,
+        which yields the chain of operations and waits that bounded the test's duration.
+        """
+        spans = [span for span in LifecycleTracer.get_spans(test_id) if span['duration'] is not None]
+        if not spans:
+            return []
+        cursor = test_end or max(span['start'] + span['duration'] for span in spans)
+        path = []
+        while True:
+            candidates = [span for span in spans
+                          if span['start'] + span['duration'] <= cursor and span['start'] < cursor]
+            if not candidates:
+                break
+            chosen = max(candidates, key=lambda span: (span['start'] + span['duration'], span['duration']))
+            path.append(chosen)
+            cursor = chosen['start']
+        return list(reversed(path))
+
+    @staticmethod
+    def format_critical_paths(records):
+        """Formats the critical path of every recorded test, longest step first."""
+        lines = []
+        for record in records:
+            test_end = int((record['started'] + record['duration']) * 1_000_000) if record.get('started') else None
+            path = LifecycleTracer.critical_path(record['test'], test_end)
+            if not path:
+                continue
+            lines.append(f"{record['test']} ({record['duration']:.2f}s)")
+            for span in sorted(path, key=lambda span: span['duration'], reverse=True):
+                lines.append(f"  {span['duration'] / 1_000_000:8.3f}s  {span['category']:<10} {span['name']}")
+        return "\n".join(lines)
+
+    @staticmethod
+    def export_chrome_trace(trace_path, records=()):
+        """Writes the spans in Chrome trace event format, one process lane per test."""
+        test_ids = [None] + sorted({span['test_id'] for span in LifecycleTracer.get_spans()} - {None}
+                                   | {record['test'] for record in records})
+        pids = {test_id: index + 1 for index, test_id in enumerate(test_ids)}
+
+        trace_events = [{'ph': 'M', 'name': 'process_name', 'pid': pid, 'args': {'name': test_id or 'run'}}
+                        for test_id, pid in pids.items()]
+        for record in records:
+            if record.get('started'):
+                trace_events.append({'ph': 'X', 'name': record['test'], 'cat': 'test', 'pid': pids[record['test']],
+                                     'tid': 0, 'ts': int(record['started'] * 1_000_000),
+                                     'dur': int(record['duration'] * 1_000_000),
+                                     'args': {'outcome': record['outcome']}})
+        for span in LifecycleTracer.get_spans():
+            event = {'name': span['name'], 'cat': span['category'], 'pid': pids[span['test_id']],
+                     'tid': span['thread'], 'ts': span['start'], 'args': span['args']}
+            if span['category'] == 'counter':
+                event.update(ph='C')
+            elif span['duration'] is None:
+                event.update(ph='i', s='t')
+            else:
+                event.update(ph='X', dur=span['duration'])
+            trace_events.append(event)
+
+        os.makedirs(os.path.dirname(os.path.abspath(trace_path)), exist_ok=True)
+        with open(trace_path, 'w') as f:
+            json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, f)
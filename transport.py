@@ -0,0 +1,78 @@
+import requests
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+def _timeout(timeout):
+    # requests takes a (connect, read) tuple or a single number for both
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return httpx.Timeout(read, connect=connect)
+    return httpx.Timeout(timeout)
+
+
+class Http2Response:
+    """
+    An httpx response whose raise_for_status raises requests.HTTPError for 4xx and 5xx statuses, like the
+    responses of requests, so the managers' 'except requests.HTTPError' handles both transports.
+    """
+
+    def __init__(self, response):
+        self._response = response
+
+    def raise_for_status(self):
+        if self._response.status_code >= 400:
+            raise requests.HTTPError(f"{self._response.status_code} {self._response.reason_phrase} "
+                                     f"for url: {self._response.url}", response=self)
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+
+class Http2Session:
+    """
+    Drop-in replacement for the shared requests.Session that sends every raw API call and watch over HTTP/2,
+    so concurrent requests and long-lived watch streams multiplex over one connection per API server.
+    Requires the optional 'httpx[http2]' package (requirements-http2.txt); responses are httpx responses, which
+    offer the same status_code, text, json(), elapsed, iter_lines() and close() used by the managers, wrapped in
+    Http2Response for raise_for_status().
+    Like requests, response hooks are called with every response and the 'stream' flag of its request.
+    """
+
+    def __init__(self, pool_size=32, verify=False, cert=None):
+        if httpx is None:
+            raise ImportError("k8s.http2 requires httpx with HTTP/2 support: pip install -r requirements-http2.txt")
+        # HTTP/2 needs one connection per API server; the limit only matters if a server refuses h2 in ALPN
+        self._client = httpx.Client(http2=True, verify=verify, cert=cert, timeout=None,
+                                    limits=httpx.Limits(max_connections=pool_size,
+                                                        max_keepalive_connections=pool_size))
+        self.hooks = {'response': []}
+
+    def request(self, method, url, params=None, data=None, headers=None, stream=False, timeout=None):
+        request = self._client.build_request(method, url, params=params, content=data, headers=headers,
+                                             timeout=_timeout(timeout))
+        response = Http2Response(self._client.send(request, stream=stream))
+        for hook in self.hooks['response']:
+            hook(response, stream=stream)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request('PATCH', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+    def close(self):
+        self._client.close()
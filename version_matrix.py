@@ -0,0 +1,68 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import path_searcher as path_builder
+from cluster_fanout import ClusterFanOut
+from config_loader import MATRIX_ENV_VAR, ConfigLoader
+from helm import CrossplaneHelmManager
+from logger import LoggerManager
+from result_recorder import write_report
+
+config_data = ConfigLoader.load_config()
+
+# Setup logger
+logger = LoggerManager.get_logger(config_data, 'runner')
+
+
+class VersionMatrix:
+    """
+    Class for running the suite against several Crossplane chart versions and values sets at once.
+    Every 'matrix' entry pairs a version with its own cluster target, so all versions install and run in
+    parallel; charts are pulled once into the shared cache before the targets start.
+    """
+
+    @staticmethod
+    def run(entry_names=None, runner_args=(), output_dir=None):
+        """
+        Installs each entry's chart version on its target, runs the suite there, and merges the reports.
+        runner_args are the flags of the runs, or a function returning them for an entry's name.
+        """
+        entries = ConfigLoader.get_matrix_entries(config_data)
+        entry_names = entry_names or list(entries)
+        if not entry_names:
+            raise ValueError("No matrix entries to run, add them under 'matrix' in config.yaml")
+        unknown = [name for name in entry_names if name not in entries]
+        if unknown:
+            raise ValueError(f"Unknown matrix entries {unknown}, expected some of {sorted(entries)}")
+        clusters = [entries[name]['cluster'] for name in entry_names]
+        shared = {cluster for cluster in clusters if clusters.count(cluster) > 1}
+        if shared:
+            raise ValueError(f"Matrix entries must use separate cluster targets, shared: {sorted(shared)}")
+
+        helm_config_data = config_data.get('helm', {})
+        CrossplaneHelmManager.prefetch_charts(helm_config_data.get('chart_name', 'crossplane'),
+                                              helm_config_data.get('repo', 'https://charts.crossplane.io/stable'),
+                                              [entries[name]['version'] for name in entry_names])
+
+        output_dir = output_dir or os.path.join(path_builder.get_project_root_path(), 'reports', 'matrix')
+        os.makedirs(output_dir, exist_ok=True)
+
+        def entry_args(name):
+            # Every entry installs its own chart version before its run
+            return ['--install-crossplane', *(runner_args(name) if callable(runner_args) else runner_args)]
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=len(entry_names)) as executor:
+            entry_reports = list(executor.map(
+                lambda name: ClusterFanOut.run_cluster(name, entry_args, output_dir, {MATRIX_ENV_VAR: name}),
+                entry_names))
+
+        merged = ClusterFanOut.merge_reports(entry_reports)
+        merged['duration'] = time.monotonic() - started
+        for name in entry_names:
+            merged['clusters'][name].update(version=entries[name]['version'], cluster=entries[name]['cluster'])
+        write_report(merged['tests'], os.path.join(output_dir, 'merged.json'),
+                     clusters=merged['clusters'], duration=merged['duration'])
+        logger.info("Ran the suite against %s Crossplane versions in %.1fs.", len(entry_names), merged['duration'])
+        return merged